@@ -8,23 +8,47 @@ extracted from a local IBT file. Requires:
 - A local IBT file containing a clean reference lap
 
 Run: python nishizumi_ibt_overlay.py
+Batch analysis (headless, no Tk): python nishizumi_ibt_overlay.py analyze DIR_OR_FILES --format csv
+Broadcast replay (headless): python nishizumi_ibt_overlay.py broadcast FILE.ibt --reference REF.ibt --ws-port 9871
+Broadcast client: python nishizumi_ibt_overlay.py listen --udp 9870  (or --ws HOST:9871, --shm)
+Per-frame allocation check: python nishizumi_ibt_overlay.py selfcheck
+Off-screen frames and draw benchmark (Pillow): python nishizumi_ibt_overlay.py render [SESSION.ibt] --golden DIR
 """
 
 from __future__ import annotations
 
+import argparse
+import base64
 import bisect
+import csv
+import functools
+import gc
+import hashlib
+import itertools
+import json
 import logging
+import math
+import multiprocessing
+import os
+import pickle
 import queue
+import re
+import socket
+import struct
+import sys
 import threading
 import time
-from collections import deque
-from dataclasses import dataclass
-from typing import Any, Deque, Dict, List, Optional, Tuple
-
-import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext, ttk
-
-import irsdk
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import irsdk
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, scrolledtext, ttk
 
 try:
     import winsound
@@ -34,6 +58,11 @@ except ImportError:  # pragma: no cover - Windows only
 
 APP_TITLE = "Nishizumi IBT"
 DEFAULT_UPDATE_MS = 16  # 60 FPS target
+DEFAULT_RENDER_MS = DEFAULT_UPDATE_MS  # Overlay redraw period, may be slower than cue evaluation
+DEBUG_REFRESH_S = 0.5  # The Debug tab text is rebuilt at most this often
+DEFAULT_IDLE_UPDATE_MS = 250  # Used while disconnected, stationary or when telemetry is frozen
+IDLE_SPEED_MPS = 0.5
+IDLE_AFTER_S = 1.0
 DEFAULT_APPROACH_A_S = 2.0
 DEFAULT_APPROACH_B_S = 1.0
 DEFAULT_FINAL_CUE_OFFSET_M = 0.0
@@ -44,6 +73,10 @@ DEFAULT_POWER_THRESHOLD = 0.70
 DEFAULT_ALPHA = 0.85
 DEFAULT_OVERLAY_SIZE = (900, 240)
 DEFAULT_FLOW_WINDOW_S = 10.0
+MAX_FLOW_WINDOW_S = 600.0
+HISTORY_BASE_BUCKET_S = 0.1  # Finest downsampled level; each further level is HISTORY_LEVEL_FACTOR coarser
+HISTORY_LEVEL_FACTOR = 4
+HISTORY_LEVELS = 4
 DEFAULT_LOOKAHEAD_WINDOW_S = 2.0
 DEFAULT_FLOW_LINE_WIDTH = 2
 DEFAULT_REF_LINE_WIDTH = 1.5
@@ -56,6 +89,13 @@ DEFAULT_LIVE_SPEED_COLOR = "#ffffff"
 DEFAULT_REF_THROTTLE_COLOR = "#228822"  # Darker green for reference
 DEFAULT_REF_BRAKE_COLOR = "#882222"  # Darker red for reference
 DEFAULT_REF_SPEED_COLOR = "#6d6d6d"
+# Comparison reference laps (primary reference keeps the colors above)
+REFERENCE_SET_COLORS = ("#3b82f6", "#f59e0b", "#c084fc")
+MAX_REFERENCE_LAPS = 1 + len(REFERENCE_SET_COLORS)
+# Sample keys for comparison-lap traces, built once instead of formatted every frame.
+REFERENCE_SLOT_KEYS = tuple((f"ref{slot}_throttle", f"ref{slot}_brake") for slot in range(MAX_REFERENCE_LAPS))
+REFERENCE_GRID_POINTS = 4096
+DEFAULT_REFERENCE_CACHE_MB = 64
 # Fill colors (semi-transparent effect simulated)
 DEFAULT_THROTTLE_FILL_COLOR = "#0a3a0a"  # Dark green fill
 DEFAULT_BRAKE_FILL_COLOR = "#3a0a0a"  # Dark red fill
@@ -70,16 +110,367 @@ DEFAULT_LOOKAHEAD_SAMPLES = 48
 DEFAULT_OVERLAY_WIDTH = DEFAULT_OVERLAY_SIZE[0]
 DEFAULT_OVERLAY_HEIGHT = DEFAULT_OVERLAY_SIZE[1]
 ASSUMED_TRACK_LEN_M = 5000.0
+CORNER_MIN_DROP_MPS = 3.0  # Speed must fall and recover by this much around a corner apex
+CORNER_MIN_STEER_RAD = 0.15  # Steering wheel angle that distinguishes a corner from a straight-line lift
+SEGMENT_READOUT_S = 4.0
+DEFAULT_BROADCAST_UDP_PORT = 9870
+DEFAULT_BROADCAST_WS_PORT = 9871
+# WebSocket clients are local-only unless LAN access is switched on explicitly.
+BROADCAST_WS_LOCAL_HOST = "127.0.0.1"
+BROADCAST_WS_LAN_HOST = "0.0.0.0"
+DEFAULT_BROADCAST_MAX_HZ = 60.0
+DEFAULT_SHARED_RING_NAME = "nishizumi_telemetry"
+DEFAULT_SHARED_RING_SLOTS = 256
+DEFAULT_HANDOFF_SLOTS = 256
+WORKER_STOP_TIMEOUT_S = 3.0  # Longer than TelemetryProcessWorker's own child join
+EARTH_RADIUS_M = 6371000.0
+SPATIAL_SEARCH_WINDOW = 48  # Samples either side of the last match checked before a full tree query
+SPATIAL_RESYNC_M = 15.0  # A local match further away than this falls back to the KD-tree
+SPATIAL_MAX_OFFSET_M = 40.0  # Further from the reference line (pit lane, off track) is treated as no match
+DEFAULT_LIBRARY_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".nishizumi_ibt", "library_index.json")
+IBT_CHANNELS = (
+    "LapDistPct",
+    "LapDist",
+    "Throttle",
+    "Brake",
+    "SteeringWheelAngle",
+    "Gear",
+    "Speed",
+    "SessionTime",
+)
+IBT_POSITION_CHANNELS = ("Lat", "Lon")
+IBT_HEADER_SIZE = 112  # irsdk_header
+IBT_DISK_HEADER_FORMAT = "<qddii"  # irsdk_diskSubHeader: start date, start/end time, lap and record counts
+
+
+def _import_tk() -> None:
+    """Import tkinter on demand; the headless ``analyze`` command never loads it."""
+    global tk, filedialog, messagebox, scrolledtext, ttk
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, scrolledtext, ttk
+
+
+def _import_irsdk() -> None:
+    """Import pyirsdk on demand; only reading IBT files and the live sim need it."""
+    global irsdk
+    import irsdk
 
 
 def clamp(value: float, low: float, high: float) -> float:
     return max(low, min(high, value))
 
 
-@dataclass
+class ColumnDecimator:
+    """Min/max-per-pixel-column polyline decimation.
+
+    Points are fed in x order; each integer pixel column collapses to at most two
+    vertices (its extremes, in the order they occurred), so short brake spikes
+    survive while the vertex count is bounded by the drawable width.
+    """
+
+    def __init__(self) -> None:
+        self._column: Optional[int] = None
+        self._x = 0.0
+        self._y_min = 0.0
+        self._y_max = 0.0
+        self._min_seq = 0
+        self._max_seq = 0
+        self._count = 0
+
+    def add(self, x: float, y: float, out: List[float]) -> None:
+        column = int(x)
+        if column != self._column:
+            self.flush(out)
+            self._column = column
+            self._x = x
+            self._y_min = y
+            self._y_max = y
+            self._min_seq = 0
+            self._max_seq = 0
+            self._count = 1
+            return
+        if y < self._y_min:
+            self._y_min = y
+            self._min_seq = self._count
+        elif y > self._y_max:
+            self._y_max = y
+            self._max_seq = self._count
+        self._count += 1
+
+    def flush(self, out: List[float]) -> None:
+        """Emit the pending column into ``out`` and reset."""
+        if self._column is None:
+            return
+        if self._y_min == self._y_max:
+            out.extend((self._x, self._y_min))
+        elif self._min_seq <= self._max_seq:
+            out.extend((self._x, self._y_min, self._x, self._y_max))
+        else:
+            out.extend((self._x, self._y_max, self._x, self._y_min))
+        self._column = None
+
+
+class PointBufferPool:
+    """Per-frame pool of coordinate lists.
+
+    acquire() hands out a cleared list that stays valid until the next reset(),
+    so drawing a frame reuses the previous frame's buffers instead of building
+    fresh ones for every polyline.
+    """
+
+    def __init__(self) -> None:
+        self._buffers: List[List[float]] = []
+        self._used = 0
+
+    def reset(self) -> None:
+        self._used = 0
+
+    def acquire(self) -> List[float]:
+        if self._used == len(self._buffers):
+            self._buffers.append([])
+        buffer = self._buffers[self._used]
+        buffer.clear()
+        self._used += 1
+        return buffer
+
+
+def build_line_points(
+    window: Sequence[Dict[str, Any]],
+    key: str,
+    origin_x: float,
+    bottom: float,
+    height: float,
+    cutoff: float,
+    flow_window_s: float,
+    split_x: float,
+    series_offset_s: float,
+    decimator: ColumnDecimator,
+    pool: PointBufferPool,
+    segments: List[List[float]],
+) -> List[List[float]]:
+    """Fill ``segments`` with point sequences for one series, splitting on None values.
+
+    series_offset_s lets us visually lead/lag this series in time (seconds).
+    Samples are decimated to the min/max of each pixel column, so a series
+    never carries more than ~2 vertices per horizontal pixel. Downsampled
+    history records contribute both their min and max. Point lists come from
+    ``pool``.
+    """
+    segments.clear()
+    current_points = pool.acquire()
+    scale = (split_x - origin_x) / flow_window_s
+    start = cutoff + series_offset_s
+
+    for sample in window:
+        value = sample.get(key)
+        if value is None:
+            decimator.flush(current_points)
+            if len(current_points) >= 4:
+                segments.append(current_points)
+                current_points = pool.acquire()
+            else:
+                current_points.clear()
+            continue
+        t = sample["t"]
+        if t is None:
+            continue
+        # Apply per-series horizontal offset: positive = draw earlier (to the left)
+        x = origin_x + (t - start) * scale
+        lows = sample.get("min")
+        if lows is not None:
+            decimator.add(x, bottom - clamp(lows[key], 0.0, 1.0) * height, current_points)
+            decimator.add(x, bottom - clamp(sample["max"][key], 0.0, 1.0) * height, current_points)
+            continue
+        decimator.add(x, bottom - clamp(value, 0.0, 1.0) * height, current_points)
+
+    decimator.flush(current_points)
+    if len(current_points) >= 4:
+        segments.append(current_points)
+
+    return segments
+
+
+class TraceHistory:
+    """Multi-resolution history of overlay samples.
+
+    Full-rate samples are kept for the recent past; older data lives in
+    progressively coarser levels of fixed-duration buckets holding the mean,
+    min and max of every series. Buckets are closed incrementally as samples
+    arrive, and window() returns the finest level whose record count fits the
+    drawable width, so drawing a long window costs about the same as a short one.
+    """
+
+    LEVEL_RECORDS = 4096
+
+    def __init__(
+        self,
+        base_bucket_s: float = HISTORY_BASE_BUCKET_S,
+        factor: int = HISTORY_LEVEL_FACTOR,
+        levels: int = HISTORY_LEVELS,
+        records: int = LEVEL_RECORDS,
+    ) -> None:
+        self.records = records
+        self.raw: Deque[Dict[str, Any]] = deque(maxlen=records)
+        self.bucket_s = [base_bucket_s * factor**level for level in range(levels)]
+        self.levels: List[Deque[Dict[str, Any]]] = [deque(maxlen=records) for _ in range(levels)]
+        # Per level: series -> [sum, count, min, max] for the bucket being filled;
+        # a zero count marks a series absent from the current bucket.
+        self._acc: List[Dict[str, List[float]]] = [{} for _ in range(levels)]
+        self._acc_start: List[Optional[float]] = [None] * levels
+        self._spare: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    @property
+    def now(self) -> Optional[float]:
+        return self.raw[-1]["t"] if self.raw else None
+
+    def new_record(self) -> Dict[str, Any]:
+        """An empty sample dict to fill and append(); recycled from evicted samples."""
+        record = self._spare
+        record.clear()
+        return record
+
+    def append(self, sample: Dict[str, Any]) -> None:
+        evicted = self.raw[0] if len(self.raw) == self.records else None
+        self.raw.append(sample)
+        if sample is self._spare:
+            self._spare = evicted if evicted is not None else {}
+        if self.levels:
+            self._accumulate(0, sample["t"], sample, None, None)
+
+    def _accumulate(
+        self,
+        level: int,
+        t: float,
+        means: Dict[str, Any],
+        mins: Optional[Dict[str, float]],
+        maxs: Optional[Dict[str, float]],
+    ) -> None:
+        width = self.bucket_s[level]
+        start = self._acc_start[level]
+        if start is not None and t >= start + width:
+            record = self._close(level, start)
+            self.levels[level].append(record)
+            if level + 1 < len(self.levels):
+                self._accumulate(level + 1, record["t"], record, record["min"], record["max"])
+            start = None
+        if start is None:
+            self._acc_start[level] = math.floor(t / width) * width
+        acc = self._acc[level]
+        for key, value in means.items():
+            if value is None or key == "t" or key == "min" or key == "max":
+                continue
+            low = mins[key] if mins is not None else value
+            high = maxs[key] if maxs is not None else value
+            slot = acc.get(key)
+            if slot is None:
+                acc[key] = [value, 1, low, high]
+                continue
+            if not slot[1]:
+                slot[0] = value
+                slot[1] = 1
+                slot[2] = low
+                slot[3] = high
+                continue
+            slot[0] += value
+            slot[1] += 1
+            if low < slot[2]:
+                slot[2] = low
+            if high > slot[3]:
+                slot[3] = high
+
+    def _close(self, level: int, start: float) -> Dict[str, Any]:
+        acc = self._acc[level]
+        records = self.levels[level]
+        if len(records) == self.records:
+            # Recycle the bucket about to be evicted, along with its min/max dicts.
+            record = records[0]
+            lows = record["min"]
+            highs = record["max"]
+            record.clear()
+            lows.clear()
+            highs.clear()
+            record["t"] = start + self.bucket_s[level] * 0.5
+            record["min"] = lows
+            record["max"] = highs
+        else:
+            lows = {}
+            highs = {}
+            record = {"t": start + self.bucket_s[level] * 0.5, "min": lows, "max": highs}
+        for key, slot in acc.items():
+            total, count, low, high = slot
+            if not count:
+                continue
+            record[key] = total / count
+            lows[key] = low
+            highs[key] = high
+            slot[1] = 0  # Keep the slot list for the next bucket
+        return record
+
+    @staticmethod
+    def _tail(records: Deque[Dict[str, Any]], since: float, out: List[Dict[str, Any]]) -> None:
+        """Append the records newer than ``since`` to ``out`` in time order."""
+        start = len(out)
+        for record in reversed(records):
+            if record["t"] < since:
+                break
+            out.append(record)
+        # Reverse the appended run in place.
+        end = len(out) - 1
+        while start < end:
+            out[start], out[end] = out[end], out[start]
+            start += 1
+            end -= 1
+
+    def window(
+        self, window_s: float, width_px: int, out: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Records covering the last ``window_s`` seconds at about two per pixel or fewer.
+
+        Bucket records carry ``min``/``max`` dicts next to the per-series means.
+        The newest part of a coarse level is filled in from full-rate samples.
+        Pass ``out`` to reuse a list across frames.
+        """
+        if out is None:
+            out = []
+        else:
+            out.clear()
+        if not self.raw:
+            return out
+        now = self.raw[-1]["t"]
+        cutoff = now - window_s
+        budget = max(64, 2 * width_px)
+        span = now - self.raw[0]["t"]
+        raw_covers = self.raw[0]["t"] <= cutoff or len(self.raw) < self.records
+        if raw_covers and len(self.raw) * window_s / max(span, 1e-6) <= budget:
+            self._tail(self.raw, cutoff, out)
+            return out
+        for level, records in enumerate(self.levels):
+            if not records:
+                continue
+            covers = records[0]["t"] <= cutoff or len(records) < self.records
+            if (covers and window_s / self.bucket_s[level] <= budget) or level == len(self.levels) - 1:
+                self._tail(records, cutoff, out)
+                self._tail(self.raw, records[-1]["t"] + self.bucket_s[level] * 0.5, out)
+                return out
+        self._tail(self.raw, cutoff, out)
+        return out
+
+
+# Slotted records (Python 3.10+) are smaller and allocate no per-instance __dict__.
+_DATACLASS_SLOTS: Dict[str, Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
+_NO_EXTRAS: Dict[str, Any] = {}  # Shared, never mutated: snapshots without subscribed channels
+
+
+@dataclass(**_DATACLASS_SLOTS)
 class TelemetrySnapshot:
     connected: bool = False
-    timestamp: float = 0.0
+    # Bookkeeping fields are excluded from equality so unchanged telemetry compares equal.
+    timestamp: float = field(default=0.0, compare=False)
+    seq: int = field(default=0, compare=False)
+    tick: Optional[int] = field(default=None, compare=False)
     lap_pct: Optional[float] = None
     throttle: Optional[float] = None
     brake: Optional[float] = None
@@ -90,13 +481,493 @@ class TelemetrySnapshot:
     lap: Optional[int] = None
     session_time: Optional[float] = None
     track_name: Optional[str] = None
+    track_config: Optional[str] = None
+    car_path: Optional[str] = None
+    on_pit_road: Optional[bool] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    extras: Dict[str, Any] = field(default_factory=dict)  # Subscribed CHANNEL_REGISTRY values
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class RefEvent:
     kind: str  # "brake", "lift", "power"
     lap_pct: float
-    dist_m: Optional[float] = None
+
+
+@dataclass(**_DATACLASS_SLOTS)
+class UpcomingEvent:
+    """One event ahead of the car, as returned by EventIndex.upcoming.
+
+    The index owns one per reference event and refreshes the distance and
+    time in place on each query, so results stay valid until the next query.
+    """
+
+    event: RefEvent
+    index: int  # Position in ReferenceLap.events, stable until the events are rebuilt
+    dist_m: float
+    time_s: Optional[float]  # Reference time to reach it; None without a full reference lap
+
+
+@dataclass(**_DATACLASS_SLOTS)
+class TrackSegment:
+    name: str
+    kind: str  # "corner", "sector"
+    start_pct: float
+    end_pct: float
+    ref_time_s: float
+    ref_min_speed_mps: float
+
+
+@dataclass(**_DATACLASS_SLOTS)
+class SegmentResult:
+    segment: TrackSegment
+    time_s: float
+    delta_s: float
+    min_speed_mps: float
+
+    @property
+    def min_speed_delta_mps(self) -> float:
+        return self.min_speed_mps - self.segment.ref_min_speed_mps
+
+
+@dataclass(frozen=True)
+class ChannelSpec:
+    """An optional telemetry channel: how to scale it and where the overlay shows it."""
+
+    name: str  # iRacing variable name, identical in IBT files and live telemetry
+    label: str
+    unit: str = ""
+    scale: float = 1.0
+    low: float = 0.0  # Display range (after scaling) mapped onto the lane height
+    high: float = 1.0
+    lane: str = "stream"  # "stream" plots a trace in the flowing view, "readout" shows the value as text
+    color: str = "#ffffff"
+    decimals: int = 0
+
+    def normalise(self, raw: float) -> float:
+        span = self.high - self.low
+        return clamp((raw * self.scale - self.low) / span, 0.0, 1.0) if span else 0.0
+
+    def format(self, raw: Optional[float]) -> str:
+        if raw is None:
+            return "--"
+        return f"{raw * self.scale:.{self.decimals}f}{' ' + self.unit if self.unit else ''}"
+
+
+STANDARD_GRAVITY = 9.80665
+CHANNEL_REGISTRY = (
+    ChannelSpec("LatAccel", "Lat G", "G", 1 / STANDARD_GRAVITY, -3.0, 3.0, "stream", "#33aaff", 2),
+    ChannelSpec("LongAccel", "Long G", "G", 1 / STANDARD_GRAVITY, -3.0, 3.0, "stream", "#ffaa33", 2),
+    ChannelSpec("BrakeABSactive", "ABS", "", 1.0, 0.0, 1.0, "stream", "#ffff33"),
+    ChannelSpec("SteeringWheelTorque", "Steer torque", "N·m", 1.0, -30.0, 30.0, "stream", "#cc66ff", 1),
+    ChannelSpec("RPM", "RPM", "", 1.0, 0.0, 10000.0, "readout"),
+    ChannelSpec("FuelLevel", "Fuel", "L", 1.0, 0.0, 120.0, "readout", decimals=1),
+)
+CHANNELS_BY_NAME = {spec.name: spec for spec in CHANNEL_REGISTRY}
+CHANNEL_SAMPLE_KEYS = {spec.name: (f"ch:{spec.name}", f"ref_ch:{spec.name}") for spec in CHANNEL_REGISTRY}
+
+
+def read_ibt_channels(
+    path: str,
+    names: Sequence[str],
+    report: Optional[Callable[[int, str], None]] = None,
+) -> Dict[str, Any]:
+    """Read whole-file sample columns for ``names`` from an IBT file."""
+    _import_irsdk()
+    ibt = irsdk.IBT()
+    ibt.open(path)
+    try:
+        channels = {}
+        for idx, name in enumerate(names):
+            if report is not None:
+                report(idx, name)
+            channels[name] = ibt.get_all(name)
+        return channels
+    finally:
+        ibt.close()
+
+
+class EventDetector:
+    """Incremental brake/lift/power detector.
+
+    Fed one sample at a time with constant state, so the reference builder
+    and the live lap share the same thresholds and hysteresis. Events are
+    reported through ``on_event(kind, lap_pct)``.
+    """
+
+    def __init__(
+        self,
+        on_event: Callable[[str, float], None],
+        brake_threshold: float,
+        lift_threshold: float,
+        power_threshold: float,
+    ) -> None:
+        self.on_event = on_event
+        self.set_thresholds(brake_threshold, lift_threshold, power_threshold)
+        self.reset()
+
+    def set_thresholds(self, brake_threshold: float, lift_threshold: float, power_threshold: float) -> None:
+        self.brake_threshold = brake_threshold
+        self.lift_threshold = lift_threshold
+        self.power_threshold = power_threshold
+
+    def reset(self) -> None:
+        self._primed = False
+        self._prev_throttle = 0.0
+        self._prev_brake = 0.0
+        self._in_brake = False
+        self._in_lift = False
+
+    def feed(self, lap_pct: float, throttle: float, brake: float) -> None:
+        prev_throttle = self._prev_throttle
+        prev_brake = self._prev_brake
+        self._prev_throttle = throttle
+        self._prev_brake = brake
+        if not self._primed:
+            self._primed = True
+            return
+
+        if not self._in_brake and prev_brake < self.brake_threshold <= brake:
+            self.on_event("brake", lap_pct)
+            self._in_brake = True
+            self._in_lift = False
+
+        if self._in_brake and brake < self.brake_threshold * 0.5:
+            self._in_brake = False
+
+        if (
+            not self._in_brake
+            and not self._in_lift
+            and prev_throttle >= self.lift_threshold
+            and throttle < self.lift_threshold
+            and brake < self.brake_threshold
+        ):
+            self.on_event("lift", lap_pct)
+            self._in_lift = True
+
+        if self._in_lift and throttle > self.lift_threshold * 1.2:
+            self._in_lift = False
+
+        if (self._in_brake or self._in_lift) and prev_throttle < self.power_threshold <= throttle:
+            self.on_event("power", lap_pct)
+
+
+EVENT_FEEDBACK_VERBS = {"brake": "Braked", "lift": "Lifted", "power": "Power"}
+
+
+class LiveEventComparer:
+    """Detects the driver's own events and measures them against the reference.
+
+    Each live event is matched to the nearest reference event of the same kind
+    within MATCH_WINDOW_M; the latest comparison is kept in plain attributes so
+    the per-frame path allocates nothing.
+    """
+
+    MATCH_WINDOW_M = 150.0
+    MAX_STEP_PCT = 0.02
+
+    def __init__(self) -> None:
+        self.detector = EventDetector(self._on_event, 0.0, 0.0, 0.0)
+        self.reference: Optional[ReferenceLap] = None
+        self.track_len_m = ASSUMED_TRACK_LEN_M
+        self.now = 0.0
+        self.kind: Optional[str] = None
+        self.offset_m = 0.0
+        self.at = 0.0
+        self._feedback: Optional[Tuple[str, bool]] = None  # Built once per matched event
+        self._last_pct: Optional[float] = None
+
+    def update(
+        self,
+        reference: Optional[ReferenceLap],
+        lap_pct: float,
+        throttle: float,
+        brake: float,
+        track_len_m: float,
+        now: float,
+    ) -> None:
+        if reference is not self.reference:
+            self.reference = reference
+            self.detector.reset()
+            self.kind = None
+        if reference is None:
+            return
+        self.detector.set_thresholds(reference.brake_threshold, reference.lift_threshold, reference.power_threshold)
+        last = self._last_pct
+        self._last_pct = lap_pct
+        if last is not None and (lap_pct - last > self.MAX_STEP_PCT or self.MAX_STEP_PCT < last - lap_pct < 0.5):
+            # Tow, reset or teleport: do not invent an event across the gap.
+            self.detector.reset()
+        self.track_len_m = track_len_m
+        self.now = now
+        self.detector.feed(lap_pct, throttle, brake)
+
+    def _on_event(self, kind: str, lap_pct: float) -> None:
+        best: Optional[float] = None
+        for event in self.reference.events:
+            if event.kind != kind:
+                continue
+            diff = (lap_pct - event.lap_pct + 0.5) % 1.0 - 0.5
+            if best is None or abs(diff) < abs(best):
+                best = diff
+        if best is None or abs(best) * self.track_len_m > self.MATCH_WINDOW_M:
+            return
+        self.kind = kind
+        self.offset_m = best * self.track_len_m
+        self.at = self.now
+        late = self.offset_m > 0
+        self._feedback = f"{EVENT_FEEDBACK_VERBS[kind]} {abs(self.offset_m):.0f} m {'late' if late else 'early'}", late
+
+    def feedback(self, now: float, hold_s: float) -> Optional[Tuple[str, bool]]:
+        """(text, late) for the latest comparison while it is fresh."""
+        if self.kind is None or now - self.at > hold_s:
+            return None
+        return self._feedback
+
+
+# The SDK's per-car arrays always hold CAR_IDX_SLOTS entries; unused slots report a negative LapDistPct.
+CAR_IDX_SLOTS = 64
+CAR_IDX_CHANNELS = ("PlayerCarIdx", "CarIdxLapDistPct", "CarIdxLap", "CarIdxOnPitRoad", "CarIdxClassPosition")
+CAR_GAP_GRID_POINTS = 2000
+
+
+@dataclass(**_DATACLASS_SLOTS)
+class CarGap:
+    car_idx: int
+    gap_m: float
+    gap_s: Optional[float]  # None without a full reference lap to time the distance with
+    laps: int  # Whole laps the other car is ahead (+) or behind (-)
+    class_position: int
+
+    def label(self, arrow: str) -> str:
+        name = f"P{self.class_position}" if self.class_position > 0 else f"#{self.car_idx}"
+        gap = f"{self.gap_s:.1f}s" if self.gap_s is not None else "--"
+        laps = f" {self.laps:+d}L" if self.laps else ""
+        return f"{arrow} {name}{laps}  {gap}  {self.gap_m:.0f} m"
+
+
+class ProximityEngine:
+    """Gaps to the nearest cars ahead and behind, from the SDK's CarIdx arrays.
+
+    Each update is one pass over the CAR_IDX_SLOTS entries that keeps only
+    the nearest candidates, so it allocates no per-tick buffers and its cost
+    is bounded by the slot count rather than the size of the field.
+    Distances wrap at the line; times come from the reference lap's elapsed
+    time resampled onto a uniform grid, i.e. its speed profile integrated
+    over distance. Cars on pit road, empty slots and the player are skipped.
+    """
+
+    def __init__(self) -> None:
+        self.reference: Optional[ReferenceLap] = None
+        self._ref_time: Optional[array] = None
+        self._ref_lap_s = 0.0
+        self.ahead: Optional[CarGap] = None
+        self.behind: Optional[CarGap] = None
+
+    def update(self, extras: Dict[str, Any], reference: Optional[ReferenceLap], track_len_m: float) -> None:
+        """Recompute ``ahead``/``behind`` from one snapshot's CAR_IDX_CHANNELS extras."""
+        if reference is not self.reference:
+            self.reference = reference
+            self._build_time_table(reference)
+        self.ahead = self.behind = None
+        player = extras.get("PlayerCarIdx")
+        pct = extras.get("CarIdxLapDistPct")
+        if player is None or not pct or not 0 <= player < len(pct) or pct[player] < 0.0:
+            return
+        me = pct[player]
+        pit = extras.get("CarIdxOnPitRoad")
+        # One pass: the smallest forward offset is the car ahead, the largest the car behind.
+        ahead_idx = behind_idx = -1
+        ahead_offset = 1.0
+        behind_offset = -1.0
+        for idx in range(len(pct)):
+            car_pct = pct[idx]
+            if car_pct < 0.0 or idx == player or (pit and pit[idx]):
+                continue
+            offset = (car_pct - me) % 1.0
+            if offset < ahead_offset:
+                ahead_offset = offset
+                ahead_idx = idx
+            if offset > behind_offset:
+                behind_offset = offset
+                behind_idx = idx
+        if ahead_idx < 0:
+            return
+        self.ahead = self._gap(extras, player, ahead_idx, ahead_offset, track_len_m)
+        self.behind = self._gap(extras, player, behind_idx, behind_offset - 1.0, track_len_m)
+
+    def _gap(self, extras: Dict[str, Any], player: int, idx: int, offset: float, track_len_m: float) -> CarGap:
+        """``offset`` is the lap fraction from the player to car ``idx``: positive ahead, negative behind."""
+        pct = extras["CarIdxLapDistPct"]
+        laps = 0
+        lap = extras.get("CarIdxLap")
+        if lap and lap[idx] >= 0 and lap[player] >= 0:
+            laps = round(lap[idx] + pct[idx] - lap[player] - pct[player] - offset)
+        gap_s = None
+        if self._ref_time is not None:
+            # Time the reference needs to cover the gap; both directions stay positive.
+            ahead_s = (self._time_at(pct[idx]) - self._time_at(pct[player])) % self._ref_lap_s
+            gap_s = ahead_s if offset >= 0.0 else self._ref_lap_s - ahead_s
+        position = extras.get("CarIdxClassPosition")
+        return CarGap(idx, abs(offset) * track_len_m, gap_s, laps, position[idx] if position else 0)
+
+    def _time_at(self, pct: float) -> float:
+        table = self._ref_time
+        points = len(table)
+        scaled = (pct % 1.0) * points
+        i = int(scaled)
+        before = table[i % points]
+        after = table[i + 1] if i + 1 < points else self._ref_lap_s
+        return before + (after - before) * (scaled - i)
+
+    def _build_time_table(self, reference: Optional[ReferenceLap]) -> None:
+        self._ref_time = None
+        if reference is None or not reference.lap_time_s or not reference.elapsed_s:
+            return
+        self._ref_lap_s = reference.lap_time_s
+        self._ref_time = resample_to_grid(reference.lap_pct, reference.elapsed_s, CAR_GAP_GRID_POINTS)
+
+
+class SpatialIndex:
+    """Nearest-sample lookup over a reference lap's GPS trace.
+
+    Positions are projected to local metres and stored in a static 2-D
+    KD-tree. Matches are normally found by a bounded scan around the previous
+    match; the tree is only queried to (re)acquire the car, so per-frame cost
+    stays at a few dozen distance checks.
+    """
+
+    def __init__(self, lat: Sequence[float], lon: Sequence[float], lap_pct: Sequence[float]) -> None:
+        self.lap_pct = lap_pct
+        self._lat0 = math.radians(lat[0])
+        self._lon0 = math.radians(lon[0])
+        self._cos_lat0 = math.cos(self._lat0)
+        self.xs = array("d")
+        self.ys = array("d")
+        for lat_deg, lon_deg in zip(lat, lon):
+            x, y = self._project(lat_deg, lon_deg)
+            self.xs.append(x)
+            self.ys.append(y)
+        # Implicit tree: node i holds point _order[i]; children live in _left/_right (-1 = none).
+        count = len(self.xs)
+        self._order = array("i", [0]) * count
+        self._left = array("i", [-1]) * count
+        self._right = array("i", [-1]) * count
+        self._axis = array("b", [0]) * count
+        self._next_node = 0
+        self._root = self._build(list(range(count)), 0)
+        self._last: Optional[int] = None
+
+    def _project(self, lat_deg: float, lon_deg: float) -> Tuple[float, float]:
+        x = (math.radians(lon_deg) - self._lon0) * self._cos_lat0 * EARTH_RADIUS_M
+        y = (math.radians(lat_deg) - self._lat0) * EARTH_RADIUS_M
+        return x, y
+
+    def _build(self, indices: List[int], depth: int) -> int:
+        if not indices:
+            return -1
+        axis = depth % 2
+        coords = self.xs if axis == 0 else self.ys
+        indices.sort(key=coords.__getitem__)
+        mid = len(indices) // 2
+        node = self._next_node
+        self._next_node += 1
+        self._order[node] = indices[mid]
+        self._axis[node] = axis
+        self._left[node] = self._build(indices[:mid], depth + 1)
+        self._right[node] = self._build(indices[mid + 1 :], depth + 1)
+        return node
+
+    def nearest(self, x: float, y: float) -> Tuple[int, float]:
+        """Full KD-tree query: (sample index, squared distance)."""
+        best_idx = -1
+        best_d2 = float("inf")
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                continue
+            idx = self._order[node]
+            dx = self.xs[idx] - x
+            dy = self.ys[idx] - y
+            d2 = dx * dx + dy * dy
+            if d2 < best_d2:
+                best_idx, best_d2 = idx, d2
+            diff = dx if self._axis[node] == 0 else dy
+            near, far = (self._left[node], self._right[node]) if diff > 0 else (self._right[node], self._left[node])
+            if diff * diff < best_d2:
+                stack.append(far)
+            stack.append(near)
+        return best_idx, best_d2
+
+    def _local(self, x: float, y: float, center: int) -> Tuple[int, float, bool]:
+        """Scan around ``center``; the flag is set when the best match sits on the window edge."""
+        count = len(self.xs)
+        best_idx = center
+        best_d2 = float("inf")
+        best_offset = 0
+        for offset in range(-SPATIAL_SEARCH_WINDOW, SPATIAL_SEARCH_WINDOW + 1):
+            idx = (center + offset) % count
+            dx = self.xs[idx] - x
+            dy = self.ys[idx] - y
+            d2 = dx * dx + dy * dy
+            if d2 < best_d2:
+                best_idx, best_d2, best_offset = idx, d2, offset
+        return best_idx, best_d2, abs(best_offset) == SPATIAL_SEARCH_WINDOW
+
+    def _project_onto(self, x: float, y: float, before: int, after: int) -> Tuple[float, float]:
+        """(ratio along before->after clamped to [0, 1], squared distance to that point)."""
+        seg_x = self.xs[after] - self.xs[before]
+        seg_y = self.ys[after] - self.ys[before]
+        length2 = seg_x * seg_x + seg_y * seg_y
+        ratio = 0.0
+        if length2 > 0:
+            ratio = clamp(((x - self.xs[before]) * seg_x + (y - self.ys[before]) * seg_y) / length2, 0.0, 1.0)
+        dx = self.xs[before] + seg_x * ratio - x
+        dy = self.ys[before] + seg_y * ratio - y
+        return ratio, dx * dx + dy * dy
+
+    def reset(self) -> None:
+        self._last = None
+
+    def match(self, lat_deg: float, lon_deg: float) -> Optional[float]:
+        """Return the reference lap fraction nearest to a live position, or None."""
+        count = len(self.xs)
+        if count < 2:
+            return None
+        x, y = self._project(lat_deg, lon_deg)
+        idx = -1
+        d2 = float("inf")
+        if self._last is not None:
+            idx, d2, at_edge = self._local(x, y, self._last)
+            if at_edge or d2 > SPATIAL_RESYNC_M * SPATIAL_RESYNC_M:
+                idx = -1
+        if idx < 0:
+            idx, d2 = self.nearest(x, y)
+        if d2 > SPATIAL_MAX_OFFSET_M * SPATIAL_MAX_OFFSET_M:
+            self._last = None
+            return None
+        self._last = idx
+        # Refine between samples using whichever neighbouring segment is closer.
+        best_pct = self.lap_pct[idx]
+        best_d2 = d2
+        for before, after in ((idx - 1, idx), (idx, idx + 1)):
+            if before < 0 or after >= count:
+                continue
+            ratio, seg_d2 = self._project_onto(x, y, before, after)
+            if seg_d2 <= best_d2:
+                best_d2 = seg_d2
+                best_pct = self.lap_pct[before] + (self.lap_pct[after] - self.lap_pct[before]) * ratio
+        return best_pct
+
+    def nbytes(self) -> int:
+        columns = (self.xs, self.ys, self._order, self._left, self._right, self._axis)
+        return sum(column.itemsize * len(column) for column in columns)
+
+
+class ReferenceLoadCancelled(Exception):
+    """Raised inside a reference load when its cancel event is set."""
 
 
 class ReferenceLap:
@@ -106,39 +977,76 @@ class ReferenceLap:
         brake_threshold: float,
         lift_threshold: float,
         power_threshold: float,
+        channels: Optional[Dict[str, Any]] = None,
+        progress: Optional[Callable[[float, str], None]] = None,
+        cancel: Optional[threading.Event] = None,
     ) -> None:
+        """Load a reference lap from an IBT file, or from ``channels`` when given.
+
+        ``channels`` maps IBT channel names to per-sample sequences, which lets
+        laps recorded from live telemetry share the IBT extraction path.
+        ``progress`` receives (fraction, step) updates and setting ``cancel``
+        aborts the load with ``ReferenceLoadCancelled``.
+        """
+        self._progress = progress
+        self._cancel = cancel
         self.path = path
         self.brake_threshold = brake_threshold
         self.lift_threshold = lift_threshold
         self.power_threshold = power_threshold
-        self.lap_pct: List[float] = []
-        self.throttle: List[float] = []
-        self.brake: List[float] = []
-        self.steering: List[float] = []
-        self.gear: List[int] = []
-        self.speed: List[float] = []
+        # Columns are typed arrays so their memory footprint is compact and exact.
+        self.lap_pct = array("f")
+        self.throttle = array("f")
+        self.brake = array("f")
+        self.steering = array("f")
+        self.gear = array("b")
+        self.speed = array("f")
         self.events: List[RefEvent] = []
         self.brake_points: List[float] = []
         self.track_length_m: Optional[float] = None
-        self._load_ibt()
+        self.lap_time_s: Optional[float] = None
+        self.elapsed_s = array("f")
+        self.corners: List[TrackSegment] = []
+        self.sectors: List[TrackSegment] = []
+        self.spatial: Optional[SpatialIndex] = None
+        # Extra channels are decoded on first use; see channel().
+        self._source_channels = channels
+        self._lap_range = (0, 0)
+        self._extra: Dict[str, Optional[array]] = {}
+        if channels is None:
+            self._load_ibt()
+        else:
+            self._load_channels(channels)
 
     def _load_ibt(self) -> None:
-        ibt = irsdk.IBT()
-        ibt.open(self.path)
-        try:
-            lap_pct_all = ibt.get_all("LapDistPct")
-            lap_dist_all = ibt.get_all("LapDist")
-            throttle_all = ibt.get_all("Throttle")
-            brake_all = ibt.get_all("Brake")
-            steering_all = ibt.get_all("SteeringWheelAngle")
-            gear_all = ibt.get_all("Gear")
-            speed_all = ibt.get_all("Speed")
-        finally:
-            ibt.close()
+        self._report(0.0, "opening file")
+
+        def report(idx: int, name: str) -> None:
+            self._report(0.05 + 0.75 * idx / len(names), f"reading {name}")
+
+        names = IBT_CHANNELS + IBT_POSITION_CHANNELS
+        self._load_channels(read_ibt_channels(self.path, names, report))
+
+    def _report(self, fraction: float, step: str) -> None:
+        if self._cancel is not None and self._cancel.is_set():
+            raise ReferenceLoadCancelled(self.path)
+        if self._progress is not None:
+            self._progress(fraction, step)
+
+    def _load_channels(self, channels: Dict[str, Any]) -> None:
+        lap_pct_all = channels.get("LapDistPct")
+        lap_dist_all = channels.get("LapDist")
+        throttle_all = channels.get("Throttle")
+        brake_all = channels.get("Brake")
+        steering_all = channels.get("SteeringWheelAngle")
+        gear_all = channels.get("Gear")
+        speed_all = channels.get("Speed")
+        session_time_all = channels.get("SessionTime")
 
         if not lap_pct_all:
             raise ValueError("IBT file does not contain LapDistPct")
 
+        self._report(0.8, "extracting lap")
         segments = []
         start = 0
         for i in range(1, len(lap_pct_all)):
@@ -149,16 +1057,17 @@ class ReferenceLap:
 
         best_segment = max(segments, key=lambda seg: seg[1] - seg[0])
         s, e = best_segment
+        self._lap_range = best_segment
 
-        self.lap_pct = lap_pct_all[s:e]
+        self.lap_pct = array("f", lap_pct_all[s:e])
         if self.lap_pct and max(self.lap_pct) > 1.5:
-            self.lap_pct = [pct / 100.0 for pct in self.lap_pct]
+            self.lap_pct = array("f", (pct / 100.0 for pct in self.lap_pct))
         length = e - s
-        self.throttle = throttle_all[s:e] if throttle_all else [0.0] * length
-        self.brake = brake_all[s:e] if brake_all else [0.0] * length
-        self.steering = steering_all[s:e] if steering_all else [0.0] * length
-        self.gear = gear_all[s:e] if gear_all else [0] * length
-        self.speed = speed_all[s:e] if speed_all else [0.0] * length
+        self.throttle = array("f", throttle_all[s:e]) if throttle_all else array("f", [0.0]) * length
+        self.brake = array("f", brake_all[s:e]) if brake_all else array("f", [0.0]) * length
+        self.steering = array("f", steering_all[s:e]) if steering_all else array("f", [0.0]) * length
+        self.gear = array("b", gear_all[s:e]) if gear_all else array("b", [0]) * length
+        self.speed = array("f", speed_all[s:e]) if speed_all else array("f", [0.0]) * length
 
         if lap_dist_all:
             segment_dist = lap_dist_all[s:e]
@@ -167,49 +1076,42 @@ class ReferenceLap:
                 if max_dist > 0:
                     self.track_length_m = max_dist
 
-        self._build_events()
-
-    def _build_events(self) -> None:
-        self.events = []
-        self.brake_points = []
-        if not self.lap_pct:
-            return
-
-        in_brake = False
-        in_lift = False
-
-        for i in range(1, len(self.lap_pct)):
-            brake_val = self.brake[i]
-            throttle_val = self.throttle[i]
-            prev_brake = self.brake[i - 1]
-            prev_throttle = self.throttle[i - 1]
+        # Only a segment spanning the whole lap has a meaningful lap time.
+        if session_time_all and self.lap_pct[0] < 0.02 and self.lap_pct[-1] > 0.98:
+            self.lap_time_s = session_time_all[e - 1] - session_time_all[s]
 
-            if not in_brake and prev_brake < self.brake_threshold <= brake_val:
-                self.events.append(RefEvent("brake", self.lap_pct[i]))
-                self.brake_points.append(self.lap_pct[i])
-                in_brake = True
-                in_lift = False
+        self._report(0.85, "detecting events")
+        self._build_events()
+        self._build_timing(session_time_all[s:e] if session_time_all else None)
+        self._build_corners()
 
-            if in_brake and brake_val < self.brake_threshold * 0.5:
-                in_brake = False
+        lat_all = channels.get("Lat")
+        lon_all = channels.get("Lon")
+        if lat_all and lon_all and len(lat_all) == len(lap_pct_all) and any(lat_all[s:e]):
+            self._report(0.9, "indexing track position")
+            self.spatial = SpatialIndex(lat_all[s:e], lon_all[s:e], self.lap_pct)
 
-            if (
-                not in_brake
-                and not in_lift
-                and prev_throttle >= self.lift_threshold
-                and throttle_val < self.lift_threshold
-                and brake_val < self.brake_threshold
-            ):
-                self.events.append(RefEvent("lift", self.lap_pct[i]))
-                in_lift = True
+    def _build_events(self) -> None:
+        """Detect events into new lists and publish them with one assignment each.
 
-            if in_lift and throttle_val > self.lift_threshold * 1.2:
-                in_lift = False
+        Other threads may read ``events`` while thresholds are refreshed, and
+        EventIndex.sync keys on the list's identity, so a published list is
+        never modified afterwards.
+        """
+        events: List[RefEvent] = []
+        brake_points: List[float] = []
 
-            if (in_brake or in_lift) and prev_throttle < self.power_threshold <= throttle_val:
-                self.events.append(RefEvent("power", self.lap_pct[i]))
+        def add_event(kind: str, lap_pct: float) -> None:
+            events.append(RefEvent(kind, lap_pct))
+            if kind == "brake":
+                brake_points.append(lap_pct)
 
-        self.brake_points.sort()
+        detector = EventDetector(add_event, self.brake_threshold, self.lift_threshold, self.power_threshold)
+        for i in range(len(self.lap_pct)):
+            detector.feed(self.lap_pct[i], self.throttle[i], self.brake[i])
+        brake_points.sort()
+        self.brake_points = brake_points
+        self.events = events
 
     def refresh_thresholds(
         self, brake_threshold: float, lift_threshold: float, power_threshold: float
@@ -219,7 +1121,127 @@ class ReferenceLap:
         self.power_threshold = power_threshold
         self._build_events()
 
-    def ref_at_pct(self, data: List[float], pct: float) -> float:
+    def _build_timing(self, session_time: Optional[Sequence[float]]) -> None:
+        """Elapsed time since the first sample, from SessionTime or integrated speed."""
+        count = len(self.lap_pct)
+        if session_time and len(session_time) == count:
+            start = session_time[0]
+            self.elapsed_s = array("f", (t - start for t in session_time))
+            return
+        track_len_m = self.track_length_m or ASSUMED_TRACK_LEN_M
+        elapsed = array("f", [0.0]) * count
+        total = 0.0
+        for i in range(1, count):
+            step_m = max(0.0, self.lap_pct[i] - self.lap_pct[i - 1]) * track_len_m
+            total += step_m / max(1.0, (self.speed[i] + self.speed[i - 1]) * 0.5)
+            elapsed[i] = total
+        self.elapsed_s = elapsed
+
+    def _build_corners(self) -> None:
+        """Find corners as steered speed minima and tile the lap between them.
+
+        Minima are confirmed with hysteresis (speed must fall and recover by
+        CORNER_MIN_DROP_MPS), so the scan is a single O(n) pass. Segment
+        boundaries sit at the fastest point between consecutive corners.
+        """
+        speed = self.speed
+        count = len(speed)
+        if count < 3:
+            self.corners = []
+            return
+        minima: List[int] = []
+        falling = False
+        max_idx = 0
+        min_idx = 0
+        for i in range(1, count):
+            value = speed[i]
+            if falling:
+                if value < speed[min_idx]:
+                    min_idx = i
+                elif value > speed[min_idx] + CORNER_MIN_DROP_MPS:
+                    minima.append(min_idx)
+                    falling = False
+                    max_idx = i
+            elif value > speed[max_idx]:
+                max_idx = i
+            elif value < speed[max_idx] - CORNER_MIN_DROP_MPS:
+                falling = True
+                min_idx = i
+
+        window = max(1, count // 200)
+        apexes = [
+            idx
+            for idx in minima
+            if max(abs(v) for v in self.steering[max(0, idx - window) : idx + window + 1]) >= CORNER_MIN_STEER_RAD
+        ]
+        bounds = [0]
+        for first, second in zip(apexes, apexes[1:]):
+            bounds.append(max(range(first, second + 1), key=speed.__getitem__))
+        bounds.append(count - 1)
+        self.corners = [
+            self._segment(f"T{number}", "corner", bounds[number - 1], bounds[number])
+            for number in range(1, len(bounds))
+        ] if apexes else []
+
+    def _segment(self, name: str, kind: str, start: int, end: int) -> TrackSegment:
+        start_pct = 0.0 if start == 0 else self.lap_pct[start]
+        end_pct = 1.0 if end >= len(self.lap_pct) - 1 else self.lap_pct[end]
+        return TrackSegment(
+            name=name,
+            kind=kind,
+            start_pct=start_pct,
+            end_pct=end_pct,
+            ref_time_s=self.elapsed_s[end] - self.elapsed_s[start],
+            ref_min_speed_mps=min(self.speed[start : end + 1]),
+        )
+
+    def set_custom_sectors(self, boundaries: Sequence[float]) -> None:
+        """Split the lap at ``boundaries`` (lap fractions) into sectors S1..Sn."""
+        self.sectors = []
+        cuts = sorted(b for b in set(boundaries) if 0.0 < b < 1.0)
+        if not cuts or not self.lap_pct:
+            return
+        indices = [0] + [min(len(self.lap_pct) - 1, bisect.bisect_left(self.lap_pct, cut)) for cut in cuts]
+        indices.append(len(self.lap_pct) - 1)
+        self.sectors = [
+            self._segment(f"S{number}", "sector", indices[number - 1], indices[number])
+            for number in range(1, len(indices))
+        ]
+
+    def channel(self, name: str) -> Optional[array]:
+        """Return the reference lap's samples for an extra channel, decoding it on first use.
+
+        Channels missing from the source are cached as None. Reading from an
+        IBT reopens the file, so callers on the UI thread should use
+        loaded_channel() and prefetch from a worker.
+        """
+        if name in self._extra:
+            return self._extra[name]
+        if self._source_channels is not None:
+            values = self._source_channels.get(name)
+        else:
+            try:
+                values = read_ibt_channels(self.path, (name,)).get(name)
+            except Exception:
+                values = None
+        s, e = self._lap_range
+        column = array("f", values[s:e]) if values and len(values) >= e else None
+        self._extra[name] = column
+        return column
+
+    def loaded_channel(self, name: str) -> Optional[array]:
+        return self._extra.get(name)
+
+    def channel_decoded(self, name: str) -> bool:
+        return name in self._extra
+
+    def nbytes(self) -> int:
+        columns = (self.lap_pct, self.throttle, self.brake, self.steering, self.gear, self.speed, self.elapsed_s)
+        columns += tuple(column for column in self._extra.values() if column is not None)
+        total = sum(column.itemsize * len(column) for column in columns)
+        return total + (self.spatial.nbytes() if self.spatial is not None else 0)
+
+    def ref_at_pct(self, data: Sequence[float], pct: float) -> float:
         if not self.lap_pct:
             return 0.0
         idx = bisect.bisect_left(self.lap_pct, pct)
@@ -237,58 +1259,938 @@ class ReferenceLap:
     def ref_gear_at_pct(self, pct: float) -> int:
         return int(round(self.ref_at_pct(self.gear, pct)))
 
-    def set_event_distances(self, track_len_m: float) -> None:
-        for event in self.events:
-            event.dist_m = event.lap_pct * track_len_m
+    def elapsed_at_pct(self, pct: float) -> Optional[float]:
+        """Reference time from the lap start to ``pct``; None unless a whole lap is timed."""
+        if not self.lap_time_s or not self.elapsed_s:
+            return None
+        return self.ref_at_pct(self.elapsed_s, pct)
+
+
+class EventIndex:
+    """Reference events sorted by lap position, for circular "what comes next" queries.
+
+    ``sync`` rebuilds the index only when the reference, its event list (new
+    thresholds) or the track length change; events themselves are never
+    modified, so several indexes can share one reference across threads.
+    ``upcoming`` then bisects once and walks forward, so a query costs
+    O(log n + K) however many events the lap has, and fills caller-owned
+    lists with the index's own UpcomingEvent entries instead of allocating.
+    Each kind also has its own column, so "next brake" never skips over lifts.
+    """
+
+    def __init__(self) -> None:
+        self.reference: Optional[ReferenceLap] = None
+        self.track_len_m = 0.0
+        self._events: Optional[List[RefEvent]] = None
+        # kind (None = all kinds) -> (sorted lap_pct, event indices, reference elapsed time at each)
+        self._columns: Dict[Optional[str], Tuple[array, List[int], Optional[array]]] = {}
+        self._entries: List[UpcomingEvent] = []  # One per event, refreshed by each query
+
+    def sync(self, reference: Optional[ReferenceLap], track_len_m: float) -> None:
+        events = reference.events if reference is not None else None
+        if reference is self.reference and events is self._events and track_len_m == self.track_len_m:
+            return
+        self.reference = reference
+        self.track_len_m = track_len_m
+        self._events = events
+        self._columns = {}
+        self._entries = []
+        if not events:
+            return
+        self._entries = [UpcomingEvent(event, idx, 0.0, None) for idx, event in enumerate(events)]
+        groups: Dict[Optional[str], List[int]] = {None: []}
+        for idx, event in enumerate(events):
+            groups[None].append(idx)
+            groups.setdefault(event.kind, []).append(idx)
+        timed = reference.elapsed_at_pct(0.0) is not None
+        for kind, indices in groups.items():
+            indices.sort(key=lambda idx: events[idx].lap_pct)
+            pct = array("d", (events[idx].lap_pct for idx in indices))
+            times = array("d", (reference.elapsed_at_pct(p) for p in pct)) if timed else None
+            self._columns[kind] = (pct, indices, times)
+
+    def __len__(self) -> int:
+        return len(self._events) if self._columns else 0
+
+    def event(self, index: int) -> RefEvent:
+        return self._events[index]
+
+    def distance_to(self, index: int, lap_pct: float) -> float:
+        """Metres from ``lap_pct`` forward to event ``index``."""
+        return (self._events[index].lap_pct - lap_pct) % 1.0 * self.track_len_m
+
+    def upcoming(
+        self,
+        lap_pct: float,
+        count: int,
+        kind: Optional[str] = None,
+        within_m: Optional[float] = None,
+        out: Optional[List[UpcomingEvent]] = None,
+    ) -> List[UpcomingEvent]:
+        """The next ``count`` events (of ``kind``, if given) at or after ``lap_pct``, wrapping past the line.
+
+        ``within_m`` stops the walk at the first event farther ahead than that.
+        ``out`` is cleared and refilled instead of returning a new list.
+        """
+        found = out if out is not None else []
+        found.clear()
+        column = self._columns.get(kind)
+        if column is None:
+            return found
+        pct, indices, times = column
+        entries = self._entries
+        reference = self.reference
+        track_len_m = self.track_len_m
+        start = bisect.bisect_left(pct, lap_pct)
+        now_s = reference.elapsed_at_pct(lap_pct) if times is not None else None
+        for step in range(min(count, len(indices))):
+            slot = (start + step) % len(indices)
+            dist_m = (pct[slot] - lap_pct) % 1.0 * track_len_m
+            if within_m is not None and dist_m > within_m:
+                break
+            entry = entries[indices[slot]]
+            entry.dist_m = dist_m
+            entry.time_s = (times[slot] - now_s) % reference.lap_time_s if now_s is not None else None
+            found.append(entry)
+        return found
+
+    def next_event(self, lap_pct: float, kind: Optional[str] = None) -> Optional[UpcomingEvent]:
+        """The first event (of ``kind``, if given) at or after ``lap_pct``; upcoming() without a list."""
+        column = self._columns.get(kind)
+        if column is None:
+            return None
+        pct, indices, times = column
+        slot = bisect.bisect_left(pct, lap_pct) % len(indices)
+        entry = self._entries[indices[slot]]
+        entry.dist_m = (pct[slot] - lap_pct) % 1.0 * self.track_len_m
+        now_s = self.reference.elapsed_at_pct(lap_pct) if times is not None else None
+        entry.time_s = (times[slot] - now_s) % self.reference.lap_time_s if now_s is not None else None
+        return entry
+
+
+def resample_to_grid(lap_pct: Sequence[float], data: Sequence[float], points: int) -> array:
+    """Linearly resample ``data`` (indexed by lap_pct) onto a uniform float32 grid."""
+    out = array("f", [0.0]) * points
+    if not lap_pct:
+        return out
+    last = len(lap_pct) - 1
+    j = 0
+    for i in range(points):
+        pct = i / points
+        while j < last and lap_pct[j + 1] < pct:
+            j += 1
+        before = lap_pct[j]
+        if pct <= before or j >= last:
+            out[i] = data[j]
+            continue
+        after = lap_pct[j + 1]
+        ratio = (pct - before) / (after - before) if after != before else 0.0
+        out[i] = data[j] + (data[j + 1] - data[j]) * ratio
+    return out
+
+
+class SegmentTracker:
+    """Times the live car through a list of segments that tile the lap.
+
+    Each update compares the position against the current segment's end only,
+    so the per-frame cost is O(1); a bisect is needed only to resynchronise
+    after a reset, tow or teleport. Segments entered part-way are not timed.
+    """
+
+    def __init__(self) -> None:
+        self.segments: List[TrackSegment] = []
+        self._idx: Optional[int] = None
+        self._last_pct: Optional[float] = None
+        self._last_time = 0.0
+        self._entry_time: Optional[float] = None
+        self._min_speed = 0.0
+
+    def reset(self, segments: Sequence[TrackSegment]) -> None:
+        self.segments = list(segments)
+        self._idx = None
+        self._last_pct = None
+        self._entry_time = None
+
+    def update(self, lap_pct: float, session_time: float, speed_mps: float) -> Optional[SegmentResult]:
+        """Feed one sample; returns a result when a fully timed segment is exited."""
+        segments = self.segments
+        if not segments:
+            return None
+        last = self._last_pct
+        last_time = self._last_time
+        self._last_pct = lap_pct
+        self._last_time = session_time
+        if last is None or self._idx is None or lap_pct - last > 0.05 or 0.01 < last - lap_pct < 0.5:
+            starts = [segment.start_pct for segment in segments]
+            self._idx = max(0, bisect.bisect_right(starts, lap_pct) - 1)
+            self._entry_time = None
+            self._min_speed = speed_mps
+            return None
+
+        wrapped = last - lap_pct >= 0.5
+        position = lap_pct + 1.0 if wrapped else lap_pct
+        result = None
+        while position >= segments[self._idx].end_pct:
+            segment = segments[self._idx]
+            span = position - last
+            ratio = (segment.end_pct - last) / span if span > 0 else 1.0
+            crossing = last_time + (session_time - last_time) * ratio
+            if self._entry_time is not None:
+                time_s = crossing - self._entry_time
+                result = SegmentResult(segment, time_s, time_s - segment.ref_time_s, self._min_speed)
+            self._entry_time = crossing
+            self._min_speed = speed_mps
+            self._idx += 1
+            if self._idx >= len(segments):
+                self._idx = 0
+                position -= 1.0
+                last -= 1.0
+        if speed_mps < self._min_speed:
+            self._min_speed = speed_mps
+        return result
+
+
+class ReferenceSet:
+    """Several reference laps aligned onto one shared lap-distance grid.
+
+    Slot 0 is the primary reference (the one driving events and cues); further
+    slots are comparison laps. Each lap is stored only as float32 columns, so a
+    lap costs ``3 * grid_points * 4`` bytes, and one grid index per frame serves
+    every lap.
+    """
+
+    def __init__(self, grid_points: int = REFERENCE_GRID_POINTS) -> None:
+        self.grid_points = grid_points
+        self.names: List[str] = []
+        self.colors: List[str] = []
+        self.throttle: List[array] = []
+        self.brake: List[array] = []
+        self.speed: List[array] = []
+        self._values: List[List[float]] = []
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def set_primary(self, lap: ReferenceLap) -> None:
+        self.install_row(0, self.build_row(lap))
+
+    def add(self, lap: ReferenceLap) -> None:
+        self.append_row(self.build_row(lap, self.next_color()))
+
+    def next_color(self) -> str:
+        return REFERENCE_SET_COLORS[max(0, len(self.names) - 1) % len(REFERENCE_SET_COLORS)]
+
+    def append_row(self, row: Tuple[Any, ...]) -> None:
+        if not self.names:
+            raise ValueError("Load a primary reference before adding comparison laps")
+        if len(self.names) >= MAX_REFERENCE_LAPS:
+            raise ValueError(f"At most {MAX_REFERENCE_LAPS} reference laps can be shown")
+        self.install_row(len(self.names), row)
+
+    def clear_extras(self) -> None:
+        for column in (self.names, self.colors, self.throttle, self.brake, self.speed, self._values):
+            del column[1:]
+
+    def clear(self) -> None:
+        for column in (self.names, self.colors, self.throttle, self.brake, self.speed, self._values):
+            column.clear()
+
+    def build_row(self, lap: ReferenceLap, color: str = DEFAULT_REF_THROTTLE_COLOR) -> Tuple[Any, ...]:
+        """Resample ``lap`` into a row for ``install_row``; safe to call off the UI thread."""
+        return (
+            os.path.splitext(os.path.basename(lap.path))[0],
+            color,
+            resample_to_grid(lap.lap_pct, lap.throttle, self.grid_points),
+            resample_to_grid(lap.lap_pct, lap.brake, self.grid_points),
+            resample_to_grid(lap.lap_pct, lap.speed, self.grid_points),
+            [0.0, 0.0, 0.0],
+        )
+
+    @staticmethod
+    def restyle_row(row: Tuple[Any, ...], color: str) -> Tuple[Any, ...]:
+        """Copy of ``row`` drawn in ``color``; the float32 columns are shared, not copied."""
+        return (row[0], color, row[2], row[3], row[4], [0.0, 0.0, 0.0])
+
+    @staticmethod
+    def row_nbytes(row: Tuple[Any, ...]) -> int:
+        return sum(column.itemsize * len(column) for column in row[2:5])
+
+    def install_row(self, slot: int, row: Tuple[Any, ...]) -> None:
+        row = self.restyle_row(row, row[1])
+        columns = (self.names, self.colors, self.throttle, self.brake, self.speed, self._values)
+        for column, value in zip(columns, row):
+            if slot < len(column):
+                column[slot] = value
+            else:
+                column.append(value)
+
+    def values_at(self, pct: float) -> List[List[float]]:
+        """Return ``[throttle, brake, speed_mps]`` for every lap at ``pct``.
+
+        The returned lists are reused between calls; copy them to keep values.
+        """
+        points = self.grid_points
+        pos = (pct % 1.0) * points
+        i = int(pos)
+        if i >= points:
+            i = points - 1
+        j = i + 1 if i + 1 < points else 0
+        frac = pos - i
+        for slot, out in enumerate(self._values):
+            throttle = self.throttle[slot]
+            brake = self.brake[slot]
+            speed = self.speed[slot]
+            out[0] = throttle[i] + (throttle[j] - throttle[i]) * frac
+            out[1] = brake[i] + (brake[j] - brake[i]) * frac
+            out[2] = speed[i] + (speed[j] - speed[i]) * frac
+        return self._values
+
+    def nbytes(self) -> int:
+        return sum(col.itemsize * len(col) for cols in (self.throttle, self.brake, self.speed) for col in cols)
+
+
+class LiveLapRecorder:
+    """Assembles live laps sample by sample and promotes faster ones to reference.
+
+    ``add`` runs on the telemetry thread and only appends to preallocated-growth
+    arrays. When a valid lap completes and beats the best known time, the
+    columns go into a one-lap slot drained by a single long-lived builder
+    thread, which builds the ``ReferenceLap``, its events and its grid row;
+    a faster lap finishing while one waits replaces it. The UI collects the
+    result with ``poll``. ``best_time_s`` only moves when the UI accepts a
+    lap as its reference.
+    """
+
+    MIN_SAMPLES = 200
+    MAX_STEP_PCT = 0.02  # Larger forward jumps mean a tow, reset or teleport
+
+    def __init__(self, logger: logging.Logger, grid: ReferenceSet) -> None:
+        self._logger = logger
+        self._grid = grid
+        self.enabled = True
+        self.thresholds = (DEFAULT_BRAKE_THRESHOLD, DEFAULT_LIFT_THRESHOLD, DEFAULT_POWER_THRESHOLD)
+        self.best_time_s: Optional[float] = None
+        self._ready: queue.Queue[Tuple[ReferenceLap, Tuple[Any, ...]]] = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending: Optional[Tuple[Dict[str, Any], float, Optional[float], Tuple[float, float, float]]] = None
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._builder: Optional[threading.Thread] = None
+        self.superseded = 0
+        self._last_pct: Optional[float] = None
+        self._last_time: Optional[float] = None
+        self._crossing_time: Optional[float] = None
+        self._valid = False
+        self._new_columns()
+
+    def _new_columns(self) -> None:
+        self._pct = array("f")
+        self._throttle = array("f")
+        self._brake = array("f")
+        self._steering = array("f")
+        self._speed = array("f")
+        self._gear = array("b")
+        self._time = array("d")
+        self._lat = array("d")
+        self._lon = array("d")
+
+    def add(self, snapshot: TelemetrySnapshot) -> None:
+        if (
+            not self.enabled
+            or not snapshot.connected
+            or snapshot.lap_pct is None
+            or snapshot.session_time is None
+            or snapshot.on_pit_road
+        ):
+            self._valid = False
+            self._last_pct = None
+            return
+        pct = snapshot.lap_pct / 100.0 if snapshot.lap_pct > 1.5 else snapshot.lap_pct
+        now = snapshot.session_time
+        last_pct = self._last_pct
+        last_time = self._last_time
+        self._last_pct = pct
+        self._last_time = now
+        if last_pct is None or last_time is None:
+            self._crossing_time = None
+            return
+        if pct < last_pct - 0.5:
+            # Interpolate the start/finish crossing between the two samples.
+            before = 1.0 - last_pct
+            span = before + pct
+            crossing = last_time + (now - last_time) * (before / span if span > 0 else 0.0)
+            if self._valid and self._crossing_time is not None:
+                self._finish(crossing - self._crossing_time, snapshot.track_length_km)
+            self._crossing_time = crossing
+            self._valid = True
+            self._new_columns()
+        elif pct - last_pct > self.MAX_STEP_PCT or pct < last_pct - self.MAX_STEP_PCT:
+            self._valid = False
+        if not self._valid:
+            return
+        self._pct.append(pct)
+        self._throttle.append(snapshot.throttle or 0.0)
+        self._brake.append(snapshot.brake or 0.0)
+        self._steering.append(snapshot.steering or 0.0)
+        self._speed.append(snapshot.speed_mps or 0.0)
+        self._gear.append(clamp(snapshot.gear or 0, -1, 127))
+        self._time.append(now)
+        if snapshot.lat is not None and snapshot.lon is not None:
+            self._lat.append(snapshot.lat)
+            self._lon.append(snapshot.lon)
+
+    def _finish(self, lap_time_s: float, track_length_km: Optional[float]) -> None:
+        if len(self._pct) < self.MIN_SAMPLES or self._pct[0] > 0.02 or self._pct[-1] < 0.98:
+            return
+        if self.best_time_s is not None and lap_time_s >= self.best_time_s:
+            return
+        channels = {
+            "LapDistPct": self._pct,
+            "Throttle": self._throttle,
+            "Brake": self._brake,
+            "SteeringWheelAngle": self._steering,
+            "Speed": self._speed,
+            "Gear": self._gear,
+            "SessionTime": self._time,
+        }
+        if len(self._lat) == len(self._pct):
+            channels["Lat"] = self._lat
+            channels["Lon"] = self._lon
+        track_len_m = track_length_km * 1000.0 if track_length_km else None
+        with self._lock:
+            if self._pending is not None:
+                if self._pending[1] <= lap_time_s:
+                    return  # A faster lap is already waiting for the builder
+                self.superseded += 1
+            self._pending = (channels, lap_time_s, track_len_m, self.thresholds)
+            if self._builder is None:
+                self._builder = threading.Thread(target=self._run, daemon=True)
+                self._builder.start()
+        self._wake.set()
+
+    def close(self) -> None:
+        self._closed.set()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            with self._lock:
+                job = self._pending
+                self._pending = None
+                self._wake.clear()
+            if self._closed.is_set():
+                return
+            if job is not None:
+                self._build(*job)
+
+    def _build(
+        self,
+        channels: Dict[str, Any],
+        lap_time_s: float,
+        track_len_m: Optional[float],
+        thresholds: Tuple[float, float, float],
+    ) -> None:
+        try:
+            minutes, seconds = divmod(lap_time_s, 60.0)
+            lap = ReferenceLap(f"Live PB {int(minutes)}:{seconds:06.3f}", *thresholds, channels=channels)
+            lap.lap_time_s = lap_time_s
+            if track_len_m:
+                lap.track_length_m = track_len_m
+            self._ready.put((lap, self._grid.build_row(lap)))
+        except Exception as exc:
+            self._logger.warning("Failed to build live reference lap: %s", exc)
+
+    def poll(self) -> Optional[Tuple[ReferenceLap, Tuple[Any, ...]]]:
+        """Return the fastest lap finished since the last poll, if any."""
+        fastest = None
+        try:
+            while True:
+                ready = self._ready.get_nowait()
+                if fastest is None or ready[0].lap_time_s < fastest[0].lap_time_s:
+                    fastest = ready
+        except queue.Empty:
+            return fastest
+
+
+class ReferenceCache:
+    """In-process LRU cache of built reference laps under a byte budget.
+
+    Entries are keyed by source file identity (path, size, mtime) plus the
+    extraction settings, and sized exactly from their typed-array columns.
+    """
+
+    def __init__(self, budget_bytes: int) -> None:
+        self.budget_bytes = budget_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[ReferenceLap, Tuple[Any, ...], int]]" = OrderedDict()
+
+    @staticmethod
+    def key_for(path: str, thresholds: Tuple[float, float, float], grid_points: int) -> Optional[Tuple[Any, ...]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, tuple(thresholds), grid_points)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Optional[Tuple[Any, ...]]) -> Optional[Tuple[ReferenceLap, Tuple[Any, ...]]]:
+        with self._lock:
+            entry = self._entries.get(key) if key is not None else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, key: Optional[Tuple[Any, ...]], lap: ReferenceLap, row: Tuple[Any, ...]) -> None:
+        if key is None:
+            return
+        size = lap.nbytes() + ReferenceSet.row_nbytes(row)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= previous[2]
+            if size > self.budget_bytes:
+                return
+            self._entries[key] = (lap, row, size)
+            self.size_bytes += size
+            self._evict()
+
+    def rekey(self, lap: ReferenceLap, thresholds: Tuple[float, float, float]) -> None:
+        """File ``lap`` under ``thresholds`` after its events were rebuilt in place.
+
+        Entries hand out the cached lap itself, so once refresh_thresholds has
+        run, the key it was stored under would otherwise serve the new events.
+        """
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[0] is lap]:
+                entry = self._entries.pop(key)
+                new_key = key[:3] + (tuple(thresholds),) + key[4:]
+                previous = self._entries.pop(new_key, None)
+                if previous is not None:
+                    self.size_bytes -= previous[2]
+                self._entries[new_key] = entry
+
+    def set_budget(self, budget_bytes: int) -> None:
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            self._evict()
+
+    def _evict(self) -> None:
+        while self.size_bytes > self.budget_bytes and self._entries:
+            _key, (_lap, _row, size) = self._entries.popitem(last=False)
+            self.size_bytes -= size
+            self.evictions += 1
+
+    def stats_text(self) -> str:
+        return (
+            f"Reference cache {len(self._entries)} laps | {self.size_bytes / 1048576:.1f}/"
+            f"{self.budget_bytes / 1048576:.0f} MB | hits {self.hits} | misses {self.misses} | "
+            f"evictions {self.evictions}"
+        )
+
+
+@dataclass
+class ReferenceLoadResult:
+    path: str
+    primary: bool
+    lap: Optional[ReferenceLap] = None
+    row: Optional[Tuple[Any, ...]] = None
+    error: Optional[Exception] = None
+    cancelled: bool = False
+
+
+class ReferenceLoader:
+    """Builds reference laps on a background thread.
+
+    Progress is exposed through ``progress_text`` and finished loads are
+    collected on the UI thread with ``poll``, so the caller can swap the new
+    lap in between frames while the old one keeps driving the overlay.
+    """
+
+    def __init__(self, logger: logging.Logger, grid: ReferenceSet, cache: Optional[ReferenceCache] = None) -> None:
+        self._logger = logger
+        self._grid = grid
+        self._cache = cache
+        self._results: queue.Queue[ReferenceLoadResult] = queue.Queue()
+        self._cancel: Optional[threading.Event] = None
+        self._progress: Tuple[float, str] = (0.0, "")
+        self._pending = 0
+
+    @property
+    def busy(self) -> bool:
+        return self._pending > 0
+
+    def progress_text(self) -> str:
+        fraction, step = self._progress
+        return f"Loading reference {fraction * 100:.0f}% ({step})"
+
+    def start(
+        self,
+        path: str,
+        thresholds: Tuple[float, float, float],
+        primary: bool = True,
+    ) -> None:
+        """Start loading ``path``; an in-flight load is cancelled first.
+
+        Cache hits skip the worker thread and are ready on the next ``poll``.
+        """
+        self.cancel()
+        self._pending += 1
+        color = DEFAULT_REF_THROTTLE_COLOR if primary else self._grid.next_color()
+        key = None
+        cached = None
+        if self._cache is not None:
+            key = ReferenceCache.key_for(path, thresholds, self._grid.grid_points)
+            cached = self._cache.get(key)
+        if cached is not None:
+            lap, row = cached
+            self._results.put(
+                ReferenceLoadResult(path=path, primary=primary, lap=lap, row=ReferenceSet.restyle_row(row, color))
+            )
+            return
+        cancel = threading.Event()
+        self._cancel = cancel
+        self._progress = (0.0, "queued")
+        threading.Thread(
+            target=self._run,
+            args=(path, thresholds, primary, color, cancel, key),
+            daemon=True,
+        ).start()
+
+    def cancel(self) -> None:
+        if self._cancel is not None:
+            self._cancel.set()
+            self._cancel = None
+
+    def _run(
+        self,
+        path: str,
+        thresholds: Tuple[float, float, float],
+        primary: bool,
+        color: str,
+        cancel: threading.Event,
+        key: Optional[Tuple[Any, ...]],
+    ) -> None:
+        result = ReferenceLoadResult(path=path, primary=primary)
+
+        def report(fraction: float, step: str) -> None:
+            if not cancel.is_set():
+                self._progress = (fraction, step)
+
+        try:
+            lap = ReferenceLap(path, *thresholds, progress=report, cancel=cancel)
+            report(0.9, "aligning")
+            row = self._grid.build_row(lap, color)
+            if cancel.is_set():
+                raise ReferenceLoadCancelled(path)
+            result.lap = lap
+            result.row = row
+            if self._cache is not None:
+                self._cache.put(key, lap, row)
+        except ReferenceLoadCancelled:
+            result.cancelled = True
+        except Exception as exc:
+            self._logger.warning("Failed to load reference %s: %s", path, exc)
+            result.error = exc
+        self._results.put(result)
+
+    def poll(self) -> Optional[ReferenceLoadResult]:
+        try:
+            result = self._results.get_nowait()
+        except queue.Empty:
+            return None
+        self._pending -= 1
+        return result
+
+
+def _yaml_value(text: str, key: str, indent: int = 1) -> Optional[str]:
+    match = re.search(rf"^ {{{indent}}}{re.escape(key)}: *(.*?) *$", text, re.M)
+    if not match:
+        return None
+    return match.group(1).strip("'\"") or None
+
+
+def read_ibt_metadata(path: str) -> Dict[str, Any]:
+    """Read track, car, date and best lap from an IBT header and session YAML.
+
+    Only the fixed headers and the session info string are read, never the
+    sample data, so this stays cheap even for multi-hour files. The YAML is
+    scanned with a few anchored patterns instead of a full parse.
+    """
+    with open(path, "rb") as fh:
+        header = fh.read(IBT_HEADER_SIZE + struct.calcsize(IBT_DISK_HEADER_FORMAT))
+        if len(header) < IBT_HEADER_SIZE + struct.calcsize(IBT_DISK_HEADER_FORMAT):
+            raise ValueError("File too short for an IBT header")
+        session_len, session_offset = struct.unpack_from("<ii", header, 16)
+        start_date, _start_time, _end_time, lap_count, _records = struct.unpack_from(
+            IBT_DISK_HEADER_FORMAT, header, IBT_HEADER_SIZE
+        )
+        fh.seek(session_offset)
+        text = fh.read(session_len).rstrip(b"\0").decode("latin-1")
+
+    car_idx_text = _yaml_value(text, "DriverCarIdx")
+    car_idx = int(car_idx_text) if car_idx_text and car_idx_text.isdigit() else None
+    car_path = None
+    car_name = None
+    best_lap_s = None
+    if car_idx is not None:
+        for block in re.split(r"^ - (?=CarIdx:)", text, flags=re.M)[1:]:
+            if _yaml_value(block, "CarIdx", indent=0) == str(car_idx):
+                car_path = _yaml_value(block, "CarPath", indent=3)
+                car_name = _yaml_value(block, "CarScreenName", indent=3)
+                break
+        for match in re.finditer(r"^( *)- Position: \d+\n((?:\1  .*\n)*)", text, re.M):
+            body = match.group(2)
+            if re.search(rf"^ *CarIdx: {car_idx}$", body, re.M) is None:
+                continue
+            fastest = re.search(r"^ *FastestTime: ([-\d.]+)$", body, re.M)
+            if fastest and float(fastest.group(1)) > 0:
+                lap_s = float(fastest.group(1))
+                best_lap_s = lap_s if best_lap_s is None else min(best_lap_s, lap_s)
+
+    return {
+        "track": _yaml_value(text, "TrackName"),
+        "track_config": _yaml_value(text, "TrackConfigName"),
+        "car": car_path,
+        "car_name": car_name,
+        "date": float(start_date) if start_date > 0 else None,
+        "lap_count": lap_count,
+        "best_lap_s": best_lap_s,
+    }
+
+
+@dataclass
+class LibraryEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    track: Optional[str] = None
+    track_config: Optional[str] = None
+    car: Optional[str] = None
+    car_name: Optional[str] = None
+    date: Optional[float] = None
+    lap_count: int = 0
+    best_lap_s: Optional[float] = None
+    error: Optional[str] = None
+
+
+def _scan_library_file(item: Tuple[str, int, int]) -> LibraryEntry:
+    path, size, mtime_ns = item
+    try:
+        return LibraryEntry(path=path, size=size, mtime_ns=mtime_ns, **read_ibt_metadata(path))
+    except Exception as exc:
+        return LibraryEntry(path=path, size=size, mtime_ns=mtime_ns, error=str(exc))
+
+
+class ReferenceLibrary:
+    """Persistent index of IBT files keyed by track, configuration and car.
+
+    ``scan`` walks a directory tree, re-reads only files whose size or mtime
+    changed since the last scan (in a process pool) and drops files that are
+    gone. ``find`` picks the fastest matching reference for the live session.
+    """
+
+    def __init__(self, logger: logging.Logger, index_path: str = DEFAULT_LIBRARY_INDEX_PATH) -> None:
+        self._logger = logger
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, LibraryEntry] = {}
+        self.root: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self) -> None:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as fh:
+                raw = json.load(fh)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            self._logger.warning("Ignoring unreadable library index %s: %s", self.index_path, exc)
+            return
+        self.root = raw.get("root")
+        entries = {}
+        for item in raw.get("entries", []):
+            try:
+                entry = LibraryEntry(**item)
+            except TypeError:
+                continue
+            entries[entry.path] = entry
+        with self._lock:
+            self._entries = entries
+
+    def save(self) -> None:
+        with self._lock:
+            entries = [asdict(entry) for entry in self._entries.values()]
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump({"version": 1, "root": self.root, "entries": entries}, fh)
+        os.replace(tmp_path, self.index_path)
+
+    def scan(self, root: str, workers: Optional[int] = None) -> Tuple[int, int, int]:
+        """Update the index for ``root``; returns (rescanned, removed, total)."""
+        root = os.path.abspath(root)
+        self.root = root
+        found: Dict[str, Tuple[str, int, int]] = {}
+        for dirpath, _dirnames, filenames in os.walk(root):
+            for name in filenames:
+                if not name.lower().endswith(".ibt"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found[path] = (path, stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            entries = dict(self._entries)
+        prefix = root.rstrip(os.sep) + os.sep
+        removed = [path for path in entries if path.startswith(prefix) and path not in found]
+        for path in removed:
+            del entries[path]
+        stale = [
+            item
+            for path, item in found.items()
+            if path not in entries or (entries[path].size, entries[path].mtime_ns) != item[1:]
+        ]
+        if stale:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for entry in pool.map(_scan_library_file, stale, chunksize=32):
+                    entries[entry.path] = entry
+        with self._lock:
+            self._entries = entries
+        return len(stale), len(removed), len(found)
+
+    def find(self, track: Optional[str], track_config: Optional[str], car: Optional[str]) -> Optional[LibraryEntry]:
+        if not track:
+            return None
+        with self._lock:
+            candidates = [
+                entry
+                for entry in self._entries.values()
+                if entry.error is None
+                and entry.track == track
+                and (not track_config or entry.track_config == track_config)
+                and (not car or entry.car == car)
+            ]
+        if not candidates:
+            return None
+        # Fastest known lap first, newest file breaks ties and ranks unknown times.
+        return min(
+            candidates,
+            key=lambda entry: (
+                entry.best_lap_s is None,
+                entry.best_lap_s or 0.0,
+                -(entry.date or 0.0),
+            ),
+        )
 
 
 class TelemetryWorker(threading.Thread):
-    def __init__(self, logger: logging.Logger) -> None:
+    def __init__(self, logger: logging.Logger, lap_recorder: Optional[LiveLapRecorder] = None) -> None:
         super().__init__(daemon=True)
+        self._lap_recorder = lap_recorder
         self._stop_event = threading.Event()
         self._lock = threading.Lock()
         self._snapshot = TelemetrySnapshot()
+        self._seq = 0
         self._logger = logger
+        self._channels: Tuple[str, ...] = ()
+        # Swapped from the UI thread with set_shared_ring; written here at sim rate under _ring_lock.
+        self.shared_ring: Optional[SharedTelemetryRing] = None
+        self._ring_lock = threading.Lock()
+        self.reference: Optional[ReferenceLap] = None
+        self._event_index = EventIndex()
+        # Track and car, re-derived from the session YAML when SessionInfoUpdate changes.
+        self._session_update: Optional[int] = None
+        self._session: Tuple[Optional[float], Optional[str], Optional[str], Optional[str]] = (None, None, None, None)
+
+    def subscribe(self, names: Sequence[str]) -> None:
+        """Poll these extra channels from now on; everything else is left unread."""
+        self._channels = tuple(names)
 
     def run(self) -> None:
+        _import_irsdk()
         ir = irsdk.IRSDK()
         while not self._stop_event.is_set():
             try:
                 if not ir.is_initialized or not ir.is_connected:
                     ir.startup()
                     if not ir.is_initialized or not ir.is_connected:
-                        self._set_snapshot(TelemetrySnapshot(connected=False, timestamp=time.time()))
-                        time.sleep(0.5)
+                        self._publish(TelemetrySnapshot(connected=False, timestamp=time.time()))
+                        self._stop_event.wait(0.5)
                         continue
+                    self._session_update = None  # A new connection may be a new session
 
-                track_length_km = self._safe_read(ir, "TrackLength")
-                track_name = self._safe_session_info(ir, "WeekendInfo", "TrackName")
-                if track_length_km is None:
-                    track_length_km = self._parse_track_length_km(
-                        self._safe_session_info(ir, "WeekendInfo", "TrackLength")
-                    )
-
-                snapshot = TelemetrySnapshot(
-                    connected=True,
-                    timestamp=time.time(),
-                    lap_pct=self._safe_read(ir, "LapDistPct"),
-                    throttle=self._safe_read(ir, "Throttle"),
-                    brake=self._safe_read(ir, "Brake"),
-                    steering=self._safe_read(ir, "SteeringWheelAngle"),
-                    gear=self._safe_read(ir, "Gear"),
-                    speed_mps=self._safe_read(ir, "Speed"),
-                    track_length_km=track_length_km,
-                    lap=self._safe_read(ir, "Lap"),
-                    session_time=self._safe_read(ir, "SessionTime"),
-                    track_name=track_name,
-                )
-                self._set_snapshot(snapshot)
+                self._publish(self._read_snapshot(ir))
                 # High frequency polling for smooth overlays
-                time.sleep(0.008)
+                self._stop_event.wait(0.008)
             except Exception as exc:
                 self._logger.warning("Telemetry worker error: %s", exc)
-                self._set_snapshot(TelemetrySnapshot(connected=False, timestamp=time.time()))
-                time.sleep(0.5)
+                self._publish(TelemetrySnapshot(connected=False, timestamp=time.time()))
+                self._stop_event.wait(0.5)
+
+    def _read_snapshot(self, ir: irsdk.IRSDK) -> TelemetrySnapshot:
+        """One connected sample; track and car come from the cached session info."""
+        track_length_km, track_name, track_config, car_path = self._read_session(ir)
+        live_track_length_km = self._safe_read(ir, "TrackLength")
+        return TelemetrySnapshot(
+            connected=True,
+            timestamp=time.time(),
+            tick=self._safe_read(ir, "SessionTick"),
+            lap_pct=self._safe_read(ir, "LapDistPct"),
+            throttle=self._safe_read(ir, "Throttle"),
+            brake=self._safe_read(ir, "Brake"),
+            steering=self._safe_read(ir, "SteeringWheelAngle"),
+            gear=self._safe_read(ir, "Gear"),
+            speed_mps=self._safe_read(ir, "Speed"),
+            track_length_km=live_track_length_km if live_track_length_km is not None else track_length_km,
+            lap=self._safe_read(ir, "Lap"),
+            session_time=self._safe_read(ir, "SessionTime"),
+            track_name=track_name,
+            track_config=track_config,
+            car_path=car_path,
+            on_pit_road=self._safe_read(ir, "OnPitRoad"),
+            lat=self._safe_read(ir, "Lat"),
+            lon=self._safe_read(ir, "Lon"),
+            extras={name: self._safe_read(ir, name) for name in self._channels} if self._channels else _NO_EXTRAS,
+        )
+
+    def _read_session(
+        self, ir: irsdk.IRSDK
+    ) -> Tuple[Optional[float], Optional[str], Optional[str], Optional[str]]:
+        """(track length km, track name, track config, player car path) from the session YAML.
+
+        pyirsdk exposes each top-level YAML section under its own key
+        (``ir["WeekendInfo"]``, ``ir["DriverInfo"]``). Parsing them is slow,
+        so they are re-read only when SessionInfoUpdate changes.
+        """
+        update = self._safe_read(ir, "SessionInfoUpdate")
+        if update is not None and update == self._session_update:
+            return self._session
+        self._session_update = update
+        weekend = self._safe_read(ir, "WeekendInfo")
+        if not isinstance(weekend, dict):
+            weekend = {}
+        self._session = (
+            self._parse_track_length_km(weekend.get("TrackLength")),
+            weekend.get("TrackName"),
+            weekend.get("TrackConfigName"),
+            self._player_car_path(self._safe_read(ir, "DriverInfo")),
+        )
+        return self._session
 
     def _safe_read(self, ir: irsdk.IRSDK, key: str):
         try:
@@ -296,16 +2198,18 @@ class TelemetryWorker(threading.Thread):
         except Exception:
             return None
 
-    def _safe_session_info(self, ir: irsdk.IRSDK, *path: str) -> Optional[Any]:
-        try:
-            info = ir["SessionInfo"]
-            for key in path:
-                if not isinstance(info, dict):
-                    return None
-                info = info.get(key)
-            return info
-        except Exception:
+    @staticmethod
+    def _player_car_path(driver_info: Any) -> Optional[str]:
+        if not isinstance(driver_info, dict):
+            return None
+        car_idx = driver_info.get("DriverCarIdx")
+        drivers = driver_info.get("Drivers")
+        if car_idx is None or not isinstance(drivers, list):
             return None
+        for driver in drivers:
+            if isinstance(driver, dict) and driver.get("CarIdx") == car_idx:
+                return driver.get("CarPath")
+        return None
 
     def _parse_track_length_km(self, value: Optional[str]) -> Optional[float]:
         if not value or not isinstance(value, str):
@@ -321,9 +2225,53 @@ class TelemetryWorker(threading.Thread):
         except ValueError:
             return None
 
-    def _set_snapshot(self, snapshot: TelemetrySnapshot) -> None:
+    def _publish(self, snapshot: TelemetrySnapshot) -> None:
+        changed = self._set_snapshot(snapshot)
+        if self._lap_recorder:
+            self._lap_recorder.add(snapshot)
+        if changed and self.shared_ring is not None:
+            with self._ring_lock:
+                ring = self.shared_ring
+                if ring is not None:
+                    self._write_shared(ring, snapshot)
+
+    def set_shared_ring(self, ring: Optional[SharedTelemetryRing]) -> Optional[SharedTelemetryRing]:
+        """Publish to ``ring`` from now on and return the previous one.
+
+        Blocks until any write in progress has finished, so the returned ring
+        is no longer touched by this worker and can be closed or handed on.
+        """
+        with self._ring_lock:
+            previous, self.shared_ring = self.shared_ring, ring
+        return previous
+
+    def _write_shared(self, ring: SharedTelemetryRing, snapshot: TelemetrySnapshot) -> None:
+        lap_pct = snapshot.lap_pct
+        if lap_pct is not None and lap_pct > 1.5:
+            lap_pct /= 100.0
+        ref = self.reference
+        ref_values = None
+        next_event = None
+        if ref is not None and lap_pct is not None:
+            ref_values = (
+                ref.ref_at_pct(ref.throttle, lap_pct),
+                ref.ref_at_pct(ref.brake, lap_pct),
+                ref.ref_at_pct(ref.speed, lap_pct),
+            )
+            track_len_m = (snapshot.track_length_km or 0.0) * 1000.0 or ref.track_length_m or ASSUMED_TRACK_LEN_M
+            self._event_index.sync(ref, track_len_m)
+            next_event = next_reference_event(self._event_index, lap_pct)
+        ring.write(pack_broadcast_frame(snapshot, lap_pct, ref_values, next_event))
+
+    def _set_snapshot(self, snapshot: TelemetrySnapshot) -> bool:
+        """Publish a snapshot, advancing the sequence only when values moved."""
         with self._lock:
+            if self._seq and snapshot == self._snapshot:
+                return False
+            self._seq += 1
+            snapshot.seq = self._seq
             self._snapshot = snapshot
+            return True
 
     def get_snapshot(self) -> TelemetrySnapshot:
         with self._lock:
@@ -332,22 +2280,1004 @@ class TelemetryWorker(threading.Thread):
     def stop(self) -> None:
         self._stop_event.set()
 
+    def stats_text(self) -> str:
+        return "Acquisition: thread"
+
+
+class _RingTelemetryWorker(TelemetryWorker):
+    """Acquisition-process side: hands changed snapshots to the UI process through a ring."""
+
+    def __init__(self, logger: logging.Logger, ring: SharedTelemetryRing) -> None:
+        super().__init__(logger)
+        self._ring = ring
+
+    def _publish(self, snapshot: TelemetrySnapshot) -> None:
+        if not self._set_snapshot(snapshot):
+            return
+        try:
+            self._ring.write(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+        except ValueError as exc:
+            self._logger.warning("Dropped telemetry snapshot: %s", exc)
+
+
+def _handoff_slot_bytes() -> int:
+    """Ring slot size for pickled snapshots, measured from a worst case.
+
+    The sample carries every optional channel and full CarIdx arrays of
+    floats; the slot is twice its pickle, rounded up to a KiB.
+    """
+    extras: Dict[str, Any] = {spec.name: 0.5 + index for index, spec in enumerate(CHANNEL_REGISTRY)}
+    for name in CAR_IDX_CHANNELS:
+        extras[name] = [0.5 + slot for slot in range(CAR_IDX_SLOTS)]
+    label = "x" * 128
+    sample = TelemetrySnapshot(
+        connected=True,
+        timestamp=time.time(),
+        seq=2**31,
+        tick=2**31,
+        lap_pct=0.5,
+        throttle=0.5,
+        brake=0.5,
+        steering=0.5,
+        gear=3,
+        speed_mps=50.5,
+        track_length_km=5.5,
+        lap=100,
+        session_time=10000.5,
+        track_name=label,
+        track_config=label,
+        car_path=label,
+        on_pit_road=False,
+        lat=45.5,
+        lon=9.5,
+        extras=extras,
+    )
+    size = len(pickle.dumps(sample, protocol=pickle.HIGHEST_PROTOCOL))
+    return -(-2 * size // 1024) * 1024
+
+
+_HANDOFF_RING_IDS = itertools.count(1)
+
+
+def _acquisition_process_main(ring_name: str, stop: Any, control: Any, channels: Sequence[str]) -> None:
+    """Entry point of the acquisition process started by TelemetryProcessWorker."""
+    logging.basicConfig(level=logging.INFO, format="acquisition: %(message)s")
+    logger = logging.getLogger("nishizumi_acquisition")
+    ring = SharedTelemetryRing(ring_name, create=False)
+    worker = _RingTelemetryWorker(logger, ring)
+    worker.subscribe(channels)
+
+    def watch_control() -> None:
+        while not stop.is_set():
+            try:
+                worker.subscribe(control.get(timeout=0.2))
+            except queue.Empty:
+                pass
+        worker.stop()
+
+    threading.Thread(target=watch_control, daemon=True).start()
+    try:
+        worker.run()
+    finally:
+        ring.close()
+
+
+class TelemetryProcessWorker(TelemetryWorker):
+    """Runs SDK acquisition in a child process and republishes its snapshots here.
+
+    The child decodes telemetry with its own GIL and writes pickled snapshots
+    into a SharedTelemetryRing; this thread only drains the ring, so Tk drawing
+    can no longer delay SDK reads. The child is restarted with backoff if it
+    dies, and the handoff latency (read in the child to publish here) is
+    tracked for the Debug tab.
+    """
+
+    POLL_S = 0.002
+    MAX_BACKOFF_S = 5.0
+
+    def __init__(self, logger: logging.Logger, lap_recorder: Optional[LiveLapRecorder] = None) -> None:
+        super().__init__(logger, lap_recorder)
+        self._ctx = multiprocessing.get_context("spawn")
+        # Unique per worker: a restarted worker must never share the old one's segment.
+        self._ring_name = f"nishizumi_acq_{os.getpid()}_{next(_HANDOFF_RING_IDS)}"
+        self._ring = SharedTelemetryRing(
+            self._ring_name, slots=DEFAULT_HANDOFF_SLOTS, frame_size=_handoff_slot_bytes()
+        )
+        self._reader = SharedTelemetryReader(self._ring_name, ring=self._ring)
+        self._process_stop = self._ctx.Event()
+        self._control = self._ctx.Queue()
+        self._process: Optional[Any] = None
+        self.restarts = 0
+        self.handoffs = 0
+        self.latency_ms = 0.0
+        self.latency_max_ms = 0.0
+
+    def subscribe(self, names: Sequence[str]) -> None:
+        super().subscribe(names)
+        self._control.put(tuple(names))
+
+    def _spawn(self) -> None:
+        self._process = self._ctx.Process(
+            target=_acquisition_process_main,
+            args=(self._ring_name, self._process_stop, self._control, self._channels),
+            name="nishizumi-acquisition",
+            daemon=True,
+        )
+        self._process.start()
+        self._logger.info("Telemetry acquisition process started (pid %s)", self._process.pid)
+
+    def run(self) -> None:
+        backoff = 0.5
+        try:
+            self._spawn()
+            while not self._stop_event.is_set():
+                frames = self._reader.poll()
+                for data in frames:
+                    snapshot = pickle.loads(data)
+                    latency_ms = (time.time() - snapshot.timestamp) * 1000.0
+                    self.latency_ms += (latency_ms - self.latency_ms) * 0.05
+                    self.latency_max_ms = max(self.latency_max_ms, latency_ms)
+                    self.handoffs += 1
+                    self._publish(snapshot)
+                if frames:
+                    backoff = 0.5
+                if not self._process.is_alive():
+                    self.restarts += 1
+                    self._logger.warning(
+                        "Acquisition process exited with code %s; restarting in %.1fs",
+                        self._process.exitcode,
+                        backoff,
+                    )
+                    self._publish(TelemetrySnapshot(connected=False, timestamp=time.time()))
+                    if self._stop_event.wait(backoff):
+                        break
+                    backoff = min(self.MAX_BACKOFF_S, backoff * 2)
+                    self._spawn()
+                elif not frames:
+                    self._stop_event.wait(self.POLL_S)
+        except Exception as exc:
+            self._logger.error("Acquisition supervisor failed: %s", exc)
+        finally:
+            self._shutdown()
+
+    def _shutdown(self) -> None:
+        self._process_stop.set()
+        if self._process is not None:
+            self._process.join(timeout=2.0)
+            if self._process.is_alive():
+                self._process.terminate()
+        self._reader.close()
+        self._ring.close()
+
+    def stats_text(self) -> str:
+        pid = self._process.pid if self._process is not None else "-"
+        return (
+            f"Acquisition: process {pid} | restarts {self.restarts} | handoffs {self.handoffs} | "
+            f"latency {self.latency_ms:.2f}ms (max {self.latency_max_ms:.2f}ms)"
+        )
+
+
+BROADCAST_MAGIC = b"NIBT"
+BROADCAST_VERSION = 1
+# magic, version, flags, gear, seq, tick, session time, wall time, lap pct, throttle, brake,
+# steering, speed, ref throttle, ref brake, ref speed, speed delta kph, next event kind, next event m.
+# Missing values are NaN; flags bit 0 = connected, bit 1 = reference loaded.
+BROADCAST_FRAME = struct.Struct("<4sBBhIiddfffffffffB3xf")
+BROADCAST_EVENT_KINDS = ("", "brake", "lift", "power")
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WEBSOCKET_OP_CLOSE = 0x8
+WEBSOCKET_OP_PING = 0x9
+WEBSOCKET_OP_PONG = 0xA
+WEBSOCKET_MAX_CLIENT_FRAME = 1 << 16  # Clients only send control frames and small messages
+WEBSOCKET_MAX_CLIENTS = 8  # Each client costs a sender and a reader thread
+WEBSOCKET_REQUEST_LINE = re.compile(rb"GET \S+ HTTP/1\.[1-9]")
+SHARED_RING_MAGIC = b"NSHM"
+SHARED_RING_VERSION = 1
+# magic, version, header size, slot size, slot count, write count, owner pid (padded to 32 bytes)
+SHARED_RING_HEADER = struct.Struct("<4sHHIIQI4x")
+SHARED_RING_WRITE_COUNT = struct.Struct("<Q")
+SHARED_RING_WRITE_COUNT_OFFSET = 16
+SHARED_RING_SLOT_HEADER = struct.Struct("<IIQ")  # sequence lock, payload length, frame index
+
+
+def pack_broadcast_frame(
+    snapshot: TelemetrySnapshot,
+    lap_pct: Optional[float],
+    ref_values: Optional[Tuple[float, float, float]],
+    next_event: Optional[Tuple[str, float]],
+) -> bytes:
+    """Encode one processed telemetry tick as a fixed-layout BROADCAST_FRAME."""
+    nan = float("nan")
+
+    def value(x: Optional[float]) -> float:
+        return nan if x is None else float(x)
+
+    ref_throttle, ref_brake, ref_speed = ref_values if ref_values is not None else (nan, nan, nan)
+    speed_delta_kph = nan
+    if ref_values is not None and snapshot.speed_mps is not None:
+        speed_delta_kph = (snapshot.speed_mps - ref_speed) * 3.6
+    event_kind, event_m = next_event if next_event is not None else ("", nan)
+    return BROADCAST_FRAME.pack(
+        BROADCAST_MAGIC,
+        BROADCAST_VERSION,
+        (1 if snapshot.connected else 0) | (2 if ref_values is not None else 0),
+        clamp(snapshot.gear or 0, -32768, 32767),
+        snapshot.seq & 0xFFFFFFFF,
+        snapshot.tick if snapshot.tick is not None else -1,
+        value(snapshot.session_time),
+        snapshot.timestamp,
+        value(lap_pct),
+        value(snapshot.throttle),
+        value(snapshot.brake),
+        value(snapshot.steering),
+        value(snapshot.speed_mps),
+        ref_throttle,
+        ref_brake,
+        ref_speed,
+        speed_delta_kph,
+        BROADCAST_EVENT_KINDS.index(event_kind) if event_kind in BROADCAST_EVENT_KINDS else 0,
+        event_m,
+    )
+
+
+def unpack_broadcast_frame(data: bytes) -> Dict[str, Any]:
+    """Decode a BROADCAST_FRAME into a dict; raises ValueError on foreign data."""
+    if len(data) != BROADCAST_FRAME.size:
+        raise ValueError(f"expected {BROADCAST_FRAME.size} bytes, got {len(data)}")
+    fields = BROADCAST_FRAME.unpack(data)
+    if fields[0] != BROADCAST_MAGIC or fields[1] != BROADCAST_VERSION:
+        raise ValueError("not a version 1 Nishizumi frame")
+    names = (
+        "gear", "seq", "tick", "session_time", "timestamp", "lap_pct", "throttle", "brake", "steering",
+        "speed_mps", "ref_throttle", "ref_brake", "ref_speed_mps", "speed_delta_kph",
+    )
+    frame: Dict[str, Any] = dict(zip(names, fields[3:17]))
+    frame["connected"] = bool(fields[2] & 1)
+    frame["has_reference"] = bool(fields[2] & 2)
+    frame["next_event"] = BROADCAST_EVENT_KINDS[fields[17]] if fields[17] < len(BROADCAST_EVENT_KINDS) else ""
+    frame["next_event_m"] = fields[18]
+    return frame
+
+
+def next_reference_event(index: EventIndex, lap_pct: float) -> Optional[Tuple[str, float]]:
+    """(kind, metres ahead) of the next reference event, wrapping past the line."""
+    upcoming = index.next_event(lap_pct)
+    return (upcoming.event.kind, upcoming.dist_m) if upcoming is not None else None
+
+
+class _BroadcastClient:
+    """One destination with a latest-frame slot and its own sender thread.
+
+    publish() only overwrites the slot, so a slow or stalled client drops
+    intermediate frames instead of blocking the producer.
+    """
+
+    def __init__(self, name: str, send: Callable[[bytes], None], max_hz: float, logger: logging.Logger) -> None:
+        self.name = name
+        self._send = send
+        self._interval = 1.0 / max(1.0, max_hz)
+        self._logger = logger
+        self._lock = threading.Lock()
+        self._pending: Optional[bytes] = None
+        self._wake = threading.Event()
+        self.closed = threading.Event()
+        self.sent = 0
+        self.dropped = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def offer(self, frame: bytes) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = frame
+        self._wake.set()
+
+    def close(self) -> None:
+        self.closed.set()
+        self._wake.set()
+
+    def _run(self) -> None:
+        next_send = 0.0
+        while not self.closed.is_set():
+            self._wake.wait()
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                # Rate limit: frames arriving meanwhile coalesce into the slot.
+                self.closed.wait(delay)
+            with self._lock:
+                frame = self._pending
+                self._pending = None
+                self._wake.clear()
+            if frame is None or self.closed.is_set():
+                continue
+            try:
+                self._send(frame)
+                self.sent += 1
+            except (BlockingIOError, InterruptedError):
+                self.dropped += 1
+            except OSError as exc:
+                self._logger.info("Broadcast client %s disconnected: %s", self.name, exc)
+                self.closed.set()
+            next_send = time.monotonic() + self._interval
+
+
+class TelemetryBroadcaster:
+    """Publishes BROADCAST_FRAMEs to UDP targets and WebSocket clients.
+
+    publish() is O(clients) slot writes and never touches a socket, so it is
+    safe to call from the telemetry or UI thread.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        udp_targets: Sequence[Tuple[str, int]] = (),
+        ws_port: Optional[int] = None,
+        max_hz: float = DEFAULT_BROADCAST_MAX_HZ,
+        ws_host: str = BROADCAST_WS_LOCAL_HOST,
+    ) -> None:
+        self._logger = logger
+        self._max_hz = max_hz
+        self._clients: List[_BroadcastClient] = []
+        self._clients_lock = threading.Lock()
+        # Held from accept until the client's reader exits, so pending handshakes count too.
+        self._ws_slots = threading.BoundedSemaphore(WEBSOCKET_MAX_CLIENTS)
+        self._udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._udp.setblocking(False)
+        for host, port in udp_targets:
+            target = (host, port)
+            self._add_client(f"udp://{host}:{port}", lambda frame, target=target: self._send_udp(frame, target))
+        self._server: Optional[socket.socket] = None
+        if ws_port:
+            self._server = socket.create_server((ws_host, ws_port))
+            threading.Thread(target=self._accept_loop, daemon=True).start()
+        self.last_seq: Optional[int] = None
+
+    def _send_udp(self, frame: bytes, target: Tuple[str, int]) -> None:
+        try:
+            self._udp.sendto(frame, target)
+        except ConnectionError:
+            pass  # Nobody listening right now; UDP targets stay subscribed.
+
+    def _add_client(self, name: str, send: Callable[[bytes], None]) -> _BroadcastClient:
+        client = _BroadcastClient(name, send, self._max_hz, self._logger)
+        with self._clients_lock:
+            self._clients.append(client)
+        return client
+
+    def publish(self, frame: bytes, seq: Optional[int] = None) -> None:
+        """Offer a frame to every client; repeated ``seq`` values are sent once per tick."""
+        if seq is not None:
+            if seq == self.last_seq:
+                return
+            self.last_seq = seq
+        with self._clients_lock:
+            if any(client.closed.is_set() for client in self._clients):
+                self._clients = [client for client in self._clients if not client.closed.is_set()]
+            clients = self._clients
+        for client in clients:
+            client.offer(frame)
+
+    def stats_text(self) -> str:
+        with self._clients_lock:
+            clients = list(self._clients)
+        if not clients:
+            return "Broadcast: no clients"
+        return "Broadcast: " + ", ".join(f"{c.name} sent {c.sent} dropped {c.dropped}" for c in clients)
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        with self._clients_lock:
+            for client in self._clients:
+                client.close()
+            self._clients = []
+        self._udp.close()
+
+    def _accept_loop(self) -> None:
+        while True:
+            try:
+                conn, addr = self._server.accept()
+            except OSError:
+                return
+            if not self._ws_slots.acquire(blocking=False):
+                self._logger.info("WebSocket client from %s refused: %d clients connected", addr[0], WEBSOCKET_MAX_CLIENTS)
+                _refuse_websocket(conn, "503 Service Unavailable")
+                continue
+            threading.Thread(target=self._handshake, args=(conn, addr), daemon=True).start()
+
+    def _handshake(self, conn: socket.socket, addr: Tuple[str, int]) -> None:
+        try:
+            conn.settimeout(5.0)
+            request = b""
+            while b"\r\n\r\n" not in request and len(request) < 8192:
+                chunk = conn.recv(1024)
+                if not chunk:
+                    raise OSError("closed during handshake")
+                request += chunk
+            try:
+                key = _websocket_upgrade_key(request)
+            except ValueError as exc:
+                self._logger.info("WebSocket handshake from %s rejected: %s", addr[0], exc)
+                _refuse_websocket(conn, "400 Bad Request")
+                self._ws_slots.release()
+                return
+            accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID.encode("ascii")).digest()).decode("ascii")
+            conn.sendall(
+                (
+                    "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                    f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+                ).encode("ascii")
+            )
+            conn.settimeout(2.0)  # A client that cannot take a frame within 2 s is dropped
+        except OSError as exc:
+            self._logger.info("WebSocket handshake from %s failed: %s", addr[0], exc)
+            conn.close()
+            self._ws_slots.release()
+            return
+
+        # The sender thread and the reader's control replies share the socket.
+        send_lock = threading.Lock()
+
+        def send(frame: bytes) -> None:
+            # Unmasked binary frame; BROADCAST_FRAME always fits the 7-bit length.
+            with send_lock:
+                conn.sendall(bytes((0x82, len(frame))) + frame)
+
+        client = self._add_client(f"ws://{addr[0]}:{addr[1]}", send)
+        threading.Thread(target=self._read_loop, args=(conn, client, send_lock), daemon=True).start()
+        self._logger.info("WebSocket client connected from %s", addr[0])
+
+    def _read_loop(self, conn: socket.socket, client: _BroadcastClient, send_lock: threading.Lock) -> None:
+        """Drain what a WebSocket client sends: answer pings, honour close, discard data.
+
+        Unread client frames would otherwise fill the socket buffers and a
+        client's keepalive pings would time it out.
+        """
+        try:
+            while not client.closed.is_set():
+                opcode, payload = _recv_websocket_frame(conn, client.closed)
+                if opcode == WEBSOCKET_OP_CLOSE:
+                    with send_lock:
+                        conn.sendall(bytes((0x80 | WEBSOCKET_OP_CLOSE, len(payload[:2]))) + payload[:2])
+                    break
+                if opcode == WEBSOCKET_OP_PING:
+                    with send_lock:
+                        conn.sendall(bytes((0x80 | WEBSOCKET_OP_PONG, len(payload))) + payload)
+        except OSError as exc:
+            if not client.closed.is_set():
+                self._logger.info("WebSocket client %s disconnected: %s", client.name, exc)
+        finally:
+            client.close()
+            conn.close()
+            self._ws_slots.release()
+
+
+def _websocket_upgrade_key(request: bytes) -> bytes:
+    """Sec-WebSocket-Key of an RFC 6455 upgrade request; ValueError for anything else."""
+    lines = request.split(b"\r\n\r\n", 1)[0].split(b"\r\n")
+    if not WEBSOCKET_REQUEST_LINE.fullmatch(lines[0]):
+        raise ValueError("not an HTTP/1.1 GET request")
+    headers: Dict[bytes, bytes] = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(b":")
+        if not sep:
+            raise ValueError("malformed header line")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get(b"upgrade", b"").lower() != b"websocket":
+        raise ValueError("missing Upgrade: websocket")
+    if b"upgrade" not in (token.strip() for token in headers.get(b"connection", b"").lower().split(b",")):
+        raise ValueError("missing Connection: Upgrade")
+    if headers.get(b"sec-websocket-version") != b"13":
+        raise ValueError("unsupported Sec-WebSocket-Version")
+    key = headers.get(b"sec-websocket-key", b"")
+    try:
+        valid = len(base64.b64decode(key, validate=True)) == 16
+    except ValueError:  # binascii.Error
+        valid = False
+    if not valid:
+        raise ValueError("invalid Sec-WebSocket-Key")
+    return key
+
+
+def _refuse_websocket(conn: socket.socket, status: str) -> None:
+    """Best-effort HTTP error reply, then close."""
+    try:
+        conn.settimeout(1.0)
+        conn.sendall(f"HTTP/1.1 {status}\r\nConnection: close\r\nContent-Length: 0\r\n\r\n".encode("ascii"))
+    except OSError:
+        pass
+    conn.close()
+
+
+def _recv_websocket_frame(conn: socket.socket, closed: threading.Event) -> Tuple[int, bytes]:
+    """Read one client frame and return (opcode, unmasked payload); OSError once the peer is gone."""
+
+    def recv_exact(size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            try:
+                chunk = conn.recv(size - len(data))
+            except socket.timeout:
+                # The socket timeout bounds sends; reads just keep waiting until we close.
+                if closed.is_set():
+                    raise OSError("client closed") from None
+                continue
+            if not chunk:
+                raise OSError("connection closed by peer")
+            data += chunk
+        return data
+
+    first, second = recv_exact(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", recv_exact(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", recv_exact(8))[0]
+    if length > WEBSOCKET_MAX_CLIENT_FRAME:
+        raise OSError(f"client frame of {length} bytes is too large")
+    mask = recv_exact(4) if second & 0x80 else b""
+    payload = recv_exact(length)
+    if mask:
+        payload = bytes(byte ^ mask[i & 3] for i, byte in enumerate(payload))
+    return first & 0x0F, payload
+
+
+def _process_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    if os.name != "posix":
+        # Named mappings disappear with their last handle, so an existing one is in use;
+        # os.kill would also terminate the process here rather than probe it.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _attach_shared_memory(name: str, untrack: bool = True) -> shared_memory.SharedMemory:
+    """Attach to an existing segment without letting this process's exit unlink it.
+
+    Child processes started by us share our resource tracker and pass
+    ``untrack=False``; unregistering there would drop the owner's entry.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    if untrack and os.name == "posix":
+        # Attaching registers the segment with this process's resource tracker,
+        # which would unlink the owner's segment when this process exits.
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class SharedTelemetryRing:
+    """Shared-memory ring of frames written by one process and read by others.
+
+    Layout (little-endian), so non-Python readers can map it directly:
+
+    * header, SHARED_RING_HEADER: magic ``b"NSHM"``, layout version (u16),
+      header size (u16), slot size (u32), slot count (u32), write count (u64),
+      pid of the process that created the ring (u32), padding to 32 bytes.
+    * ``slot count`` slots of ``slot size`` bytes, starting at ``header size``.
+      Each slot is SHARED_RING_SLOT_HEADER (u32 sequence lock, u32 payload
+      length, u64 frame index) followed by the payload. The published
+      telemetry ring carries one BROADCAST_FRAME per slot.
+
+    Frame ``n`` (0-based, increasing) lives in slot ``n % slot count``; the
+    write count is the number of frames written so far. The single writer
+    makes the slot's lock odd, writes the payload, makes it even again, and
+    then advances the write count. A reader copies a slot only when the
+    lock is even and unchanged across the copy, and discards it when the
+    frame index shows the writer has already lapped it.
+    """
+
+    def __init__(
+        self,
+        name: str = DEFAULT_SHARED_RING_NAME,
+        slots: int = DEFAULT_SHARED_RING_SLOTS,
+        frame_size: int = BROADCAST_FRAME.size,
+        create: bool = True,
+    ) -> None:
+        self.owner = create
+        if create:
+            self.slot_count = slots
+            self.slot_size = SHARED_RING_SLOT_HEADER.size + frame_size
+            size = SHARED_RING_HEADER.size + self.slot_count * self.slot_size
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            except FileExistsError:
+                self.shm = self._take_over(name, size)
+            self.buf = self.shm.buf
+            self.buf[:size] = bytes(size)
+            self.write_count = 0
+            SHARED_RING_HEADER.pack_into(
+                self.buf, 0, SHARED_RING_MAGIC, SHARED_RING_VERSION, SHARED_RING_HEADER.size,
+                self.slot_size, self.slot_count, 0, os.getpid(),
+            )
+        else:
+            # The acquisition process attaching to the ring its parent created.
+            self.shm = _attach_shared_memory(name, untrack=False)
+            self.buf = self.shm.buf
+            _magic, _version, _header_size, self.slot_size, self.slot_count, self.write_count, _pid = (
+                SHARED_RING_HEADER.unpack_from(self.buf, 0)
+            )
+        self.frame_size = self.slot_size - SHARED_RING_SLOT_HEADER.size
+
+    @staticmethod
+    def _take_over(name: str, size: int) -> shared_memory.SharedMemory:
+        """Reuse a ring left behind by a crashed run; refuse anything still owned or not ours."""
+        shm = shared_memory.SharedMemory(name=name)
+        reason = None
+        if shm.size < SHARED_RING_HEADER.size:
+            reason = "is not a Nishizumi ring"
+        else:
+            magic, _version, _header_size, _slot_size, _slots, _count, pid = SHARED_RING_HEADER.unpack_from(shm.buf, 0)
+            if magic != SHARED_RING_MAGIC:
+                reason = "is not a Nishizumi ring"
+            elif _process_alive(pid):
+                reason = f"is still in use by process {pid}"
+            elif shm.size < size:
+                reason = f"is too small ({shm.size} < {size} bytes)"
+        if reason is not None:
+            shm.close()
+            raise FileExistsError(f"Shared memory '{name}' already exists and {reason}")
+        return shm
+
+    def write(self, frame: bytes) -> None:
+        if len(frame) > self.frame_size:
+            raise ValueError(f"frame of {len(frame)} bytes exceeds the {self.frame_size}-byte slot")
+        index = self.write_count
+        offset = SHARED_RING_HEADER.size + (index % self.slot_count) * self.slot_size
+        lock = SHARED_RING_SLOT_HEADER.unpack_from(self.buf, offset)[0]
+        SHARED_RING_SLOT_HEADER.pack_into(self.buf, offset, (lock + 1) & 0xFFFFFFFF, len(frame), index)
+        start = offset + SHARED_RING_SLOT_HEADER.size
+        self.buf[start : start + len(frame)] = frame
+        SHARED_RING_SLOT_HEADER.pack_into(self.buf, offset, (lock + 2) & 0xFFFFFFFF, len(frame), index)
+        self.write_count = index + 1
+        SHARED_RING_WRITE_COUNT.pack_into(self.buf, SHARED_RING_WRITE_COUNT_OFFSET, self.write_count)
+
+    def close(self) -> None:
+        self.buf.release()
+        self.shm.close()
+        if not self.owner:
+            return
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedTelemetryReader:
+    """Reads frames from a SharedTelemetryRing published by another process.
+
+    Pass ``ring`` to read a ring owned by this process through its mapping.
+    """
+
+    def __init__(self, name: str = DEFAULT_SHARED_RING_NAME, ring: Optional[SharedTelemetryRing] = None) -> None:
+        self._attached = ring is None
+        self.shm = _attach_shared_memory(name) if ring is None else ring.shm
+        self.buf = self.shm.buf
+        magic, version, self.header_size, self.slot_size, self.slot_count, _count, _pid = (
+            SHARED_RING_HEADER.unpack_from(self.buf, 0)
+        )
+        if magic != SHARED_RING_MAGIC or version != SHARED_RING_VERSION:
+            self.close()
+            raise ValueError(f"{name} is not a version {SHARED_RING_VERSION} Nishizumi ring")
+        self.next_index = self.write_count()
+
+    def write_count(self) -> int:
+        return SHARED_RING_WRITE_COUNT.unpack_from(self.buf, SHARED_RING_WRITE_COUNT_OFFSET)[0]
+
+    def read_slot(self, index: int) -> Optional[bytes]:
+        """Copy frame ``index`` under the sequence lock; None if it was overwritten or is mid-write."""
+        offset = self.header_size + (index % self.slot_count) * self.slot_size
+        start = offset + SHARED_RING_SLOT_HEADER.size
+        for _attempt in range(8):
+            before, length, frame_index = SHARED_RING_SLOT_HEADER.unpack_from(self.buf, offset)
+            if before & 1:
+                continue
+            frame = bytes(self.buf[start : start + length])
+            if SHARED_RING_SLOT_HEADER.unpack_from(self.buf, offset)[0] == before:
+                return frame if frame_index == index else None
+        return None
+
+    def poll(self) -> List[bytes]:
+        """Frames written since the last poll, oldest first; lapped frames are skipped."""
+        count = self.write_count()
+        start = max(self.next_index, count - self.slot_count + 1)
+        frames = []
+        for index in range(start, count):
+            frame = self.read_slot(index)
+            if frame is not None:
+                frames.append(frame)
+        self.next_index = count
+        return frames
+
+    def close(self) -> None:
+        if self._attached:
+            self.buf.release()
+            self.shm.close()
+
+
+def _parse_host_port(text: str, default_host: str = "127.0.0.1") -> Tuple[str, int]:
+    host, _sep, port = text.strip().rpartition(":")
+    return host or default_host, int(port)
+
+
+class _PrefixedSocket:
+    """recv() wrapper that first returns bytes already read past a handshake."""
+
+    def __init__(self, sock: socket.socket, prefix: bytes) -> None:
+        self._sock = sock
+        self._prefix = prefix
+
+    def recv(self, size: int) -> bytes:
+        if self._prefix:
+            data, self._prefix = self._prefix[:size], self._prefix[size:]
+            return data
+        return self._sock.recv(size)
+
+
+def _websocket_frames(sock: Any):
+    """Yield binary message payloads from a server-to-client WebSocket stream."""
+    buffer = b""
+
+    def read(count: int) -> bytes:
+        nonlocal buffer
+        while len(buffer) < count:
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise EOFError
+            buffer += chunk
+        data, buffer = buffer[:count], buffer[count:]
+        return data
+
+    while True:
+        opcode, length = read(2)
+        length &= 0x7F
+        if length == 126:
+            length = struct.unpack(">H", read(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", read(8))[0]
+        payload = read(length)
+        if opcode & 0x0F == 0x8:
+            return
+        if opcode & 0x0F == 0x2:
+            yield payload
+
+
+def _listen_shared(name: str, count: int) -> int:
+    try:
+        reader = SharedTelemetryReader(name)
+    except (FileNotFoundError, ValueError) as exc:
+        print(f"cannot open shared memory '{name}': {exc}", file=sys.stderr)
+        return 1
+    received = 0
+    try:
+        while not count or received < count:
+            for data in reader.poll():
+                print(json.dumps(unpack_broadcast_frame(data)), flush=True)
+                received += 1
+                if count and received >= count:
+                    break
+            time.sleep(0.002)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+    return 0
+
+
+def listen_main(argv: Sequence[str]) -> int:
+    """Reference broadcast client: ``nishizumi_ibt_overlay.py listen``."""
+    parser = argparse.ArgumentParser(
+        prog="nishizumi_ibt_overlay.py listen",
+        description="Print frames from a Nishizumi telemetry broadcast.",
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--udp", default=None, help="Local [host:]port to receive UDP frames on")
+    source.add_argument("--ws", default=None, help="WebSocket server host:port")
+    source.add_argument(
+        "--shm", nargs="?", const=DEFAULT_SHARED_RING_NAME, default=None, help="Shared-memory ring name"
+    )
+    parser.add_argument("--count", type=int, default=0, help="Stop after this many frames (default: run forever)")
+    args = parser.parse_args(argv)
+
+    if args.shm:
+        return _listen_shared(args.shm, args.count)
+    if args.ws:
+        host, port = _parse_host_port(args.ws)
+        sock = socket.create_connection((host, port))
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        sock.sendall(
+            (
+                f"GET / HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+            ).encode("ascii")
+        )
+        response = b""
+        while b"\r\n\r\n" not in response:
+            chunk = sock.recv(1024)
+            if not chunk:
+                print("WebSocket handshake failed", file=sys.stderr)
+                return 1
+            response += chunk
+        # Frames may already follow the handshake response in the same read.
+        frames = _websocket_frames(_PrefixedSocket(sock, response.split(b"\r\n\r\n", 1)[1]))
+    else:
+        host, port = _parse_host_port(args.udp or f"0.0.0.0:{DEFAULT_BROADCAST_UDP_PORT}", "0.0.0.0")
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((host, port))
+        frames = iter(lambda: sock.recv(65536), b"")
+
+    received = 0
+    try:
+        for data in frames:
+            try:
+                frame = unpack_broadcast_frame(data)
+            except ValueError as exc:
+                print(f"skipping frame: {exc}", file=sys.stderr)
+                continue
+            print(json.dumps(frame), flush=True)
+            received += 1
+            if args.count and received >= args.count:
+                break
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        sock.close()
+    return 0
+
+
+def broadcast_main(argv: Sequence[str]) -> int:
+    """Headless broadcast source: replays an IBT through the broadcaster.
+
+    ``nishizumi_ibt_overlay.py broadcast FILE.ibt [--reference REF.ibt]``
+    feeds the same frames the overlay publishes, so clients can be tested
+    without the sim running.
+    """
+    parser = argparse.ArgumentParser(
+        prog="nishizumi_ibt_overlay.py broadcast",
+        description="Replay an IBT file as a Nishizumi telemetry broadcast.",
+    )
+    parser.add_argument("replay", help="IBT file to replay")
+    parser.add_argument("--reference", help="Reference IBT for ref values, deltas and upcoming events")
+    parser.add_argument("--udp", action="append", default=[], help="UDP target host:port (repeatable)")
+    parser.add_argument("--ws-port", type=int, default=None, help="Serve WebSocket clients on this port")
+    parser.add_argument(
+        "--ws-lan", action="store_true", help="Accept WebSocket clients from other machines (default: this PC only)"
+    )
+    parser.add_argument("--rate", type=float, default=60.0, help="Replay ticks per second")
+    parser.add_argument("--max-hz", type=float, default=DEFAULT_BROADCAST_MAX_HZ, help="Per-client frame rate cap")
+    parser.add_argument("--loop", action="store_true", help="Restart the replay at the end of the file")
+    parser.add_argument(
+        "--shm", nargs="?", const=DEFAULT_SHARED_RING_NAME, default=None, help="Also publish to this shared-memory ring"
+    )
+    args = parser.parse_args(argv)
+    if not args.udp and not args.ws_port and not args.shm:
+        args.udp = [f"127.0.0.1:{DEFAULT_BROADCAST_UDP_PORT}"]
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger = logging.getLogger("nishizumi_broadcast")
+    thresholds = (DEFAULT_BRAKE_THRESHOLD, DEFAULT_LIFT_THRESHOLD, DEFAULT_POWER_THRESHOLD)
+    ref = ReferenceLap(args.reference, *thresholds) if args.reference else None
+    channels = read_ibt_channels(args.replay, IBT_CHANNELS + ("Lap",))
+    lap_pct_all = channels.get("LapDistPct")
+    if not lap_pct_all:
+        parser.error("replay file does not contain LapDistPct")
+    track_len_m = (ref.track_length_m if ref else None) or ASSUMED_TRACK_LEN_M
+    event_index = EventIndex()
+    event_index.sync(ref, track_len_m)
+    broadcaster = TelemetryBroadcaster(
+        logger,
+        [_parse_host_port(target) for target in args.udp],
+        args.ws_port,
+        args.max_hz,
+        BROADCAST_WS_LAN_HOST if args.ws_lan else BROADCAST_WS_LOCAL_HOST,
+    )
+    ring = SharedTelemetryRing(args.shm) if args.shm else None
+
+    def column(name: str, idx: int) -> Optional[float]:
+        values = channels.get(name)
+        return values[idx] if values else None
+
+    period = 1.0 / max(1.0, args.rate)
+    seq = 0
+    try:
+        while True:
+            next_tick = time.monotonic()
+            for idx in range(len(lap_pct_all)):
+                seq += 1
+                snapshot = TelemetrySnapshot(
+                    connected=True,
+                    timestamp=time.time(),
+                    seq=seq,
+                    tick=idx,
+                    lap_pct=lap_pct_all[idx],
+                    throttle=column("Throttle", idx),
+                    brake=column("Brake", idx),
+                    steering=column("SteeringWheelAngle", idx),
+                    gear=column("Gear", idx),
+                    speed_mps=column("Speed", idx),
+                    lap=column("Lap", idx),
+                    session_time=column("SessionTime", idx),
+                )
+                lap_pct = snapshot.lap_pct
+                if lap_pct > 1.5:
+                    lap_pct /= 100.0
+                ref_values = None
+                next_event = None
+                if ref is not None:
+                    ref_values = (
+                        ref.ref_at_pct(ref.throttle, lap_pct),
+                        ref.ref_at_pct(ref.brake, lap_pct),
+                        ref.ref_at_pct(ref.speed, lap_pct),
+                    )
+                    next_event = next_reference_event(event_index, lap_pct)
+                frame = pack_broadcast_frame(snapshot, lap_pct, ref_values, next_event)
+                broadcaster.publish(frame, seq)
+                if ring is not None:
+                    ring.write(frame)
+                next_tick += period
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            if not args.loop:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Give sender threads a moment to flush the final frames.
+        time.sleep(0.1)
+        logger.info(broadcaster.stats_text())
+        broadcaster.close()
+        if ring is not None:
+            ring.close()
+    return 0
+
+
+# Beep patterns as (frequency Hz, duration ms, gap ms) per event kind and
+# approach stage; quiet mode plays the same tones shortened.
+AUDIO_CUE_STAGES = ("a", "b", "c")
+AUDIO_CUE_PATTERNS: Dict[str, Dict[str, Tuple[Tuple[int, int, int], ...]]] = {
+    "lift": {"a": ((520, 80, 0),), "b": ((700, 110, 0),), "c": ((980, 190, 0),)},
+    "power": {"a": ((640, 80, 0),), "b": ((860, 110, 0),), "c": ((1200, 190, 0),)},
+    "brake": {"a": ((560, 90, 0),), "b": ((820, 130, 0),), "c": ((1300, 700, 0),)},
+}
+AUDIO_CUE_QUIET_PATTERNS = {
+    kind: {
+        stage: tuple((freq, max(40, int(duration * 0.6)), int(gap * 0.6)) for freq, duration, gap in pattern)
+        for stage, pattern in stages.items()
+    }
+    for kind, stages in AUDIO_CUE_PATTERNS.items()
+}
+
 
 class AudioCues:
     # Priority values (lower = higher priority, will preempt)
     _PRIORITY_C = 0  # Final cue - highest priority
     _PRIORITY_B = 1  # Approach B
     _PRIORITY_A = 2  # Approach A - lowest priority
+    _STAGE_PRIORITY = {"c": _PRIORITY_C, "b": _PRIORITY_B, "a": _PRIORITY_A}
 
     def __init__(self, root: tk.Tk, logger: logging.Logger) -> None:
         self._root = root
         self._logger = logger
-        self._stage_state: Dict[int, Dict[str, bool]] = {}
+        self._stage_state: Dict[int, List[bool]] = {}
         self._last_dist_to_event: Dict[int, float] = {}
+        # Per-update scratch: events in the window, event index -> distance ahead, and which kinds cue.
+        self._in_window: List[UpcomingEvent] = []
+        self._candidates: Dict[int, float] = {}
+        self._enabled_kinds: Dict[str, bool] = {}
         self._last_lap_pct: Optional[float] = None
         self._lap_id = 0
         # Dedicated audio thread with queue for responsive playback
-        self._audio_queue: queue.Queue[Optional[Tuple[int, List[Tuple[int, int, int]]]]] = queue.Queue()
+        self._audio_queue: queue.Queue[Optional[Tuple[int, Sequence[Tuple[int, int, int]]]]] = queue.Queue()
         self._audio_stop = threading.Event()
         self._current_priority: Optional[int] = None
         self._priority_lock = threading.Lock()
@@ -393,7 +3323,7 @@ class AudioCues:
         self,
         lap_pct: float,
         track_len_m: Optional[float],
-        events: List[RefEvent],
+        index: EventIndex,
         approach_a_s: float,
         approach_b_s: float,
         final_cue_offset_m: float,
@@ -403,6 +3333,13 @@ class AudioCues:
         quiet_mode: bool,
         speed_mps: Optional[float] = None,
     ) -> None:
+        """Advance cue state for the events ``index`` (synced to the reference) reports ahead.
+
+        Distances are metres when ``track_len_m`` is known and lap fractions
+        otherwise. Only events inside the approach window, plus those that
+        were in it on the previous update, are visited, so the cost does not
+        grow with the number of events on the lap.
+        """
         if lap_pct is None:
             return
         if self._last_lap_pct is not None and lap_pct < self._last_lap_pct - 0.5:
@@ -411,86 +3348,66 @@ class AudioCues:
             self._last_dist_to_event.clear()
         self._last_lap_pct = lap_pct
 
-        if not events:
+        if not index.track_len_m:
             return
 
-        if track_len_m and track_len_m > 1.0:
-            approach_a_m, approach_b_m = self._approach_distances(speed_mps, approach_a_s, approach_b_s)
-            current_dist_m = lap_pct * track_len_m
-            for idx, event in enumerate(events):
-                if event.dist_m is None:
-                    continue
-                if event.kind == "brake" and not enable_brake:
-                    continue
-                if event.kind == "lift" and not enable_lift:
-                    continue
-                if event.kind == "power" and not enable_power:
-                    continue
-                dist_to_event = (event.dist_m - current_dist_m) % track_len_m
-                last_dist = self._last_dist_to_event.get(idx)
+        pct_mode = not (track_len_m and track_len_m > 1.0)
+        if pct_mode:
+            approach_a, approach_b = 0.02, 0.01
+            unit = 1.0 / index.track_len_m
+        else:
+            approach_a, approach_b = self._approach_distances(speed_mps, approach_a_s, approach_b_s)
+            unit = 1.0
+        enabled = self._enabled_kinds
+        enabled["brake"] = enable_brake
+        enabled["lift"] = enable_lift
+        enabled["power"] = enable_power
+
+        candidates = self._candidates
+        candidates.clear()
+        for upcoming in index.upcoming(lap_pct, len(index), within_m=approach_a / unit, out=self._in_window):
+            candidates[upcoming.index] = upcoming.dist_m * unit
+        # Events tracked last update may have just been passed and wrapped to the far end.
+        for idx in self._last_dist_to_event:
+            if idx not in candidates:
+                candidates[idx] = index.distance_to(idx, lap_pct) * unit
+
+        last_dists = self._last_dist_to_event
+        for idx, distance in candidates.items():
+            event = index.event(idx)
+            if not enabled.get(event.kind, False):
+                continue
+            last_dist = last_dists.get(idx)
+            self._handle_stage(
+                idx,
+                event,
+                distance,
+                last_dist,
+                approach_a,
+                approach_b,
+                final_cue_offset_m,
+                quiet_mode,
+                pct_mode=pct_mode,
+            )
 
+            if last_dist is not None and last_dist <= approach_b and distance > last_dist:
                 self._handle_stage(
                     idx,
                     event,
-                    dist_to_event,
+                    0.0,
                     last_dist,
-                    approach_a_m,
-                    approach_b_m,
+                    approach_a,
+                    approach_b,
                     final_cue_offset_m,
                     quiet_mode,
+                    pct_mode=pct_mode,
+                    force_c=True,
                 )
 
-                if last_dist is not None and last_dist <= approach_b_m and dist_to_event > last_dist:
-                    self._handle_stage(
-                        idx,
-                        event,
-                        0.0,
-                        last_dist,
-                        approach_a_m,
-                        approach_b_m,
-                        final_cue_offset_m,
-                        quiet_mode,
-                        force_c=True,
-                    )
-
-                self._last_dist_to_event[idx] = dist_to_event
-        else:
-            approach_a_pct = 0.02
-            approach_b_pct = 0.01
-            for idx, event in enumerate(events):
-                if event.kind == "brake" and not enable_brake:
-                    continue
-                if event.kind == "lift" and not enable_lift:
-                    continue
-                if event.kind == "power" and not enable_power:
-                    continue
-                delta_pct = (event.lap_pct - lap_pct) % 1.0
-                last_pct = self._last_dist_to_event.get(idx)
-                self._handle_stage(
-                    idx,
-                    event,
-                    delta_pct,
-                    last_pct,
-                    approach_a_pct,
-                    approach_b_pct,
-                    final_cue_offset_m,
-                    quiet_mode,
-                    pct_mode=True,
-                )
-                if last_pct is not None and last_pct <= approach_b_pct and delta_pct > last_pct:
-                    self._handle_stage(
-                        idx,
-                        event,
-                        0.0,
-                        last_pct,
-                        approach_a_pct,
-                        approach_b_pct,
-                        final_cue_offset_m,
-                        quiet_mode,
-                        pct_mode=True,
-                        force_c=True,
-                    )
-                self._last_dist_to_event[idx] = delta_pct
+            if distance <= approach_a:
+                last_dists[idx] = distance
+            else:
+                last_dists.pop(idx, None)
 
     def _approach_distances(
         self,
@@ -519,51 +3436,35 @@ class AudioCues:
         pct_mode: bool = False,
         force_c: bool = False,
     ) -> None:
-        state = self._stage_state.setdefault(idx, {"a": False, "b": False, "c": False})
+        state = self._stage_state.get(idx)
+        if state is None:
+            state = self._stage_state[idx] = [False, False, False]
 
-        def trigger(stage: str) -> None:
-            if state[stage]:
-                return
-            state[stage] = True
-            self._play_pattern(self._pattern_for(event.kind, stage), quiet_mode, stage)
+        if force_c:
+            self._trigger(state, 2, event.kind, quiet_mode)
+            return
 
-        def crossed(threshold: float) -> bool:
+        final_threshold = 0.001 if pct_mode else max(0.0, final_cue_offset_m)
+        for stage, threshold in enumerate((approach_a, approach_b, final_threshold)):
+            if state[stage]:
+                continue
             if last_distance is None:
-                return distance <= threshold
-            return last_distance > threshold >= distance
+                crossed = distance <= threshold
+            else:
+                crossed = last_distance > threshold >= distance
+            if crossed:
+                self._trigger(state, stage, event.kind, quiet_mode)
 
-        if force_c:
-            trigger("c")
+    def _trigger(self, state: List[bool], stage: int, kind: str, quiet_mode: bool) -> None:
+        if state[stage]:
             return
+        state[stage] = True
+        name = AUDIO_CUE_STAGES[stage]
+        self._play_pattern(self._pattern_for(kind, name, quiet_mode), name)
 
-        if crossed(approach_a) and not state["a"]:
-            trigger("a")
-        if crossed(approach_b) and not state["b"]:
-            trigger("b")
-        final_threshold = 0.001 if pct_mode else max(0.0, final_cue_offset_m)
-        if crossed(final_threshold) and not state["c"]:
-            trigger("c")
-
-    def _pattern_for(self, kind: str, stage: str) -> List[Tuple[int, int, int]]:
-        if kind == "lift":
-            patterns = {
-                "a": [(520, 80, 0)],
-                "b": [(700, 110, 0)],
-                "c": [(980, 190, 0)],
-            }
-        elif kind == "power":
-            patterns = {
-                "a": [(640, 80, 0)],
-                "b": [(860, 110, 0)],
-                "c": [(1200, 190, 0)],
-            }
-        else:
-            patterns = {
-                "a": [(560, 90, 0)],
-                "b": [(820, 130, 0)],
-                "c": [(1300, 700, 0)],
-            }
-        return patterns[stage]
+    def _pattern_for(self, kind: str, stage: str, quiet_mode: bool = False) -> Tuple[Tuple[int, int, int], ...]:
+        patterns = AUDIO_CUE_QUIET_PATTERNS if quiet_mode else AUDIO_CUE_PATTERNS
+        return patterns.get(kind, patterns["brake"])[stage]
 
     def _clear_audio_queue(self) -> None:
         """Clear all pending audio cues from the queue."""
@@ -573,16 +3474,9 @@ class AudioCues:
         except queue.Empty:
             pass
 
-    def _play_pattern(self, pattern: List[Tuple[int, int, int]], quiet_mode: bool, stage: str = "c") -> None:
-        if quiet_mode:
-            scaled = []
-            for freq, duration, gap in pattern:
-                scaled.append((freq, max(40, int(duration * 0.6)), int(gap * 0.6)))
-            pattern = scaled
-
+    def _play_pattern(self, pattern: Sequence[Tuple[int, int, int]], stage: str = "c") -> None:
         # Map stage to priority (lower = higher priority)
-        priority_map = {"c": self._PRIORITY_C, "b": self._PRIORITY_B, "a": self._PRIORITY_A}
-        priority = priority_map.get(stage, self._PRIORITY_A)
+        priority = self._STAGE_PRIORITY.get(stage, self._PRIORITY_A)
 
         if winsound:
             # For high priority cues, clear lower priority pending cues
@@ -598,126 +3492,227 @@ class AudioCues:
             self._root.bell()
 
 
-class OverlayWindow(tk.Toplevel):
-    def __init__(self, root: tk.Tk, width: int, height: int) -> None:
-        super().__init__(root)
-        self.title("Nishizumi IBT")
-        self.configure(bg="#0b0b0b")
-        self.geometry(f"{width}x{height}+100+100")
-        self.attributes("-topmost", True)
-        self.attributes("-alpha", DEFAULT_ALPHA)
-        self.overrideredirect(True)
-        self._drag_start = None
-        self._resize_mode = False
-
-        self.canvas = tk.Canvas(self, bg="#0b0b0b", highlightthickness=0)
-        self.canvas.pack(fill=tk.BOTH, expand=True)
-
-        self.canvas.bind("<ButtonPress-1>", self._start_drag)
-        self.canvas.bind("<B1-Motion>", self._on_drag)
-        
-    def toggle_resize_mode(self, enabled: bool) -> None:
-        """enabled=True -> native window frame and resize handles; enabled=False -> frameless locked overlay."""
-        self._resize_mode = enabled
+# Panels of the main overlay. The "events" strip is opt-in (OverlaySettings.events_strip)
+# because it takes rows from the traces at the default size.
+OVERLAY_PANELS = ("delta", "traces", "gear", "channels", "cars")
+# Render quality: (glow layers under live traces, spline-smoothed lines).
+OVERLAY_QUALITY: Dict[str, Tuple[int, bool]] = {"low": (0, False), "medium": (1, True), "high": (3, True)}
+DEFAULT_OVERLAY_QUALITY = "high"
+# Separate overlay windows: key -> (label, panels, (width, height), refresh period ms).
+OVERLAY_WINDOW_PRESETS: Dict[str, Tuple[str, Tuple[str, ...], Tuple[int, int], int]] = {
+    "delta": ("Delta bar", ("delta",), (420, 64), 33),
+    "traces": ("Traces", ("traces",), (700, 220), DEFAULT_RENDER_MS),
+    "gear": ("Gear / steering", ("gear",), (240, 100), 50),
+    "cars": ("Nearby cars", ("cars",), (260, 60), 100),
+    "events": ("Upcoming events", ("events",), (480, 40), 50),
+}
+# Upcoming-events strip: how many slots, and kind -> (label, colour).
+UPCOMING_EVENT_COUNT = 3
+EVENT_KIND_STYLES: Dict[str, Tuple[str, str]] = {
+    "brake": ("BRAKE", DEFAULT_LIVE_BRAKE_COLOR),
+    "lift": ("LIFT", "#ffcc33"),
+    "power": ("POWER", DEFAULT_LIVE_THROTTLE_COLOR),
+}
+
+
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
+class OverlayFrame:
+    """Everything the overlay windows draw for one tick, derived once in ``_update``.
+
+    Windows only read it, so any number of them can render the same frame at
+    their own size and rate. Trace slices come from ``history`` because each
+    window samples it at its own width.
+    """
+
+    now: float
+    snapshot: TelemetrySnapshot
+    ref: Optional[ReferenceLap]
+    history: TraceHistory
+    lap_pct: Optional[float]
+    track_len_m: Optional[float]
+    lookahead_m: float
+    speed_delta_kph: Optional[float]
+    steering_deg: Optional[float]
+    gear: Optional[int]
+    gear_hint: str
+    flow_window_s: float
+    lookahead_window_s: float
+    ref_lead_s: float = 0.0
+    show_live_throttle: bool = True
+    show_live_brake: bool = True
+    show_ref_throttle: bool = True
+    show_ref_brake: bool = True
+    comparison_refs: Tuple[Tuple[str, str, Optional[float]], ...] = ()
+    comparison_colors: Tuple[str, ...] = ()
+    segment_readout: Optional[SegmentResult] = None
+    event_feedback: Optional[Tuple[str, bool]] = None
+    extra_streams: Tuple[ChannelSpec, ...] = ()
+    channel_readouts: Tuple[Tuple[ChannelSpec, Optional[float], Optional[float]], ...] = ()
+    car_ahead: Optional[CarGap] = None
+    car_behind: Optional[CarGap] = None
+    upcoming_events: Tuple[UpcomingEvent, ...] = ()
+
+
+class OverlayRenderer:
+    """Draws OverlayFrames onto a Tk-canvas-like surface.
+
+    Only the canvas item calls (create_line/polygon/rectangle/oval/text, bbox,
+    delete) are used, so the same drawing code renders into a Tk canvas or an
+    off-screen ImageCanvas.
+    """
 
-        # When enabled, let the OS draw a normal resizable window border.
-        self.overrideredirect(not enabled)
-        self.resizable(enabled, enabled)
-
-        # Re-apply attributes that might get reset by overrideredirect changes.
-        self.attributes("-topmost", True)
-        self.attributes("-alpha", DEFAULT_ALPHA)
-
-    def set_size(self, width: int, height: int) -> None:
-        # Only force size if not in native resize mode
-        if self._resize_mode:
-            return
-            
-        size, _, position = self.geometry().partition("+")
-        x_str, _, y_str = position.partition("+")
-        x = int(x_str) if x_str else 100
-        y = int(y_str) if y_str else 100
-        self.geometry(f"{width}x{height}+{x}+{y}")
-
-    def _start_drag(self, event: tk.Event) -> None:
-        # Disable dragging when in native resize mode (let window manager handle it)
-        if self._resize_mode:
-            return
-        self._drag_start = (event.x_root, event.y_root)
-
-    def _on_drag(self, event: tk.Event) -> None:
-        if self._resize_mode or not self._drag_start:
-            return
-        x_root, y_root = self._drag_start
-        dx = event.x_root - x_root
-        dy = event.y_root - y_root
-        geom = self.geometry()
-        size, _, position = geom.partition("+")
-        x_str, _, y_str = position.partition("+")
-        x = int(x_str) + dx
-        y = int(y_str) + dy
-        self.geometry(f"{size}+{x}+{y}")
-        self._drag_start = (event.x_root, event.y_root)
-
-    def draw(
+    def __init__(
         self,
-        snapshot: TelemetrySnapshot,
-        ref: Optional[ReferenceLap],
-        samples: Deque[Dict[str, Optional[float]]],
-        flow_window_s: float,
-        lookahead_window_s: float,
-        speed_delta_kph: Optional[float],
-        steering_deg: Optional[float],
-        gear: Optional[int],
-        gear_hint: str,
-        lap_pct: Optional[float],
-        track_len_m: Optional[float],
-        lookahead_m: float,
-        ref_lead_s: float = 0.0,
-        show_live_throttle: bool = True,
-        show_live_brake: bool = True,
-        show_ref_throttle: bool = True,
-        show_ref_brake: bool = True,
+        canvas: Any,
+        width: int,
+        height: int,
+        panels: Sequence[str] = OVERLAY_PANELS,
+        period_ms: int = 0,
+        quality: str = DEFAULT_OVERLAY_QUALITY,
     ) -> None:
+        """panels picks what is drawn (see draw); period_ms is this renderer's
+        own refresh period, 0 meaning every rendered tick."""
+        self.canvas = canvas
+        self.canvas_width = width
+        self.canvas_height = height
+        self.panels = frozenset(panels)
+        self.period_s = period_ms / 1000.0
+        self._next_draw = 0.0
+        self.visible = True
+        self.glow_layers, self.smooth = OVERLAY_QUALITY[quality]
+        # Per-frame scratch state reused across draw() calls.
+        self._point_pool = PointBufferPool()
+        self._decimator = ColumnDecimator()
+        self._segments: List[List[float]] = []
+        self._window_buffer: List[Dict[str, Any]] = []
+        self._blend_cache: Dict[Tuple[str, str, float], str] = {}
+
+    def due(self, now: float) -> bool:
+        """True when this window's own refresh period has elapsed."""
+        return self.visible and now >= self._next_draw
+
+    def render(self, frame: OverlayFrame) -> None:
+        """Draw ``frame`` and schedule this window's next refresh."""
+        self._next_draw = max(self._next_draw + self.period_s, frame.now)
+        self.draw(frame)
+
+    def draw(self, frame: OverlayFrame) -> None:
+        """Render one frame with this window's panels.
+
+        Panels are laid out top to bottom: "delta" (speed delta bar with
+        comparison, segment and event readouts), "events" (countdowns to the
+        next reference events), "traces" (history and lookahead), then
+        "gear", "channels" and "cars" (nearest cars ahead and behind) along
+        the bottom edge.
+        """
         self.canvas.delete("all")
-        width = self.canvas.winfo_width()
-        height = self.canvas.winfo_height()
+        self._point_pool.reset()
+        width = self.canvas_width
+        height = self.canvas_height
+        panels = self.panels
+
+        y_cursor = 12
+        if "delta" in panels:
+            self._draw_delta_bar(width, y_cursor, frame.speed_delta_kph)
+            self._draw_comparison_deltas(y_cursor + 26, frame.comparison_refs)
+            if frame.segment_readout is not None:
+                self._draw_segment_readout(width, y_cursor + 26, frame.segment_readout)
+            if frame.event_feedback is not None:
+                text, late = frame.event_feedback
+                self.canvas.create_text(
+                    width / 2,
+                    y_cursor + 26,
+                    text=text,
+                    fill=DEFAULT_LIVE_BRAKE_COLOR if late else DEFAULT_LIVE_THROTTLE_COLOR,
+                    font=("Segoe UI", 9, "bold"),
+                )
+            y_cursor += 44
 
-        y_cursor = 12
-        self._draw_delta_bar(width, y_cursor, speed_delta_kph)
-        y_cursor += 44
+        if "events" in panels:
+            self._draw_upcoming_events(width, y_cursor, frame.upcoming_events)
+            y_cursor += 22
 
-        flow_bottom = min(height - 110, y_cursor + 240)
-        if flow_bottom > y_cursor:
-            self._draw_flowing_stream(
+        if "traces" in panels:
+            if "gear" in panels or "channels" in panels or "cars" in panels:
+                flow_bottom = min(height - 110, y_cursor + 240)
+            else:
+                flow_bottom = height - 12
+            if flow_bottom > y_cursor:
+                self._draw_traces(frame, width, y_cursor, flow_bottom)
+
+        if "gear" in panels:
+            self._draw_gear_steer(width, height, frame.gear, frame.steering_deg, frame.gear_hint)
+        if "channels" in panels:
+            self._draw_channel_readouts(height, frame.channel_readouts)
+        if "cars" in panels:
+            self._draw_nearby_cars(width, height, frame.car_ahead, frame.car_behind)
+
+    def _draw_traces(self, frame: OverlayFrame, width: int, top: int, bottom: int) -> None:
+        ref = frame.ref
+        self._draw_flowing_stream(
+            width,
+            top,
+            bottom,
+            frame.history,
+            frame.flow_window_s,
+            frame.lookahead_window_s,
+            ref is not None,
+            frame.show_live_throttle,
+            frame.show_live_brake,
+            frame.show_ref_throttle,
+            frame.show_ref_brake,
+            ref_lead_s=frame.ref_lead_s,
+            comparison_colors=frame.comparison_colors,
+            extra_streams=frame.extra_streams,
+        )
+        if ref is not None and frame.lap_pct is not None and frame.track_len_m is not None:
+            self._draw_lookahead_preview(
                 width,
-                y_cursor,
-                flow_bottom,
-                samples,
-                flow_window_s,
-                lookahead_window_s,
-                ref is not None,
-                show_live_throttle,
-                show_live_brake,
-                show_ref_throttle,
-                show_ref_brake,
-                ref_lead_s=ref_lead_s,
+                top,
+                bottom,
+                ref,
+                frame.lap_pct,
+                frame.track_len_m,
+                frame.flow_window_s,
+                frame.lookahead_window_s,
+                frame.show_ref_throttle,
+                frame.show_ref_brake,
             )
-            if ref is not None and lap_pct is not None and track_len_m is not None:
-                self._draw_lookahead_preview(
-                    width,
-                    y_cursor,
-                    flow_bottom,
-                    ref,
-                    lap_pct,
-                    track_len_m,
-                    flow_window_s,
-                    lookahead_window_s,
-                    show_ref_throttle,
-                    show_ref_brake,
-                )
 
-        self._draw_gear_steer(width, height, gear, steering_deg, gear_hint)
+    def _draw_channel_readouts(
+        self,
+        height: int,
+        channel_readouts: Sequence[Tuple[ChannelSpec, Optional[float], Optional[float]]],
+    ) -> None:
+        y = height - 92
+        for spec, raw, ref_raw in channel_readouts:
+            text = f"{spec.label} {spec.format(raw)}"
+            if ref_raw is not None:
+                text += f"  (ref {spec.format(ref_raw)})"
+            self.canvas.create_text(110, y, anchor="w", text=text, fill=spec.color, font=("Segoe UI", 9, "bold"))
+            y += 14
+
+    def _draw_nearby_cars(
+        self, width: int, height: int, ahead: Optional[CarGap], behind: Optional[CarGap]
+    ) -> None:
+        y = height - 34
+        for gap, arrow, color in ((ahead, "▲", DEFAULT_LIVE_BRAKE_COLOR), (behind, "▼", DEFAULT_LIVE_THROTTLE_COLOR)):
+            if gap is not None:
+                self.canvas.create_text(
+                    width - 20, y, anchor="e", text=gap.label(arrow), fill=color, font=("Segoe UI", 9, "bold")
+                )
+            y += 16
+
+    def _draw_upcoming_events(self, width: int, y: int, events: Sequence[UpcomingEvent]) -> None:
+        slot_width = (width - 40) / UPCOMING_EVENT_COUNT
+        x = 20
+        for upcoming in events[:UPCOMING_EVENT_COUNT]:
+            label, color = EVENT_KIND_STYLES.get(upcoming.event.kind, (upcoming.event.kind.upper(), "#ffffff"))
+            text = f"{label} {upcoming.dist_m:.0f}m"
+            if upcoming.time_s is not None:
+                text += f" {upcoming.time_s:.1f}s"
+            self.canvas.create_text(x, y + 6, anchor="w", text=text, fill=color, font=("Segoe UI", 9, "bold"))
+            x += slot_width
 
     def _draw_delta_bar(self, width: int, y: int, speed_delta_kph: Optional[float]) -> None:
         bar_width = width - 40
@@ -749,6 +3744,34 @@ class OverlayWindow(tk.Toplevel):
             font=("Segoe UI", 12, "bold"),
         )
 
+    def _draw_comparison_deltas(
+        self, y: int, comparison_refs: Sequence[Tuple[str, str, Optional[float]]]
+    ) -> None:
+        x = 20
+        for name, color, delta in comparison_refs:
+            delta_text = f"{delta:+.1f}" if delta is not None else "--"
+            text_id = self.canvas.create_text(
+                x,
+                y,
+                anchor="w",
+                text=f"{name[:16]} Δ {delta_text}",
+                fill=color,
+                font=("Segoe UI", 9, "bold"),
+            )
+            bbox = self.canvas.bbox(text_id)
+            x = (bbox[2] if bbox else x + 120) + 14
+
+    def _draw_segment_readout(self, width: int, y: int, result: SegmentResult) -> None:
+        speed_kph = result.min_speed_delta_mps * 3.6
+        self.canvas.create_text(
+            width - 20,
+            y,
+            anchor="e",
+            text=f"{result.segment.name} {result.delta_s:+.3f}s  min {speed_kph:+.0f} kph",
+            fill=DEFAULT_LIVE_BRAKE_COLOR if result.delta_s > 0 else DEFAULT_LIVE_THROTTLE_COLOR,
+            font=("Segoe UI", 9, "bold"),
+        )
+
     def _draw_grid_background(
         self,
         origin_x: int,
@@ -781,7 +3804,7 @@ class OverlayWindow(tk.Toplevel):
 
     def _build_line_points(
         self,
-        window: List[Dict[str, Optional[float]]],
+        window: List[Dict[str, Any]],
         key: str,
         origin_x: int,
         bottom: int,
@@ -791,34 +3814,14 @@ class OverlayWindow(tk.Toplevel):
         split_x: float,
         series_offset_s: float = 0.0,
     ) -> List[List[float]]:
-        """Build point sequences for a data series, splitting on None values.
+        """Build point sequences for a data series (see build_line_points).
 
-        series_offset_s lets us visually lead/lag this series in time (seconds).
+        The returned lists are pooled and only valid until the next frame.
         """
-        segments: List[List[float]] = []
-        current_points: List[float] = []
-
-        for sample in window:
-            value = sample.get(key)
-            if value is None:
-                if len(current_points) >= 4:
-                    segments.append(current_points)
-                current_points = []
-                continue
-            t = sample["t"]
-            if t is None:
-                continue
-            # Apply per-series horizontal offset: positive = draw earlier (to the left)
-            effective_t = t - series_offset_s
-            x = origin_x + ((effective_t - cutoff) / flow_window_s) * (split_x - origin_x)
-            normalized = clamp(value, 0.0, 1.0)
-            y = bottom - normalized * height
-            current_points.extend([x, y])
-
-        if len(current_points) >= 4:
-            segments.append(current_points)
-
-        return segments
+        return build_line_points(
+            window, key, origin_x, bottom, height, cutoff, flow_window_s, split_x,
+            series_offset_s, self._decimator, self._point_pool, self._segments,
+        )
 
     def _draw_filled_area(
         self,
@@ -830,18 +3833,19 @@ class OverlayWindow(tk.Toplevel):
         if len(points) < 4:
             return
 
-        # Create polygon points: line points + bottom corners
-        polygon_points = list(points)
-        # Add bottom-right corner
-        polygon_points.extend([points[-2], bottom])
-        # Add bottom-left corner
-        polygon_points.extend([points[0], bottom])
+        # Create polygon points: line points + bottom-right and bottom-left corners
+        polygon_points = self._point_pool.acquire()
+        polygon_points.extend(points)
+        polygon_points.append(points[-2])
+        polygon_points.append(bottom)
+        polygon_points.append(points[0])
+        polygon_points.append(bottom)
 
         self.canvas.create_polygon(
             polygon_points,
             fill=fill_color,
             outline="",
-            smooth=True,
+            smooth=self.smooth,
             splinesteps=12,
         )
 
@@ -869,8 +3873,8 @@ class OverlayWindow(tk.Toplevel):
                 points,
                 fill=glow_col,
                 width=glow_width,
-                capstyle=tk.ROUND,
-                joinstyle=tk.ROUND,
+                capstyle="round",
+                joinstyle="round",
                 smooth=smooth,
                 splinesteps=12,
             )
@@ -880,14 +3884,22 @@ class OverlayWindow(tk.Toplevel):
             points,
             fill=color,
             width=base_width,
-            capstyle=tk.ROUND,
-            joinstyle=tk.ROUND,
+            capstyle="round",
+            joinstyle="round",
             smooth=smooth,
             splinesteps=12,
         )
 
     def _blend_color(self, color1: str, color2: str, factor: float) -> str:
         """Blend two hex colors together. Factor 1.0 = full color1, 0.0 = full color2."""
+        key = (color1, color2, factor)
+        blended = self._blend_cache.get(key)
+        if blended is None:
+            blended = self._blend_cache[key] = self._blend_uncached(color1, color2, factor)
+        return blended
+
+    @staticmethod
+    def _blend_uncached(color1: str, color2: str, factor: float) -> str:
         # Parse hex colors
         r1, g1, b1 = int(color1[1:3], 16), int(color1[3:5], 16), int(color1[5:7], 16)
         r2, g2, b2 = int(color2[1:3], 16), int(color2[3:5], 16), int(color2[5:7], 16)
@@ -904,7 +3916,7 @@ class OverlayWindow(tk.Toplevel):
         width: int,
         top: int,
         bottom: int,
-        samples: Deque[Dict[str, Optional[float]]],
+        history: TraceHistory,
         flow_window_s: float,
         lookahead_window_s: float,
         show_reference: bool,
@@ -913,15 +3925,14 @@ class OverlayWindow(tk.Toplevel):
         show_ref_throttle: bool = True,
         show_ref_brake: bool = True,
         ref_lead_s: float = 0.0,
+        comparison_colors: Sequence[str] = (),
+        extra_streams: Sequence[ChannelSpec] = (),
     ) -> None:
-        if not samples:
+        now = history.now
+        if now is None:
             return
         flow_window_s = max(0.5, flow_window_s)
-        now = samples[-1]["t"]
         cutoff = now - flow_window_s
-        window = [sample for sample in samples if sample["t"] is not None and sample["t"] >= cutoff]
-        if len(window) < 2:
-            return
 
         origin_x = 20
         flow_width = max(40, width - 40)
@@ -929,6 +3940,9 @@ class OverlayWindow(tk.Toplevel):
 
         history_ratio = flow_window_s / (flow_window_s + lookahead_window_s)
         split_x = origin_x + (flow_width * history_ratio)
+        window = history.window(flow_window_s, int(split_x - origin_x), out=self._window_buffer)
+        if len(window) < 2:
+            return
 
         # Draw professional grid background
         self._draw_grid_background(origin_x, top, split_x, bottom, height)
@@ -940,8 +3954,32 @@ class OverlayWindow(tk.Toplevel):
             width=2,
         )
 
-        # Draw reference lines first (behind live lines)
+        # Draw reference lines first (behind live lines), comparison laps furthest back
         if show_reference:
+            for slot, color in enumerate(comparison_colors, start=1):
+                for key, shown, dash in (
+                    (REFERENCE_SLOT_KEYS[slot][0], show_ref_throttle, (10, 5)),
+                    (REFERENCE_SLOT_KEYS[slot][1], show_ref_brake, (4, 4)),
+                ):
+                    if not shown:
+                        continue
+                    segments = self._build_line_points(
+                        window, key, origin_x, bottom, height,
+                        cutoff, flow_window_s, split_x,
+                        series_offset_s=ref_lead_s,
+                    )
+                    for points in segments:
+                        self.canvas.create_line(
+                            points,
+                            fill=color,
+                            width=1.5,
+                            dash=dash,
+                            capstyle="round",
+                            joinstyle="round",
+                            smooth=self.smooth,
+                            splinesteps=12,
+                        )
+
             if show_ref_throttle:
                 segments = self._build_line_points(
                     window, "ref_throttle", origin_x, bottom, height,
@@ -954,9 +3992,9 @@ class OverlayWindow(tk.Toplevel):
                         fill=DEFAULT_REF_THROTTLE_COLOR,
                         width=2.5,
                         dash=(10, 5),
-                        capstyle=tk.ROUND,
-                        joinstyle=tk.ROUND,
-                        smooth=True,
+                        capstyle="round",
+                        joinstyle="round",
+                        smooth=self.smooth,
                         splinesteps=12,
                     )
 
@@ -972,12 +4010,32 @@ class OverlayWindow(tk.Toplevel):
                         fill=DEFAULT_REF_BRAKE_COLOR,
                         width=2.5,
                         dash=(10, 5),
-                        capstyle=tk.ROUND,
-                        joinstyle=tk.ROUND,
-                        smooth=True,
+                        capstyle="round",
+                        joinstyle="round",
+                        smooth=self.smooth,
                         splinesteps=12,
                     )
 
+        for spec in extra_streams:
+            live_key, ref_key = CHANNEL_SAMPLE_KEYS[spec.name]
+            for key, dash, line_width in ((ref_key, (10, 5), 1.5), (live_key, None, 2.0)):
+                if dash is not None and not show_reference:
+                    continue
+                segments = self._build_line_points(
+                    window, key, origin_x, bottom, height,
+                    cutoff, flow_window_s, split_x,
+                    series_offset_s=ref_lead_s if dash is not None else 0.0,
+                )
+                for points in segments:
+                    self.canvas.create_line(
+                        points,
+                        fill=spec.color,
+                        width=line_width,
+                        dash=dash,
+                        capstyle="round",
+                        joinstyle="round",
+                    )
+
         # Draw live telemetry with glow and fill effects
         if show_live_throttle:
             segments = self._build_line_points(
@@ -991,7 +4049,8 @@ class OverlayWindow(tk.Toplevel):
                     DEFAULT_LIVE_THROTTLE_COLOR,
                     DEFAULT_LIVE_THROTTLE_GLOW,
                     base_width=2.5,
-                    glow_layers=3,
+                    glow_layers=self.glow_layers,
+                    smooth=self.smooth,
                 )
 
         if show_live_brake:
@@ -1006,7 +4065,8 @@ class OverlayWindow(tk.Toplevel):
                     DEFAULT_LIVE_BRAKE_COLOR,
                     DEFAULT_LIVE_BRAKE_GLOW,
                     base_width=2.5,
-                    glow_layers=3,
+                    glow_layers=self.glow_layers,
+                    smooth=self.smooth,
                 )
 
     def _draw_lookahead_preview(
@@ -1045,8 +4105,8 @@ class OverlayWindow(tk.Toplevel):
 
         lookahead_distance = current_speed * lookahead_window_s
 
-        throttle_points: List[float] = []
-        brake_points: List[float] = []
+        throttle_points = self._point_pool.acquire()
+        brake_points = self._point_pool.acquire()
 
         for i in range(samples_count):
             progress = i / (samples_count - 1)
@@ -1064,8 +4124,10 @@ class OverlayWindow(tk.Toplevel):
             throttle_y = bottom - throttle_norm * height
             brake_y = bottom - brake_norm * height
 
-            throttle_points.extend([x, throttle_y])
-            brake_points.extend([x, brake_y])
+            throttle_points.append(x)
+            throttle_points.append(throttle_y)
+            brake_points.append(x)
+            brake_points.append(brake_y)
 
         # Draw lookahead lines with dotted style (matching reference lines)
         if show_ref_throttle and len(throttle_points) >= 4:
@@ -1074,9 +4136,9 @@ class OverlayWindow(tk.Toplevel):
                 fill="#00cc00",  # Slightly dimmer green for preview
                 width=2.5,
                 dash=(10, 5),
-                capstyle=tk.ROUND,
-                joinstyle=tk.ROUND,
-                smooth=True,
+                capstyle="round",
+                joinstyle="round",
+                smooth=self.smooth,
                 splinesteps=12,
             )
 
@@ -1086,9 +4148,9 @@ class OverlayWindow(tk.Toplevel):
                 fill="#cc2222",  # Slightly dimmer red for preview
                 width=2.5,
                 dash=(10, 5),
-                capstyle=tk.ROUND,
-                joinstyle=tk.ROUND,
-                smooth=True,
+                capstyle="round",
+                joinstyle="round",
+                smooth=self.smooth,
                 splinesteps=12,
             )
 
@@ -1124,6 +4186,318 @@ class OverlayWindow(tk.Toplevel):
             font=("Segoe UI", 12, "bold"),
         )
 
+
+class OverlayWindow(OverlayRenderer):
+    """Frameless always-on-top overlay; owns a Toplevel rather than subclassing it.
+
+    Keeping Tk out of the class definition lets the module load without tkinter
+    (see the ``analyze`` command).
+    """
+
+    def __init__(
+        self,
+        root: tk.Tk,
+        width: int,
+        height: int,
+        panels: Sequence[str] = OVERLAY_PANELS,
+        title: str = "Nishizumi IBT",
+        period_ms: int = 0,
+        position: Tuple[int, int] = (100, 100),
+    ) -> None:
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.configure(bg="#0b0b0b")
+        self.window.geometry(f"{width}x{height}+{position[0]}+{position[1]}")
+        self.window.attributes("-topmost", True)
+        self.window.attributes("-alpha", DEFAULT_ALPHA)
+        self.window.overrideredirect(True)
+        self._drag_start = None
+        self._resize_mode = False
+        # Geometry as last reported by <Configure>, so frames never query Tk for it.
+        self.x, self.y = position
+        self.width = width
+        self.height = height
+        self.on_resize: Optional[Callable[[int, int], None]] = None
+
+        canvas = tk.Canvas(self.window, bg="#0b0b0b", highlightthickness=0)
+        canvas.pack(fill=tk.BOTH, expand=True)
+        super().__init__(canvas, width, height, panels, period_ms)
+
+        self.canvas.bind("<ButtonPress-1>", self._start_drag)
+        self.canvas.bind("<B1-Motion>", self._on_drag)
+        self.canvas.bind("<Configure>", self._on_canvas_configure)
+        self.window.bind("<Configure>", self._on_window_configure)
+
+    def withdraw(self) -> None:
+        if self.visible:
+            self.window.withdraw()
+            self.visible = False
+
+    def deiconify(self) -> None:
+        if not self.visible:
+            self.window.deiconify()
+            self.visible = True
+
+    def destroy(self) -> None:
+        self.window.destroy()
+
+    def _on_window_configure(self, event: tk.Event) -> None:
+        # Toplevel bindings also fire for child widgets; only the window itself matters here.
+        if event.widget is not self.window:
+            return
+        self.x = event.x
+        self.y = event.y
+        if event.width == self.width and event.height == self.height:
+            return
+        self.width = event.width
+        self.height = event.height
+        if self._resize_mode and self.on_resize is not None:
+            self.on_resize(event.width, event.height)
+
+    def _on_canvas_configure(self, event: tk.Event) -> None:
+        self.canvas_width = event.width
+        self.canvas_height = event.height
+
+    def toggle_resize_mode(self, enabled: bool) -> None:
+        """enabled=True -> native window frame and resize handles; enabled=False -> frameless locked overlay."""
+        self._resize_mode = enabled
+
+        # When enabled, let the OS draw a normal resizable window border.
+        self.window.overrideredirect(not enabled)
+        self.window.resizable(enabled, enabled)
+
+        # Re-apply attributes that might get reset by overrideredirect changes.
+        self.window.attributes("-topmost", True)
+        self.window.attributes("-alpha", DEFAULT_ALPHA)
+
+    def set_size(self, width: int, height: int) -> None:
+        # Only force size if not in native resize mode
+        if self._resize_mode or (width == self.width and height == self.height):
+            return
+        self.width = width
+        self.height = height
+        self.window.geometry(f"{width}x{height}+{self.x}+{self.y}")
+
+    def _start_drag(self, event: tk.Event) -> None:
+        # Disable dragging when in native resize mode (let window manager handle it)
+        if self._resize_mode:
+            return
+        self._drag_start = (event.x_root, event.y_root)
+
+    def _on_drag(self, event: tk.Event) -> None:
+        if self._resize_mode or not self._drag_start:
+            return
+        x_root, y_root = self._drag_start
+        self.x += event.x_root - x_root
+        self.y += event.y_root - y_root
+        self.window.geometry(f"+{self.x}+{self.y}")
+        self._drag_start = (event.x_root, event.y_root)
+
+
+TEXT_ANCHORS = {"center": "mm", "n": "mt", "s": "mb", "e": "rm", "w": "lm", "ne": "rt", "nw": "lt", "se": "rb", "sw": "lb"}
+HEADLESS_FONTS = ("DejaVuSans-Bold.ttf", "segoeuib.ttf", "arialbd.ttf")
+
+
+@functools.lru_cache(maxsize=32)
+def _bezier_weights(steps: int) -> Tuple[Tuple[float, float, float, float], ...]:
+    """Cubic Bernstein weights for t = 1/steps .. 1."""
+    weights = []
+    for step in range(1, steps + 1):
+        t = step / steps
+        u = 1.0 - t
+        weights.append((u * u * u, 3.0 * u * u * t, 3.0 * u * t * t, t * t * t))
+    return tuple(weights)
+
+
+class ImageCanvas:
+    """Off-screen stand-in for the Tk canvas calls OverlayRenderer makes, drawn with Pillow.
+
+    Smoothed lines follow Tk's parabolic-spline construction and dashes are
+    walked along the polyline, so frames match the on-screen overlay closely
+    enough for golden-image comparison. ``scale`` > 1 supersamples and
+    downsizes in image().
+    """
+
+    def __init__(self, width: int, height: int, scale: int = 1, background: str = "#0b0b0b") -> None:
+        try:
+            from PIL import Image, ImageDraw, ImageFont
+        except ImportError as exc:
+            raise RuntimeError("The headless renderer needs Pillow (pip install pillow)") from exc
+        self._image_module = Image
+        self._font_module = ImageFont
+        self.width = width
+        self.height = height
+        self.scale = max(1, scale)
+        self.background = background
+        self._image = Image.new("RGB", (width * self.scale, height * self.scale), background)
+        self._draw = ImageDraw.Draw(self._image)
+        self._fonts: Dict[Tuple[Any, ...], Any] = {}
+        self._bboxes: Dict[int, Tuple[float, float, float, float]] = {}
+        self._items = 0
+
+    def image(self) -> Any:
+        """The current frame as a PIL image at the canvas size."""
+        if self.scale == 1:
+            return self._image.copy()
+        return self._image.resize((self.width, self.height), self._image_module.LANCZOS)
+
+    def delete(self, _tag: str = "all") -> None:
+        self._draw.rectangle((0, 0, self._image.width, self._image.height), fill=self.background)
+        self._bboxes.clear()
+        self._items = 0
+
+    def bbox(self, item: int) -> Optional[Tuple[float, float, float, float]]:
+        return self._bboxes.get(item)
+
+    def _item(self) -> int:
+        self._items += 1
+        return self._items
+
+    def _scaled(self, coords: Sequence[float]) -> List[Tuple[float, float]]:
+        scale = self.scale
+        return [(coords[i] * scale, coords[i + 1] * scale) for i in range(0, len(coords) - 1, 2)]
+
+    @staticmethod
+    def _spline(points: List[Tuple[float, float]], steps: int) -> List[Tuple[float, float]]:
+        """Tk's open parabolic spline: cubic Béziers whose ends sit at segment midpoints.
+
+        Segments shorter than a couple of pixels get fewer steps; the extra
+        vertices would land within the same pixel.
+        """
+        count = len(points)
+        if count < 3:
+            return points
+        out = [points[0]]
+        append = out.append
+        for i in range(2, count):
+            (x0, y0), (x1, y1), (x2, y2) = points[i - 2], points[i - 1], points[i]
+            if i == 2:
+                c0x, c0y = x0, y0
+                c1x, c1y = 0.333 * x0 + 0.667 * x1, 0.333 * y0 + 0.667 * y1
+            else:
+                c0x, c0y = 0.5 * x0 + 0.5 * x1, 0.5 * y0 + 0.5 * y1
+                c1x, c1y = 0.167 * x0 + 0.833 * x1, 0.167 * y0 + 0.833 * y1
+            if i == count - 1:
+                c2x, c2y = 0.667 * x1 + 0.333 * x2, 0.667 * y1 + 0.333 * y2
+                c3x, c3y = x2, y2
+            else:
+                c2x, c2y = 0.833 * x1 + 0.167 * x2, 0.833 * y1 + 0.167 * y2
+                c3x, c3y = 0.5 * x1 + 0.5 * x2, 0.5 * y1 + 0.5 * y2
+            span = abs(c3x - c0x) + abs(c3y - c0y) + abs(c1x - c0x) + abs(c1y - c0y) + abs(c2x - c3x) + abs(c2y - c3y)
+            segment_steps = min(steps, int(span * 0.5) + 1)
+            for a, b, c, d in _bezier_weights(segment_steps):
+                append((a * c0x + b * c1x + c * c2x + d * c3x, a * c0y + b * c1y + c * c2y + d * c3y))
+        return out
+
+    @staticmethod
+    def _dashes(points: List[Tuple[float, float]], pattern: Sequence[float]) -> List[List[Tuple[float, float]]]:
+        """Split a polyline into the drawn runs of a dash pattern."""
+        runs: List[List[Tuple[float, float]]] = []
+        index = 0
+        left = pattern[0]
+        current: Optional[List[Tuple[float, float]]] = [points[0]]
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            length = math.hypot(x1 - x0, y1 - y0)
+            pos = 0.0
+            while length - pos > left:
+                pos += left
+                ratio = pos / length
+                point = (x0 + (x1 - x0) * ratio, y0 + (y1 - y0) * ratio)
+                if current is not None:
+                    current.append(point)
+                    runs.append(current)
+                    current = None
+                else:
+                    current = [point]
+                index = (index + 1) % len(pattern)
+                left = pattern[index]
+            left -= length - pos
+            if current is not None:
+                current.append((x1, y1))
+        if current is not None and len(current) > 1:
+            runs.append(current)
+        return runs
+
+    def create_line(self, *coords: Any, **options: Any) -> int:
+        flat = coords[0] if len(coords) == 1 else coords
+        points = self._scaled(flat)
+        if len(points) < 2:
+            return self._item()
+        if options.get("smooth"):
+            points = self._spline(points, int(options.get("splinesteps", 12)))
+        width = max(1, int(round(float(options.get("width", 1)) * self.scale)))
+        fill = options.get("fill") or "#000000"
+        dash = options.get("dash")
+        runs = self._dashes(points, [d * self.scale for d in dash]) if dash else [points]
+        # Round joins only show on wide strokes; they cost a pie slice per vertex.
+        joint = "curve" if width > 2 else None
+        for run in runs:
+            self._draw.line(run, fill=fill, width=width, joint=joint)
+        return self._item()
+
+    def create_polygon(self, *coords: Any, **options: Any) -> int:
+        flat = coords[0] if len(coords) == 1 else coords
+        points = self._scaled(flat)
+        if options.get("smooth"):
+            points = self._spline(points, int(options.get("splinesteps", 12)))
+        if len(points) >= 3:
+            self._draw.polygon(points, fill=options.get("fill") or None, outline=options.get("outline") or None)
+        return self._item()
+
+    def _box(self, x0: float, y0: float, x1: float, y1: float) -> Tuple[float, float, float, float]:
+        scale = self.scale
+        return (min(x0, x1) * scale, min(y0, y1) * scale, max(x0, x1) * scale, max(y0, y1) * scale)
+
+    def create_rectangle(self, x0: float, y0: float, x1: float, y1: float, **options: Any) -> int:
+        width = options.get("width", 1)
+        outline = options.get("outline") if width else None
+        self._draw.rectangle(
+            self._box(x0, y0, x1, y1),
+            fill=options.get("fill") or None,
+            outline=outline or None,
+            width=max(1, int(round(width * self.scale))) if outline else 0,
+        )
+        return self._item()
+
+    def create_oval(self, x0: float, y0: float, x1: float, y1: float, **options: Any) -> int:
+        width = options.get("width", 1)
+        self._draw.ellipse(
+            self._box(x0, y0, x1, y1),
+            fill=options.get("fill") or None,
+            outline=options.get("outline") or None,
+            width=max(1, int(round(width * self.scale))),
+        )
+        return self._item()
+
+    def _font(self, spec: Any) -> Any:
+        font = self._fonts.get(spec)
+        if font is None:
+            size = spec[1] if isinstance(spec, tuple) and len(spec) > 1 else 10
+            # Tk font sizes are points; the overlay assumes 96 dpi.
+            pixels = max(6, int(round(abs(size) * 96 / 72 * self.scale)))
+            for name in HEADLESS_FONTS:
+                try:
+                    font = self._font_module.truetype(name, pixels)
+                    break
+                except OSError:
+                    continue
+            else:
+                font = self._font_module.load_default(pixels)
+            self._fonts[spec] = font
+        return font
+
+    def create_text(self, x: float, y: float, **options: Any) -> int:
+        item = self._item()
+        text = str(options.get("text", ""))
+        anchor = TEXT_ANCHORS.get(options.get("anchor", "center"), "mm")
+        scale = self.scale
+        font = self._font(options.get("font"))
+        self._draw.text((x * scale, y * scale), text, fill=options.get("fill") or "#000000", font=font, anchor=anchor)
+        left, top, right, bottom = self._draw.textbbox((x * scale, y * scale), text, font=font, anchor=anchor)
+        self._bboxes[item] = (left / scale, top / scale, right / scale, bottom / scale)
+        return item
+
+
 class MemoryLogHandler(logging.Handler):
     def __init__(self, max_entries: int = 200) -> None:
         super().__init__()
@@ -1134,6 +4508,118 @@ class MemoryLogHandler(logging.Handler):
         self.entries.append(msg)
 
 
+class FrameScheduler:
+    """Absolute-deadline frame pacing for the Tk update loop.
+
+    Ticks are scheduled against ``start + n * period`` rather than "period after
+    the work finished", so frame work no longer stretches the real period. Every
+    tick evaluates cues; rendering runs on its own (possibly slower) period and is
+    skipped when a tick starts too late, so drawing never delays audio timing.
+    """
+
+    def __init__(self, period_ms: int, render_period_ms: Optional[int] = None) -> None:
+        self.period_s = period_ms / 1000.0
+        self.render_period_s = (render_period_ms or period_ms) / 1000.0
+        self._deadline: Optional[float] = None
+        self._next_render: float = 0.0
+        self.frames = 0
+        self.rendered_frames = 0
+        self.late_frames = 0
+        # Tick deadlines jumped over, and renders skipped because their tick ran late.
+        self.missed_deadlines = 0
+        self.skipped_renders = 0
+        self.jitter_ms = 0.0
+        self.max_jitter_ms = 0.0
+
+    def configure(self, period_ms: int, render_period_ms: int) -> None:
+        self.period_s = max(1, period_ms) / 1000.0
+        self.render_period_s = max(period_ms, render_period_ms) / 1000.0
+
+    def begin_frame(self, has_work: bool = True) -> bool:
+        """Start a tick; returns True when this tick should also render."""
+        now = time.perf_counter()
+        self.frames += 1
+        if self._deadline is None:
+            self._deadline = now
+            self._next_render = now
+        lateness_s = now - self._deadline
+        jitter_ms = abs(lateness_s) * 1000.0
+        # Exponential moving average keeps the readout stable at 60 Hz.
+        self.jitter_ms += (jitter_ms - self.jitter_ms) * 0.05
+        self.max_jitter_ms = max(self.max_jitter_ms, jitter_ms)
+
+        late = lateness_s > self.period_s * 0.5
+        if lateness_s > self.period_s:
+            missed = int(lateness_s / self.period_s)
+            self.late_frames += 1
+            self.missed_deadlines += missed
+            self._deadline += missed * self.period_s
+
+        if not has_work or now + 1e-4 < self._next_render:
+            return False
+        if late:
+            self.skipped_renders += 1
+            return False
+        self._next_render = max(self._next_render + self.render_period_s, now)
+        self.rendered_frames += 1
+        return True
+
+    def end_frame(self) -> int:
+        """Finish a tick; returns the delay in ms until the next deadline."""
+        now = time.perf_counter()
+        if self._deadline is None:
+            self._deadline = now
+        self._deadline += self.period_s
+        return max(1, int(round((self._deadline - now) * 1000.0)))
+
+    def stats_text(self) -> str:
+        return (
+            f"Frames {self.frames} | rendered {self.rendered_frames} | late {self.late_frames} | "
+            f"missed {self.missed_deadlines} | skipped {self.skipped_renders} | jitter {self.jitter_ms:.1f}ms (max {self.max_jitter_ms:.1f}ms)"
+        )
+
+
+@dataclass
+class OverlaySettings:
+    """Plain-Python copy of the settings UI that the frame loop reads.
+
+    Fields are written only by Tk variable traces (see
+    ``NishizumiApp._bind_setting``), which validate and clamp each entry and
+    keep the last good value while a field holds something unparseable.
+    """
+
+    brake_threshold: float = DEFAULT_BRAKE_THRESHOLD
+    lift_threshold: float = DEFAULT_LIFT_THRESHOLD
+    power_threshold: float = DEFAULT_POWER_THRESHOLD
+    approach_a_s: float = DEFAULT_APPROACH_A_S
+    approach_b_s: float = DEFAULT_APPROACH_B_S
+    final_cue_offset_m: float = DEFAULT_FINAL_CUE_OFFSET_M
+    update_ms: int = DEFAULT_UPDATE_MS
+    render_ms: int = DEFAULT_RENDER_MS
+    overlay_width: int = DEFAULT_OVERLAY_WIDTH
+    overlay_height: int = DEFAULT_OVERLAY_HEIGHT
+    lookahead_window_s: float = DEFAULT_LOOKAHEAD_WINDOW_S
+    flow_window_s: float = DEFAULT_FLOW_WINDOW_S
+    ref_lead_s: float = 0.0
+    sectors: str = ""
+    overlay_enabled: bool = True
+    auto_best: bool = True
+    auto_library: bool = True
+    spatial_align: bool = False
+    quiet_mode: bool = False
+    audio_brake: bool = True
+    audio_lift: bool = False
+    audio_power: bool = False
+    audio_gear_beep: bool = True
+    show_live_throttle: bool = True
+    show_live_brake: bool = True
+    show_ref_throttle: bool = True
+    show_ref_brake: bool = True
+    nearby_cars: bool = False
+    events_strip: bool = False
+    reference_cache_mb: int = DEFAULT_REFERENCE_CACHE_MB
+
+
 class NishizumiApp:
     def __init__(self, root: tk.Tk) -> None:
         self.root = root
@@ -1146,11 +4632,20 @@ class NishizumiApp:
         self.log_handler.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(message)s"))
         self.logger.addHandler(self.log_handler)
 
-        self.worker = TelemetryWorker(self.logger)
-        self.worker.start()
-
         self.reference: Optional[ReferenceLap] = None
-        self.samples: Deque[Dict[str, Optional[float]]] = deque(maxlen=1000)
+        self.reference_set = ReferenceSet()
+        self.lap_recorder = LiveLapRecorder(self.logger, self.reference_set)
+        self.reference_cache = ReferenceCache(DEFAULT_REFERENCE_CACHE_MB * 1024 * 1024)
+        self.reference_loader = ReferenceLoader(self.logger, self.reference_set, self.reference_cache)
+        self.library = ReferenceLibrary(self.logger)
+        self.library.load()
+        self._library_scan: Optional[threading.Thread] = None
+        self._library_key: Optional[Tuple[Optional[str], Optional[str], Optional[str]]] = None
+        self._auto_loaded_path: Optional[str] = None
+
+        self.worker = TelemetryWorker(self.logger, lap_recorder=self.lap_recorder)
+        self.worker.start()
+        self.history = TraceHistory()
         self.overlay: Optional[OverlayWindow] = None
         self.audio = AudioCues(root, self.logger)
 
@@ -1158,8 +4653,40 @@ class NishizumiApp:
         self.live_unwrapped_m: Optional[float] = None
         self.last_track_len_m: Optional[float] = None
         self.last_gear: Optional[int] = None
+        self.scheduler = FrameScheduler(DEFAULT_UPDATE_MS, DEFAULT_RENDER_MS)
+        self.last_seq = -1
+        self.last_seq_time = 0.0
+        # Set by UI actions that change what is drawn, so a paused sim still redraws.
+        self._redraw_pending = True
+        self._base_status = ""
+        self._status_text = ""
+        self._debug_refreshed_at = 0.0
+        self.settings = OverlaySettings()
+        self.corner_tracker = SegmentTracker()
+        self.sector_tracker = SegmentTracker()
+        self._segment_source: Optional[ReferenceLap] = None
+        self._sectors_text = ""
+        self.last_segment: Optional[SegmentResult] = None
+        self.last_segment_at = 0.0
+        self.event_comparer = LiveEventComparer()
+        self.event_index = EventIndex()
+        self.broadcaster: Optional[TelemetryBroadcaster] = None
+        self.active_channels: List[ChannelSpec] = []
+        self.stream_channels: Tuple[ChannelSpec, ...] = ()
+        self.proximity = ProximityEngine()
+        self.extra_overlays: Dict[str, OverlayWindow] = {}
+        self._due_windows: List[OverlayWindow] = []
+        # Per-frame scratch lists, cleared and refilled instead of reallocated;
+        # OverlayFrame takes tuple copies.
+        self._comparison_refs: List[Tuple[str, str, Optional[float]]] = []
+        self._channel_readouts: List[Tuple[ChannelSpec, Optional[float], Optional[float]]] = []
+        self._upcoming_events: List[UpcomingEvent] = []
+        self._channels_dirty = False
+        self._channel_source: Optional[ReferenceLap] = None
 
         self._build_ui()
+        if self.library.root:
+            self._scan_library()
         self.root.bind_all("<Control-Shift-O>", lambda _evt: self._toggle_overlay())
         self.root.bind_all("<Escape>", lambda _evt: self._toggle_overlay(force_hide=True))
         self.root.after(DEFAULT_UPDATE_MS, self._update)
@@ -1173,16 +4700,35 @@ class NishizumiApp:
         self.approach_b_var = tk.DoubleVar(value=DEFAULT_APPROACH_B_S)
         self.final_cue_offset_var = tk.DoubleVar(value=DEFAULT_FINAL_CUE_OFFSET_M)
         self.update_ms_var = tk.IntVar(value=DEFAULT_UPDATE_MS)
+        self.render_ms_var = tk.IntVar(value=DEFAULT_RENDER_MS)
+        self.cache_mb_var = tk.IntVar(value=DEFAULT_REFERENCE_CACHE_MB)
         self.quiet_mode_var = tk.BooleanVar(value=False)
         self.overlay_width_var = tk.IntVar(value=DEFAULT_OVERLAY_WIDTH)
         self.overlay_height_var = tk.IntVar(value=DEFAULT_OVERLAY_HEIGHT)
         self.lookahead_window_var = tk.DoubleVar(value=DEFAULT_LOOKAHEAD_WINDOW_S)
+        self.flow_window_var = tk.DoubleVar(value=DEFAULT_FLOW_WINDOW_S)
         self.overlay_locked_var = tk.BooleanVar(value=True)
 
         # New: reference lead time (seconds) to show reference traces earlier
         self.ref_lead_s_var = tk.DoubleVar(value=0.0)
+        self.sectors_var = tk.StringVar(value="")
 
         self.overlay_enabled_var = tk.BooleanVar(value=True)
+        self.auto_best_var = tk.BooleanVar(value=True)
+        self.spatial_align_var = tk.BooleanVar(value=False)
+        self.broadcast_var = tk.BooleanVar(value=False)
+        self.broadcast_udp_var = tk.StringVar(value=f"127.0.0.1:{DEFAULT_BROADCAST_UDP_PORT}")
+        self.broadcast_ws_port_var = tk.IntVar(value=DEFAULT_BROADCAST_WS_PORT)
+        self.broadcast_ws_lan_var = tk.BooleanVar(value=False)
+        self.shared_memory_var = tk.BooleanVar(value=False)
+        self.process_acquisition_var = tk.BooleanVar(value=False)
+        self.nearby_cars_var = tk.BooleanVar(value=False)
+        self.events_strip_var = tk.BooleanVar(value=False)
+        self.channel_vars: Dict[str, tk.BooleanVar] = {}
+        for spec in CHANNEL_REGISTRY:
+            var = tk.BooleanVar(value=False)
+            var.trace_add("write", lambda *_args: self._mark_channels_dirty())
+            self.channel_vars[spec.name] = var
 
         self.audio_brake_var = tk.BooleanVar(value=True)
         self.audio_lift_var = tk.BooleanVar(value=False)
@@ -1194,6 +4740,46 @@ class NishizumiApp:
         self.show_ref_brake_var = tk.BooleanVar(value=True)
 
         self.status_var = tk.StringVar(value="Load a reference IBT file to begin.")
+        self.comparison_var = tk.StringVar(value="None")
+        self.library_dir_var = tk.StringVar(value=self.library.root or "")
+        self.library_status_var = tk.StringVar(value=f"{len(self.library)} IBT files indexed")
+        self.auto_library_var = tk.BooleanVar(value=True)
+        self.window_vars = {key: tk.BooleanVar(value=False) for key in OVERLAY_WINDOW_PRESETS}
+
+        # The frame loop reads self.settings; only these traces touch it.
+        bind = self._bind_setting
+        bind(self.brake_threshold_var, "brake_threshold", float, 0.0, 1.0, self._apply_thresholds)
+        bind(self.lift_threshold_var, "lift_threshold", float, 0.0, 1.0, self._apply_thresholds)
+        bind(self.power_threshold_var, "power_threshold", float, 0.0, 1.0, self._apply_thresholds)
+        bind(self.approach_a_var, "approach_a_s", float, 0.5)
+        bind(self.approach_b_var, "approach_b_s", float, 0.25)
+        bind(self.final_cue_offset_var, "final_cue_offset_m", float, 0.0)
+        bind(self.update_ms_var, "update_ms", int, 5)
+        bind(self.render_ms_var, "render_ms", int, 5)
+        bind(self.overlay_width_var, "overlay_width", int, 200, on_change=self._apply_overlay_size)
+        bind(self.overlay_height_var, "overlay_height", int, 160, on_change=self._apply_overlay_size)
+        bind(self.lookahead_window_var, "lookahead_window_s", float, 0.0)
+        bind(self.flow_window_var, "flow_window_s", float, 1.0, MAX_FLOW_WINDOW_S)
+        bind(self.ref_lead_s_var, "ref_lead_s", float)
+        bind(self.sectors_var, "sectors", str)
+        bind(self.overlay_enabled_var, "overlay_enabled", bool)
+        bind(self.auto_best_var, "auto_best", bool, on_change=self._apply_auto_best)
+        bind(self.auto_library_var, "auto_library", bool)
+        bind(self.spatial_align_var, "spatial_align", bool)
+        bind(self.quiet_mode_var, "quiet_mode", bool)
+        bind(self.audio_brake_var, "audio_brake", bool)
+        bind(self.audio_lift_var, "audio_lift", bool)
+        bind(self.audio_power_var, "audio_power", bool)
+        bind(self.audio_gear_beep_var, "audio_gear_beep", bool)
+        bind(self.show_live_throttle_var, "show_live_throttle", bool)
+        bind(self.show_live_brake_var, "show_live_brake", bool)
+        bind(self.show_ref_throttle_var, "show_ref_throttle", bool)
+        bind(self.show_ref_brake_var, "show_ref_brake", bool)
+        bind(self.nearby_cars_var, "nearby_cars", bool, on_change=self._mark_channels_dirty)
+        bind(self.events_strip_var, "events_strip", bool, on_change=self._apply_overlay_panels)
+        bind(self.cache_mb_var, "reference_cache_mb", int, 0, on_change=self._apply_cache_budget)
+        self._apply_thresholds()
+        self._apply_auto_best()
 
         notebook = ttk.Notebook(self.root)
         notebook.pack(fill=tk.BOTH, expand=True)
@@ -1207,6 +4793,30 @@ class NishizumiApp:
         ttk.Label(settings, text="Reference IBT:").grid(row=row, column=0, sticky="w")
         ttk.Entry(settings, textvariable=self.ibt_path_var, width=46).grid(row=row, column=1, sticky="ew")
         ttk.Button(settings, text="Browse", command=self._browse_ibt).grid(row=row, column=2, padx=6)
+        self.cancel_load_button = ttk.Button(settings, text="Cancel", command=self._cancel_reference_load)
+        self.cancel_load_button.grid(row=row, column=3)
+        self.cancel_load_button.state(["disabled"])
+        row += 1
+
+        ttk.Label(settings, text="Reference library:").grid(row=row, column=0, sticky="w", pady=(6, 0))
+        ttk.Entry(settings, textvariable=self.library_dir_var, width=46).grid(row=row, column=1, sticky="ew", pady=(6, 0))
+        ttk.Button(settings, text="Browse", command=self._browse_library).grid(row=row, column=2, padx=6, pady=(6, 0))
+        ttk.Button(settings, text="Scan", command=self._scan_library).grid(row=row, column=3, pady=(6, 0))
+        row += 1
+        ttk.Checkbutton(
+            settings, text="Auto-load matching reference", variable=self.auto_library_var
+        ).grid(row=row, column=0, sticky="w")
+        ttk.Label(settings, textvariable=self.library_status_var, foreground="#6b6b6b").grid(
+            row=row, column=1, sticky="w"
+        )
+        row += 1
+
+        ttk.Label(settings, text="Comparison laps:").grid(row=row, column=0, sticky="w", pady=(6, 0))
+        ttk.Label(settings, textvariable=self.comparison_var).grid(row=row, column=1, sticky="w", pady=(6, 0))
+        compare_frame = ttk.Frame(settings)
+        compare_frame.grid(row=row, column=2, pady=(6, 0))
+        ttk.Button(compare_frame, text="Add", command=self._browse_comparison_ibt).grid(row=0, column=0, padx=(6, 0))
+        ttk.Button(compare_frame, text="Clear", command=self._clear_comparisons).grid(row=0, column=1, padx=(6, 0))
         row += 1
 
         ttk.Label(settings, text="Brake threshold:").grid(row=row, column=0, sticky="w", pady=(6, 0))
@@ -1232,6 +4842,14 @@ class NishizumiApp:
         ttk.Entry(settings, textvariable=self.update_ms_var, width=8).grid(row=row, column=1, sticky="w", pady=(6, 0))
         row += 1
 
+        ttk.Label(settings, text="Overlay redraw (ms):").grid(row=row, column=0, sticky="w", pady=(6, 0))
+        ttk.Entry(settings, textvariable=self.render_ms_var, width=8).grid(row=row, column=1, sticky="w", pady=(6, 0))
+        row += 1
+
+        ttk.Label(settings, text="Reference cache (MB):").grid(row=row, column=0, sticky="w", pady=(6, 0))
+        ttk.Entry(settings, textvariable=self.cache_mb_var, width=8).grid(row=row, column=1, sticky="w", pady=(6, 0))
+        row += 1
+
         ttk.Label(settings, text="Overlay size (W x H):").grid(row=row, column=0, sticky="w", pady=(6, 0))
         size_frame = ttk.Frame(settings)
         size_frame.grid(row=row, column=1, sticky="w", pady=(6, 0))
@@ -1243,6 +4861,10 @@ class NishizumiApp:
         ttk.Entry(settings, textvariable=self.lookahead_window_var, width=8).grid(row=row, column=1, sticky="w", pady=(6, 0))
         row += 1
 
+        ttk.Label(settings, text="Trace history (s):").grid(row=row, column=0, sticky="w", pady=(6, 0))
+        ttk.Entry(settings, textvariable=self.flow_window_var, width=8).grid(row=row, column=1, sticky="w", pady=(6, 0))
+        row += 1
+
         # New: reference lead control
         ttk.Label(settings, text="Reference lead (s):").grid(row=row, column=0, sticky="w", pady=(6, 0))
         ttk.Entry(settings, textvariable=self.ref_lead_s_var, width=8).grid(
@@ -1250,6 +4872,10 @@ class NishizumiApp:
         )
         row += 1
 
+        ttk.Label(settings, text="Custom sectors (lap %):").grid(row=row, column=0, sticky="w", pady=(6, 0))
+        ttk.Entry(settings, textvariable=self.sectors_var, width=24).grid(row=row, column=1, sticky="w", pady=(6, 0))
+        row += 1
+
         ttk.Checkbutton(settings, text="Enable overlay", variable=self.overlay_enabled_var, command=self._toggle_overlay).grid(
             row=row, column=0, sticky="w", pady=(8, 0)
         )
@@ -1258,6 +4884,69 @@ class NishizumiApp:
         )
         row += 1
 
+        windows_frame = ttk.Frame(settings)
+        windows_frame.grid(row=row, column=0, columnspan=3, sticky="w", pady=(6, 0))
+        ttk.Label(windows_frame, text="Separate windows:").grid(row=0, column=0, sticky="w")
+        for idx, (key, (label, _panels, _size, _period_ms)) in enumerate(OVERLAY_WINDOW_PRESETS.items(), start=1):
+            ttk.Checkbutton(
+                windows_frame,
+                text=label,
+                variable=self.window_vars[key],
+                command=lambda key=key: self._toggle_extra_window(key),
+            ).grid(row=0, column=idx, sticky="w", padx=(6, 0))
+        row += 1
+
+        ttk.Checkbutton(settings, text="Use live personal best as reference", variable=self.auto_best_var).grid(
+            row=row, column=0, columnspan=2, sticky="w", pady=(6, 0)
+        )
+        row += 1
+
+        ttk.Checkbutton(
+            settings, text="Align to reference by track position (GPS)", variable=self.spatial_align_var
+        ).grid(row=row, column=0, columnspan=2, sticky="w", pady=(6, 0))
+        row += 1
+
+        ttk.Checkbutton(
+            settings,
+            text="Read telemetry in a separate process",
+            variable=self.process_acquisition_var,
+            command=self._restart_worker,
+        ).grid(row=row, column=0, columnspan=2, sticky="w", pady=(6, 0))
+        row += 1
+
+        ttk.Checkbutton(
+            settings, text="Show gaps to nearby cars", variable=self.nearby_cars_var
+        ).grid(row=row, column=0, columnspan=2, sticky="w", pady=(6, 0))
+        row += 1
+
+        ttk.Checkbutton(
+            settings, text="Show upcoming events above the traces", variable=self.events_strip_var
+        ).grid(row=row, column=0, columnspan=2, sticky="w", pady=(6, 0))
+        row += 1
+
+        broadcast_frame = ttk.LabelFrame(settings, text="Broadcast", padding=8)
+        broadcast_frame.grid(row=row, column=0, columnspan=3, sticky="ew", pady=(8, 0))
+        ttk.Checkbutton(
+            broadcast_frame, text="Broadcast telemetry", variable=self.broadcast_var, command=self._toggle_broadcast
+        ).grid(row=0, column=0, sticky="w")
+        ttk.Label(broadcast_frame, text="UDP targets:").grid(row=0, column=1, sticky="w", padx=(10, 0))
+        ttk.Entry(broadcast_frame, textvariable=self.broadcast_udp_var, width=22).grid(row=0, column=2, sticky="w")
+        ttk.Label(broadcast_frame, text="WebSocket port (0 = off):").grid(row=0, column=3, sticky="w", padx=(10, 0))
+        ttk.Entry(broadcast_frame, textvariable=self.broadcast_ws_port_var, width=6).grid(row=0, column=4, sticky="w")
+        ttk.Checkbutton(
+            broadcast_frame,
+            text="Allow LAN WebSocket clients",
+            variable=self.broadcast_ws_lan_var,
+            command=self._toggle_broadcast,
+        ).grid(row=1, column=3, columnspan=2, sticky="w", padx=(10, 0), pady=(6, 0))
+        ttk.Checkbutton(
+            broadcast_frame,
+            text="Share with local apps (shared memory)",
+            variable=self.shared_memory_var,
+            command=self._toggle_shared_memory,
+        ).grid(row=1, column=0, columnspan=3, sticky="w", pady=(6, 0))
+        row += 1
+
         audio_frame = ttk.LabelFrame(settings, text="Audio", padding=8)
         audio_frame.grid(row=row, column=0, columnspan=3, sticky="ew", pady=(8, 0))
         ttk.Checkbutton(audio_frame, text="Brake cues", variable=self.audio_brake_var).grid(row=0, column=0, sticky="w")
@@ -1294,6 +4983,12 @@ class NishizumiApp:
             row=1, column=2, sticky="w", pady=(6, 0)
         )
 
+        ttk.Label(lines_frame, text="Extra:").grid(row=2, column=0, sticky="nw", pady=(6, 0), padx=(0, 10))
+        for idx, spec in enumerate(CHANNEL_REGISTRY):
+            ttk.Checkbutton(lines_frame, text=spec.label, variable=self.channel_vars[spec.name]).grid(
+                row=2 + idx // 3, column=1 + idx % 3, sticky="w", pady=(6, 0)
+            )
+
         row += 1
 
         ttk.Label(settings, textvariable=self.status_var, foreground="#6b6b6b").grid(
@@ -1305,6 +5000,64 @@ class NishizumiApp:
         self.debug_text = scrolledtext.ScrolledText(debug, height=16, width=80, state="disabled")
         self.debug_text.pack(fill=tk.BOTH, expand=True)
 
+    def _bind_setting(
+        self,
+        var: tk.Variable,
+        name: str,
+        cast: Callable[[Any], Any],
+        low: Optional[float] = None,
+        high: Optional[float] = None,
+        on_change: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Keep ``self.settings.<name>`` in step with ``var``, validated and clamped.
+
+        An entry that does not parse (for example while it is being typed)
+        leaves the last valid value in place. ``on_change`` runs only when the
+        stored value actually changes, and every change requests a redraw.
+        """
+
+        def write(*_args: Any) -> None:
+            try:
+                value = cast(var.get())
+            except (tk.TclError, ValueError, TypeError):
+                return
+            if isinstance(value, float) and not math.isfinite(value):
+                return
+            if low is not None and value < low:
+                value = cast(low)
+            if high is not None and value > high:
+                value = cast(high)
+            if value == getattr(self.settings, name):
+                return
+            setattr(self.settings, name, value)
+            self._request_redraw()
+            if on_change is not None:
+                on_change()
+
+        var.trace_add("write", write)
+        write()
+
+    def _thresholds(self) -> Tuple[float, float, float]:
+        settings = self.settings
+        return settings.brake_threshold, settings.lift_threshold, settings.power_threshold
+
+    def _apply_thresholds(self) -> None:
+        """Rebuild reference events when the thresholds differ from the ones they were built with."""
+        thresholds = self._thresholds()
+        self.lap_recorder.thresholds = thresholds
+        reference = self.reference
+        if reference is not None and (
+            reference.brake_threshold,
+            reference.lift_threshold,
+            reference.power_threshold,
+        ) != thresholds:
+            reference.refresh_thresholds(*thresholds)
+            self.reference_cache.rekey(reference, thresholds)
+            self._request_redraw()
+
+    def _apply_auto_best(self) -> None:
+        self.lap_recorder.enabled = self.settings.auto_best
+
     def _browse_ibt(self) -> None:
         path = filedialog.askopenfilename(
             title="Select IBT file", filetypes=[("IBT Files", "*.ibt"), ("All Files", "*")]
@@ -1314,23 +5067,137 @@ class NishizumiApp:
         self.ibt_path_var.set(path)
         self._load_reference(path)
 
-    def _load_reference(self, path: str) -> None:
+    def _apply_cache_budget(self) -> None:
+        self.reference_cache.set_budget(self.settings.reference_cache_mb * 1024 * 1024)
+
+    def _load_reference(self, path: str, primary: bool = True) -> None:
+        self.reference_loader.start(path, self._thresholds(), primary=primary)
+        self.cancel_load_button.state(["!disabled"])
+        self.status_var.set(self.reference_loader.progress_text())
+
+    def _browse_library(self) -> None:
+        path = filedialog.askdirectory(title="Select IBT library folder")
+        if not path:
+            return
+        self.library_dir_var.set(path)
+        self._scan_library()
+
+    def _scan_library(self) -> None:
+        root = self.library_dir_var.get().strip()
+        if not root or not os.path.isdir(root):
+            self.library_status_var.set("Library folder not found")
+            return
+        if self._library_scan and self._library_scan.is_alive():
+            return
+        self.library_status_var.set("Scanning library...")
+        self._library_scan = threading.Thread(target=self._run_library_scan, args=(root,), daemon=True)
+        self._library_scan.start()
+
+    def _run_library_scan(self, root: str) -> None:
         try:
-            self.reference = ReferenceLap(
-                path,
-                brake_threshold=self.brake_threshold_var.get(),
-                lift_threshold=self.lift_threshold_var.get(),
-                power_threshold=self.power_threshold_var.get(),
+            rescanned, removed, total = self.library.scan(root)
+            self.library.save()
+            self.logger.info(
+                "Library scan of %s: %d files, %d re-read, %d removed", root, total, rescanned, removed
             )
-            self.logger.info("Loaded reference IBT: %s", path)
         except Exception as exc:
-            messagebox.showerror("Failed to load IBT", str(exc))
-            self.reference = None
+            self.logger.warning("Library scan failed: %s", exc)
+
+    def _poll_library_scan(self) -> None:
+        if self._library_scan is not None and not self._library_scan.is_alive():
+            self._library_scan = None
+            self._library_key = None
+            self.library_status_var.set(f"{len(self.library)} IBT files indexed")
+
+    def _auto_select_reference(self, snapshot: TelemetrySnapshot) -> None:
+        """Load the library's best match for the live track and car once per combination.
+
+        A reference the user picked by hand (or a live personal best) is left alone.
+        """
+        if self.reference is not None and self.reference.path != self._auto_loaded_path:
+            return
+        if not self.settings.auto_library or not snapshot.track_name or self.reference_loader.busy:
+            return
+        key = (snapshot.track_name, snapshot.track_config, snapshot.car_path)
+        if key == self._library_key:
+            return
+        self._library_key = key
+        entry = self.library.find(*key)
+        if entry is None:
+            return
+        if self.reference is not None and self.reference.path == entry.path:
+            return
+        self.logger.info("Auto-loading library reference for %s / %s: %s", key[0], key[2], entry.path)
+        self._auto_loaded_path = entry.path
+        self.ibt_path_var.set(entry.path)
+        self._load_reference(entry.path)
+
+    def _cancel_reference_load(self) -> None:
+        self.reference_loader.cancel()
+
+    def _apply_loaded_reference(self) -> None:
+        """Swap in a finished background load between frames."""
+        result = self.reference_loader.poll()
+        if result is None:
+            return
+        if not self.reference_loader.busy:
+            self.cancel_load_button.state(["disabled"])
+        if result.cancelled:
+            self.logger.info("Reference load cancelled: %s", result.path)
+            self.status_var.set("Reference load cancelled.")
+            return
+        if result.error is not None or result.lap is None or result.row is None:
+            messagebox.showerror("Failed to load IBT", str(result.error))
+            return
+        if result.primary:
+            self.reference = result.lap
+            self.reference_set.install_row(0, result.row)
+            self.lap_recorder.best_time_s = result.lap.lap_time_s
+            self._apply_thresholds()  # They may have been edited while the file loaded
+            self.audio.reset()
+            self._request_redraw()
+            self.logger.info("Loaded reference IBT: %s", result.path)
+            self.status_var.set("Reference loaded. Connect to iRacing for live sync.")
+        else:
+            try:
+                self.reference_set.append_row(result.row)
+            except ValueError as exc:
+                messagebox.showerror("Failed to add IBT", str(exc))
+                return
+            self._request_redraw()
+            self.logger.info("Added comparison IBT: %s", result.path)
+        self._refresh_comparison_label()
+
+    def _browse_comparison_ibt(self) -> None:
+        if not self.reference:
+            messagebox.showinfo("Comparison laps", "Load a primary reference IBT first.")
             return
-        self.status_var.set("Reference loaded. Connect to iRacing for live sync.")
+        path = filedialog.askopenfilename(
+            title="Select comparison IBT file", filetypes=[("IBT Files", "*.ibt"), ("All Files", "*")]
+        )
+        if not path:
+            return
+        self._load_reference(path, primary=False)
+
+    def _clear_comparisons(self) -> None:
+        self.reference_set.clear_extras()
+        self._request_redraw()
+        self._refresh_comparison_label()
+
+    def _refresh_comparison_label(self) -> None:
+        names = self.reference_set.names[1:]
+        self.comparison_var.set(", ".join(names) if names else "None")
+
+    def _request_redraw(self) -> None:
+        """Draw the next tick even if no new telemetry sample has arrived."""
+        self._redraw_pending = True
 
     def _toggle_overlay(self, force_hide: bool = False) -> None:
-        if force_hide or not self.overlay_enabled_var.get():
+        self._request_redraw()
+        if force_hide:
+            for window in self.extra_overlays.values():
+                window.withdraw()
+        if force_hide or not self.settings.overlay_enabled:
             if self.overlay:
                 self.overlay.withdraw()
         else:
@@ -1339,54 +5206,250 @@ class NishizumiApp:
                 self._apply_overlay_size()
                 self._toggle_overlay_lock() # Apply current lock state
                 self.overlay.deiconify()
-                
+            for window in self.extra_overlays.values():
+                window.deiconify()
+
     def _toggle_overlay_lock(self) -> None:
+        is_locked = self.overlay_locked_var.get()
         if self.overlay:
-            is_locked = self.overlay_locked_var.get()
             self.overlay.toggle_resize_mode(not is_locked)
+        for window in self.extra_overlays.values():
+            window.toggle_resize_mode(not is_locked)
+
+    def _toggle_extra_window(self, key: str) -> None:
+        """Open or close one of the OVERLAY_WINDOW_PRESETS windows."""
+        window = self.extra_overlays.pop(key, None)
+        if window is not None:
+            window.destroy()
+        if not self.window_vars[key].get():
+            return
+        label, panels, (width, height), period_ms = OVERLAY_WINDOW_PRESETS[key]
+        offset = 40 * (1 + list(OVERLAY_WINDOW_PRESETS).index(key))
+        window = OverlayWindow(
+            self.root,
+            width,
+            height,
+            panels=panels,
+            title=f"Nishizumi IBT - {label}",
+            period_ms=period_ms,
+            position=(100 + offset, 100 + offset),
+        )
+        window.toggle_resize_mode(not self.overlay_locked_var.get())
+        self.extra_overlays[key] = window
+        self._request_redraw()
+
+    def _toggle_broadcast(self) -> None:
+        if self.broadcaster is not None:
+            self.broadcaster.close()
+            self.broadcaster = None
+        if not self.broadcast_var.get():
+            return
+        try:
+            targets = [
+                _parse_host_port(target)
+                for target in self.broadcast_udp_var.get().replace(";", ",").split(",")
+                if target.strip()
+            ]
+            self.broadcaster = TelemetryBroadcaster(
+                self.logger,
+                targets,
+                int(self.broadcast_ws_port_var.get()) or None,
+                ws_host=BROADCAST_WS_LAN_HOST if self.broadcast_ws_lan_var.get() else BROADCAST_WS_LOCAL_HOST,
+            )
+        except (ValueError, OSError, tk.TclError) as exc:
+            self.broadcast_var.set(False)
+            messagebox.showerror("Broadcast", f"Could not start broadcast: {exc}")
+            return
+        self.logger.info("Broadcasting telemetry (%d UDP targets)", len(targets))
+
+    def _restart_worker(self) -> None:
+        """Swap between thread and process acquisition, carrying subscriptions and outputs over."""
+        old = self.worker
+        ring = old.set_shared_ring(None)
+        old.stop()
+        # Two acquisition loops must never overlap: they share the lap recorder.
+        old.join(timeout=WORKER_STOP_TIMEOUT_S)
+        if old.is_alive():
+            self.logger.warning("Previous telemetry worker still running after %.1fs", WORKER_STOP_TIMEOUT_S)
+        worker: TelemetryWorker
+        if self.process_acquisition_var.get():
+            try:
+                worker = TelemetryProcessWorker(self.logger, lap_recorder=self.lap_recorder)
+            except (OSError, ValueError) as exc:
+                self.logger.warning("Process acquisition unavailable, using a thread: %s", exc)
+                self.process_acquisition_var.set(False)
+                worker = TelemetryWorker(self.logger, lap_recorder=self.lap_recorder)
+        else:
+            worker = TelemetryWorker(self.logger, lap_recorder=self.lap_recorder)
+        worker.subscribe(self._subscribed_channels())
+        worker.set_shared_ring(ring)
+        worker.reference = old.reference
+        self.worker = worker
+        worker.start()
+
+    def _toggle_shared_memory(self) -> None:
+        ring = self.worker.set_shared_ring(None)
+        if ring is not None:
+            ring.close()
+        if not self.shared_memory_var.get():
+            return
+        try:
+            self.worker.set_shared_ring(SharedTelemetryRing())
+        except (OSError, ValueError) as exc:
+            self.shared_memory_var.set(False)
+            messagebox.showerror("Shared memory", f"Could not create shared memory: {exc}")
+            return
+        self.logger.info("Publishing telemetry to shared memory '%s'", DEFAULT_SHARED_RING_NAME)
+
+    def _publish_broadcast(
+        self,
+        snapshot: TelemetrySnapshot,
+        lap_pct: float,
+        ref_values: Optional[Tuple[float, float, float]],
+    ) -> None:
+        next_event = next_reference_event(self.event_index, lap_pct)
+        self.broadcaster.publish(pack_broadcast_frame(snapshot, lap_pct, ref_values, next_event), snapshot.seq)
+
+    def _mark_channels_dirty(self) -> None:
+        self._channels_dirty = True
+
+    def _sync_channels(self) -> None:
+        """Apply channel selection changes: resubscribe live reads and prefetch reference columns."""
+        if self._channels_dirty:
+            self._channels_dirty = False
+            self.active_channels = [spec for spec in CHANNEL_REGISTRY if self.channel_vars[spec.name].get()]
+            self.stream_channels = tuple(spec for spec in self.active_channels if spec.lane == "stream")
+            self.worker.subscribe(self._subscribed_channels())
+            self._channel_source = None
+        reference = self.reference
+        if reference is self._channel_source:
+            return
+        self._channel_source = reference
+        if reference is None:
+            return
+        missing = [spec.name for spec in self.active_channels if not reference.channel_decoded(spec.name)]
+        if missing:
+            threading.Thread(target=self._prefetch_channels, args=(reference, missing), daemon=True).start()
+
+    def _subscribed_channels(self) -> List[str]:
+        names = [spec.name for spec in self.active_channels]
+        if self.settings.nearby_cars:
+            names.extend(CAR_IDX_CHANNELS)
+        return names
+
+    @staticmethod
+    def _prefetch_channels(reference: ReferenceLap, names: Sequence[str]) -> None:
+        for name in names:
+            reference.channel(name)
+
+    def _spatial_lap_pct(self, snapshot: TelemetrySnapshot, lap_pct: float) -> float:
+        """Replace LapDistPct with the position matched on the reference's GPS trace, when enabled."""
+        spatial = self.reference.spatial if self.reference else None
+        if spatial is None or not self.settings.spatial_align:
+            return lap_pct
+        if snapshot.lat is None or snapshot.lon is None:
+            return lap_pct
+        matched = spatial.match(snapshot.lat, snapshot.lon)
+        return lap_pct if matched is None else matched
+
+    def _update_segments(self, lap_pct: float, snapshot: TelemetrySnapshot, now: float) -> None:
+        """Advance the corner and sector timers against the primary reference."""
+        reference = self.reference
+        if reference is None:
+            self._segment_source = None
+            return
+        sectors_text = self.settings.sectors
+        if reference is not self._segment_source or sectors_text != self._sectors_text:
+            boundaries: List[float] = []
+            for part in sectors_text.replace(";", ",").split(","):
+                try:
+                    value = float(part)
+                except ValueError:
+                    continue
+                boundaries.append(value / 100.0 if value > 1.0 else value)
+            reference.set_custom_sectors(boundaries)
+            self.corner_tracker.reset(reference.corners)
+            self.sector_tracker.reset(reference.sectors)
+            self._segment_source = reference
+            self._sectors_text = sectors_text
+        session_time = snapshot.session_time if snapshot.session_time is not None else now
+        speed_mps = snapshot.speed_mps or 0.0
+        for tracker in (self.corner_tracker, self.sector_tracker):
+            result = tracker.update(lap_pct, session_time, speed_mps)
+            if result is not None:
+                self.last_segment = result
+                self.last_segment_at = now
+                self.logger.debug(
+                    "%s %+.3fs (min speed %+.1f kph)",
+                    result.segment.name,
+                    result.delta_s,
+                    result.min_speed_delta_mps * 3.6,
+                )
 
     def _ensure_overlay(self) -> None:
         if not self.overlay:
             self.overlay = OverlayWindow(self.root, *DEFAULT_OVERLAY_SIZE)
+            self.overlay.on_resize = self._on_overlay_resized
             self.overlay.withdraw()
+            self._apply_overlay_panels()
+            self._apply_overlay_size()
 
     def _update(self) -> None:
-        update_ms = max(5, int(self.update_ms_var.get()))
         snapshot = self.worker.get_snapshot()
         now = time.time()
+        # A new sample drives the whole pipeline; a pending redraw alone only re-derives and draws.
+        fresh = snapshot.seq != self.last_seq
+        if fresh:
+            self.last_seq_time = now
+        if self._is_idle(snapshot, now):
+            self.scheduler.configure(DEFAULT_IDLE_UPDATE_MS, DEFAULT_IDLE_UPDATE_MS)
+        else:
+            settings = self.settings
+            self.scheduler.configure(settings.update_ms, max(settings.update_ms, settings.render_ms))
+        render_frame = self.scheduler.begin_frame(has_work=fresh or self._redraw_pending)
+        self._apply_loaded_reference()
+        self._apply_live_best()
+        self._poll_library_scan()
+        self._sync_channels()
+        if self.worker.reference is not self.reference:
+            self.worker.reference = self.reference
+
+        if not fresh and not self._redraw_pending:
+            # Nothing moved since the last tick: skip recomputation and redraw.
+            if self.reference_loader.busy:
+                self._set_status(self._base_status)
+            self._schedule_next()
+            return
+        self.last_seq = snapshot.seq
 
-        if self.overlay_enabled_var.get():
+        settings = self.settings
+        if settings.overlay_enabled:
             self._ensure_overlay()
-            self._apply_overlay_size()
-
-        if self.reference:
-            self.reference.refresh_thresholds(
-                self.brake_threshold_var.get(),
-                self.lift_threshold_var.get(),
-                self.power_threshold_var.get(),
-            )
 
         if not snapshot.connected:
-            self.status_var.set("Waiting for iRacing telemetry...")
+            self._set_status("Waiting for iRacing telemetry...")
             self.last_live_lap_pct = None
             self.live_unwrapped_m = None
             self.last_gear = None
             self._update_debug()
-            self._schedule_next(update_ms)
+            self._schedule_next()
             return
 
+        self._auto_select_reference(snapshot)
+
         if snapshot.lap_pct is None:
-            self.status_var.set("Telemetry connected, waiting for data...")
+            self._set_status("Telemetry connected, waiting for data...")
             self.last_live_lap_pct = None
             self.live_unwrapped_m = None
             self.last_gear = None
             self._update_debug()
-            self._schedule_next(update_ms)
+            self._schedule_next()
             return
 
         lap_pct = snapshot.lap_pct
         if lap_pct > 1.5:
             lap_pct = lap_pct / 100.0
+        lap_pct = self._spatial_lap_pct(snapshot, lap_pct)
         throttle = snapshot.throttle or 0.0
         brake = snapshot.brake or 0.0
 
@@ -1405,16 +5468,33 @@ class NishizumiApp:
         ref_speed_mps = None
         ref_throttle = None
         ref_brake = None
+        comparison_refs = self._comparison_refs
+        comparison_refs.clear()
+        # Filled in place: the dict is recycled from the oldest history sample.
+        record = self.history.new_record()
         if self.reference:
-            ref_speed_mps = self.reference.ref_at_pct(self.reference.speed, lap_pct)
+            ref_values = self.reference_set.values_at(lap_pct)
+            ref_throttle, ref_brake, ref_speed_mps = ref_values[0]
             ref_speed_kph = (ref_speed_mps or 0.0) * 3.6
             speed_delta_kph = speed_kph - ref_speed_kph
-            ref_throttle = self.reference.ref_at_pct(self.reference.throttle, lap_pct)
-            ref_brake = self.reference.ref_at_pct(self.reference.brake, lap_pct)
+            for slot in range(1, len(ref_values)):
+                other_throttle, other_brake, other_speed_mps = ref_values[slot]
+                throttle_key, brake_key = REFERENCE_SLOT_KEYS[slot]
+                record[throttle_key] = other_throttle
+                record[brake_key] = other_brake
+                comparison_refs.append(
+                    (
+                        self.reference_set.names[slot],
+                        self.reference_set.colors[slot],
+                        speed_kph - other_speed_mps * 3.6,
+                    )
+                )
             ref_gear = self.reference.ref_gear_at_pct(lap_pct)
             if snapshot.gear is not None:
                 gear_hint = "match" if snapshot.gear == ref_gear else "mismatch"
 
+        self._update_segments(lap_pct, snapshot, now)
+
         track_len_m = snapshot.track_length_km * 1000.0 if snapshot.track_length_km else None
         if track_len_m:
             self.last_track_len_m = track_len_m
@@ -1423,60 +5503,102 @@ class NishizumiApp:
             track_len_display_m = self.reference.track_length_m
             self.last_track_len_m = track_len_display_m
         trace_track_len_m = track_len_display_m or ASSUMED_TRACK_LEN_M
+        self.event_index.sync(self.reference, trace_track_len_m)
+        if fresh:
+            self.event_comparer.update(self.reference, lap_pct, throttle, brake, trace_track_len_m, now)
+        if fresh and self.broadcaster is not None:
+            ref_values = (ref_throttle, ref_brake, ref_speed_mps) if self.reference else None
+            self._publish_broadcast(snapshot, lap_pct, ref_values)
         live_unwrapped_m = self._update_live_unwrapped(lap_pct, trace_track_len_m)
-        if live_unwrapped_m is not None:
-            self.samples.append(
-                {
-                    "t": now,
-                    "throttle": throttle,
-                    "brake": brake,
-                    "speed": speed_kph,
-                    "ref_throttle": ref_throttle,
-                    "ref_brake": ref_brake,
-                    "ref_speed": (ref_speed_mps or 0.0) * 3.6 if ref_speed_mps is not None else None,
-                }
-            )
-
-        if self.overlay_enabled_var.get() and self.overlay:
-            self.overlay.draw(
+        proximity = self.proximity
+        if settings.nearby_cars:
+            proximity.update(snapshot.extras, self.reference, trace_track_len_m)
+        else:
+            proximity.ahead = proximity.behind = None
+        channel_readouts = self._channel_readouts
+        channel_readouts.clear()
+        for spec in self.active_channels:
+            raw = snapshot.extras.get(spec.name)
+            ref_column = self.reference.loaded_channel(spec.name) if self.reference else None
+            ref_raw = self.reference.ref_at_pct(ref_column, lap_pct) if ref_column is not None else None
+            if spec.lane == "stream":
+                live_key, ref_key = CHANNEL_SAMPLE_KEYS[spec.name]
+                record[live_key] = spec.normalise(raw) if raw is not None else None
+                record[ref_key] = spec.normalise(ref_raw) if ref_raw is not None else None
+            else:
+                channel_readouts.append((spec, raw, ref_raw))
+        if fresh and live_unwrapped_m is not None:
+            record["t"] = now
+            record["throttle"] = throttle
+            record["brake"] = brake
+            record["speed"] = speed_kph
+            record["ref_throttle"] = ref_throttle
+            record["ref_brake"] = ref_brake
+            record["ref_speed"] = (ref_speed_mps or 0.0) * 3.6 if ref_speed_mps is not None else None
+            self.history.append(record)
+
+        main_due = settings.overlay_enabled and self.overlay is not None and render_frame
+        due = self._due_windows
+        due.clear()
+        for window in self.extra_overlays.values():
+            if window.due(now):
+                due.append(window)
+        if main_due or due:
+            frame = OverlayFrame(
+                now=now,
                 snapshot=snapshot,
                 ref=self.reference,
-                samples=self.samples,
-                flow_window_s=DEFAULT_FLOW_WINDOW_S,
-                lookahead_window_s=self.lookahead_window_var.get(),
+                history=self.history,
+                lap_pct=lap_pct,
+                track_len_m=track_len_display_m,
+                lookahead_m=lookahead_m,
                 speed_delta_kph=speed_delta_kph,
                 steering_deg=steering_deg,
                 gear=snapshot.gear,
                 gear_hint=gear_hint,
-                lap_pct=lap_pct,
-                track_len_m=track_len_display_m,
-                lookahead_m=lookahead_m,
-                ref_lead_s=float(self.ref_lead_s_var.get()),
-                show_live_throttle=self.show_live_throttle_var.get(),
-                show_live_brake=self.show_live_brake_var.get(),
-                show_ref_throttle=self.show_ref_throttle_var.get(),
-                show_ref_brake=self.show_ref_brake_var.get(),
+                flow_window_s=settings.flow_window_s,
+                lookahead_window_s=settings.lookahead_window_s,
+                ref_lead_s=settings.ref_lead_s,
+                show_live_throttle=settings.show_live_throttle,
+                show_live_brake=settings.show_live_brake,
+                show_ref_throttle=settings.show_ref_throttle,
+                show_ref_brake=settings.show_ref_brake,
+                comparison_refs=tuple(comparison_refs),
+                comparison_colors=tuple(color for _name, color, _delta in comparison_refs),
+                segment_readout=self.last_segment if now - self.last_segment_at < SEGMENT_READOUT_S else None,
+                event_feedback=self.event_comparer.feedback(now, SEGMENT_READOUT_S),
+                extra_streams=self.stream_channels,
+                channel_readouts=tuple(channel_readouts),
+                car_ahead=proximity.ahead,
+                car_behind=proximity.behind,
+                upcoming_events=tuple(
+                    self.event_index.upcoming(lap_pct, UPCOMING_EVENT_COUNT, out=self._upcoming_events)
+                ),
             )
-            self.overlay.deiconify()
-        elif self.overlay:
+            if main_due:
+                self.overlay.render(frame)
+                self.overlay.deiconify()
+            for window in due:
+                window.render(frame)
+        if main_due or not settings.overlay_enabled:
+            self._redraw_pending = False
+        if self.overlay and not settings.overlay_enabled:
             self.overlay.withdraw()
 
         self._maybe_play_gear_beep(snapshot.gear)
 
         if self.reference:
-            if track_len_display_m:
-                self.reference.set_event_distances(track_len_display_m)
             self.audio.update(
                 lap_pct=lap_pct,
                 track_len_m=track_len_display_m,
-                events=self.reference.events,
-                approach_a_s=max(0.5, float(self.approach_a_var.get())),
-                approach_b_s=max(0.25, float(self.approach_b_var.get())),
-                final_cue_offset_m=max(0.0, float(self.final_cue_offset_var.get())),
-                enable_brake=self.audio_brake_var.get(),
-                enable_lift=self.audio_lift_var.get(),
-                enable_power=self.audio_power_var.get(),
-                quiet_mode=self.quiet_mode_var.get(),
+                index=self.event_index,
+                approach_a_s=settings.approach_a_s,
+                approach_b_s=settings.approach_b_s,
+                final_cue_offset_m=settings.final_cue_offset_m,
+                enable_brake=settings.audio_brake,
+                enable_lift=settings.audio_lift,
+                enable_power=settings.audio_power,
+                quiet_mode=settings.quiet_mode,
                 speed_mps=snapshot.speed_mps,
             )
 
@@ -1484,15 +5606,46 @@ class NishizumiApp:
         next_brake_text = f"Next brake {next_brake:.0f}m" if next_brake is not None else "Next brake --"
         track_label = snapshot.track_name or "Unknown track"
         track_len_label = f"{track_len_display_m:.0f}m" if track_len_display_m else "--"
-        self.status_var.set(
-            f"Telemetry connected | {track_label} ({track_len_label}) | {next_brake_text}"
-        )
+        self._set_status(f"Telemetry connected | {track_label} ({track_len_label}) | {next_brake_text}")
 
         self._update_debug()
-        self._schedule_next(update_ms)
+        self._schedule_next()
+
+    def _set_status(self, text: str) -> None:
+        self._base_status = text
+        if self.reference_loader.busy:
+            text = f"{text} | {self.reference_loader.progress_text()}"
+        if text != self._status_text:
+            self._status_text = text
+            self.status_var.set(text)
+
+    def _apply_live_best(self) -> None:
+        """Swap in a finished live personal-best lap; only reference assignments happen here."""
+        ready = self.lap_recorder.poll()
+        if ready is None or not self.settings.auto_best:
+            # Auto-best may have been switched off while the lap was being built.
+            return
+        lap, row = ready
+        current = self.reference
+        if current is not None and (current.lap_time_s is None or lap.lap_time_s >= current.lap_time_s):
+            return
+        self.reference = lap
+        self.lap_recorder.best_time_s = lap.lap_time_s
+        self.reference_set.install_row(0, row)
+        self._apply_thresholds()
+        self.audio.reset()
+        self._request_redraw()
+        self.logger.info("New live personal best reference: %s", lap.path)
+
+    def _is_idle(self, snapshot: TelemetrySnapshot, now: float) -> bool:
+        if not snapshot.connected:
+            return True
+        if snapshot.speed_mps is not None and snapshot.speed_mps < IDLE_SPEED_MPS:
+            return True
+        return now - self.last_seq_time > IDLE_AFTER_S
 
     def _maybe_play_gear_beep(self, gear: Optional[int]) -> None:
-        if not self.audio_gear_beep_var.get():
+        if not self.settings.audio_gear_beep:
             self.last_gear = gear
             return
         if gear is None:
@@ -1506,18 +5659,24 @@ class NishizumiApp:
         self.last_gear = gear
 
     def _next_brake_distance(self, lap_pct: float, track_len_m: Optional[float]) -> Optional[float]:
-        if not self.reference or not self.reference.brake_points or not track_len_m:
+        """Metres to the next reference brake point; event_index must be synced to ``track_len_m``."""
+        if not track_len_m:
             return None
-        current_dist = lap_pct * track_len_m
-        dist_list = [p * track_len_m for p in self.reference.brake_points]
-        idx = bisect.bisect_left(dist_list, current_dist)
-        next_dist = dist_list[idx] if idx < len(dist_list) else dist_list[0]
-        distance_to = (next_dist - current_dist) % track_len_m
-        return distance_to
+        upcoming = self.event_index.next_event(lap_pct, kind="brake")
+        return upcoming.dist_m if upcoming is not None else None
 
     def _update_debug(self) -> None:
+        now = time.monotonic()
+        if now - self._debug_refreshed_at < DEBUG_REFRESH_S:
+            return
+        self._debug_refreshed_at = now
         self.debug_text.configure(state="normal")
         self.debug_text.delete("1.0", tk.END)
+        self.debug_text.insert(tk.END, self.scheduler.stats_text() + "\n")
+        self.debug_text.insert(tk.END, self.worker.stats_text() + "\n")
+        self.debug_text.insert(tk.END, self.reference_cache.stats_text() + "\n")
+        if self.broadcaster is not None:
+            self.debug_text.insert(tk.END, self.broadcaster.stats_text() + "\n")
         for entry in self.log_handler.entries:
             self.debug_text.insert(tk.END, entry + "\\n")
         self.debug_text.configure(state="disabled")
@@ -1547,34 +5706,699 @@ class NishizumiApp:
         self.last_live_lap_pct = lap_pct
         return self.live_unwrapped_m
 
-    def _schedule_next(self, update_ms: int) -> None:
-        self.root.after(update_ms, self._update)
+    def _schedule_next(self) -> None:
+        self.root.after(self.scheduler.end_frame(), self._update)
 
     def _apply_overlay_size(self) -> None:
-        if self.overlay and self.overlay._resize_mode:
-            # User is resizing with OS handles; mirror that into the entry fields.
-            width = max(1, self.overlay.winfo_width())
-            height = max(1, self.overlay.winfo_height())
-            self.overlay_width_var.set(width)
-            self.overlay_height_var.set(height)
-            return
-            
-        width = max(200, int(self.overlay_width_var.get()))
-        height = max(160, int(self.overlay_height_var.get()))
         if self.overlay:
-            self.overlay.set_size(width, height)
+            self.overlay.set_size(self.settings.overlay_width, self.settings.overlay_height)
+            self._request_redraw()
+
+    def _apply_overlay_panels(self) -> None:
+        if self.overlay:
+            extra = ("events",) if self.settings.events_strip else ()
+            self.overlay.panels = frozenset(OVERLAY_PANELS + extra)
+
+    def _on_overlay_resized(self, width: int, height: int) -> None:
+        # User is resizing with OS handles; mirror that into the entry fields.
+        self.overlay_width_var.set(max(1, width))
+        self.overlay_height_var.set(max(1, height))
 
     def _on_close(self) -> None:
         self.worker.stop()
+        self.lap_recorder.close()
+        if self.broadcaster is not None:
+            self.broadcaster.close()
+        if self.worker.shared_ring is not None:
+            self.shared_memory_var.set(False)
+            self._toggle_shared_memory()
         if self.overlay:
             self.overlay.destroy()
+        for window in self.extra_overlays.values():
+            window.destroy()
         self.root.destroy()
 
 
+ANALYSIS_CSV_FIELDS = (
+    "file",
+    "lap",
+    "lap_time_s",
+    "kind",
+    "lap_pct",
+    "dist_m",
+    "speed_kph",
+    "gear",
+    "corner_min_speed_kph",
+    "corner_min_dist_m",
+    "corner_min_gear",
+)
+
+
+def split_lap_segments(lap_pct: Sequence[float]) -> List[Tuple[int, int]]:
+    """Sample ranges between start/finish crossings, same rule as ``ReferenceLap``."""
+    segments = []
+    start = 0
+    for i in range(1, len(lap_pct)):
+        if lap_pct[i] < lap_pct[i - 1] - 0.5:
+            segments.append((start, i))
+            start = i
+    segments.append((start, len(lap_pct)))
+    return segments
+
+
+def summarize_lap(lap: ReferenceLap, track_len_m: Optional[float]) -> Dict[str, Any]:
+    """Events with distance, speed and gear, plus the minimum speed of each corner.
+
+    A corner runs from a brake event to the next power event (or next brake).
+    """
+    track_len_m = track_len_m or lap.track_length_m or ASSUMED_TRACK_LEN_M
+    events = []
+    for idx, event in enumerate(lap.events):
+        item: Dict[str, Any] = {
+            "kind": event.kind,
+            "lap_pct": round(event.lap_pct, 5),
+            "dist_m": round(event.lap_pct * track_len_m, 1),
+            "speed_kph": round(lap.ref_at_pct(lap.speed, event.lap_pct) * 3.6, 1),
+            "gear": lap.ref_gear_at_pct(event.lap_pct),
+        }
+        if event.kind == "brake":
+            end_pct = 1.0
+            for later in lap.events[idx + 1 :]:
+                if later.kind in ("power", "brake"):
+                    end_pct = later.lap_pct
+                    break
+            lo = bisect.bisect_left(lap.lap_pct, event.lap_pct)
+            hi = max(lo + 1, bisect.bisect_right(lap.lap_pct, end_pct))
+            hi = min(hi, len(lap.speed))
+            if lo < hi:
+                min_idx = min(range(lo, hi), key=lap.speed.__getitem__)
+                item["corner_min_speed_kph"] = round(lap.speed[min_idx] * 3.6, 1)
+                item["corner_min_dist_m"] = round(lap.lap_pct[min_idx] * track_len_m, 1)
+                item["corner_min_gear"] = lap.gear[min_idx]
+        events.append(item)
+    return {
+        "lap_time_s": round(lap.lap_time_s, 3) if lap.lap_time_s is not None else None,
+        "track_length_m": round(track_len_m, 1),
+        "samples": len(lap.lap_pct),
+        "events": events,
+    }
+
+
+def analyze_ibt_file(path: str, thresholds: Tuple[float, float, float]) -> Dict[str, Any]:
+    """Per-lap summaries for every lap in one IBT file (process pool worker)."""
+    result: Dict[str, Any] = {"file": path, "laps": []}
+    try:
+        result.update(read_ibt_metadata(path))
+    except Exception as exc:
+        result["metadata_error"] = str(exc)
+    try:
+        channels = read_ibt_channels(path, IBT_CHANNELS + ("Lap",))
+        lap_pct_all = channels.get("LapDistPct")
+        if not lap_pct_all:
+            raise ValueError("IBT file does not contain LapDistPct")
+        lap_numbers = channels.get("Lap")
+        for start, end in split_lap_segments(lap_pct_all):
+            if end - start < 2:
+                continue
+            lap_channels = {name: column[start:end] for name, column in channels.items() if column}
+            lap = ReferenceLap(path, *thresholds, channels=lap_channels)
+            summary = summarize_lap(lap, lap.track_length_m)
+            summary["lap"] = lap_numbers[start] if lap_numbers else len(result["laps"])
+            summary["complete"] = lap.lap_time_s is not None
+            result["laps"].append(summary)
+    except Exception as exc:
+        result["error"] = str(exc)
+    return result
+
+
+def _collect_ibt_paths(inputs: Sequence[str]) -> List[str]:
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for dirpath, _dirnames, filenames in os.walk(item):
+                paths.extend(
+                    os.path.join(dirpath, name) for name in filenames if name.lower().endswith(".ibt")
+                )
+        else:
+            paths.append(item)
+    return sorted(set(paths))
+
+
+def _write_analysis(results: List[Dict[str, Any]], fmt: str, out: Any) -> None:
+    if fmt == "json":
+        json.dump(results, out, indent=2)
+        out.write("\n")
+        return
+    writer = csv.DictWriter(out, fieldnames=ANALYSIS_CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for result in results:
+        for lap in result["laps"]:
+            for event in lap["events"]:
+                writer.writerow({"file": result["file"], "lap": lap["lap"], "lap_time_s": lap["lap_time_s"], **event})
+
+
+def analyze_main(argv: Sequence[str]) -> int:
+    """Headless batch analysis: ``nishizumi_ibt_overlay.py analyze FILES_OR_DIRS``.
+
+    Never imports tkinter or starts the telemetry worker.
+    """
+    parser = argparse.ArgumentParser(
+        prog="nishizumi_ibt_overlay.py analyze",
+        description="Summarize laps, brake/lift/power points and corner minimum speeds from IBT files.",
+    )
+    parser.add_argument("inputs", nargs="+", help="IBT files or directories to scan recursively")
+    parser.add_argument("--format", choices=("json", "csv"), default="json")
+    parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--brake-threshold", type=float, default=DEFAULT_BRAKE_THRESHOLD)
+    parser.add_argument("--lift-threshold", type=float, default=DEFAULT_LIFT_THRESHOLD)
+    parser.add_argument("--power-threshold", type=float, default=DEFAULT_POWER_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    paths = _collect_ibt_paths(args.inputs)
+    if not paths:
+        parser.error("no IBT files found")
+    thresholds = (args.brake_threshold, args.lift_threshold, args.power_threshold)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(analyze_ibt_file, paths, [thresholds] * len(paths)))
+
+    failed = [result for result in results if "error" in result]
+    for result in failed:
+        print(f"{result['file']}: {result['error']}", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as fh:
+            _write_analysis(results, args.format, fh)
+    else:
+        _write_analysis(results, args.format, sys.stdout)
+    return 1 if failed and len(failed) == len(results) else 0
+
+
+def _synthetic_lap_channels(
+    samples: int,
+    lap_time_s: float = 90.0,
+    track_len_m: float = 4000.0,
+    laps: int = 1,
+    shift_pct: float = 0.0,
+    pace: float = 1.0,
+    cars: int = 0,
+) -> Dict[str, Any]:
+    """``laps`` laps of plausible telemetry with a few braking zones.
+
+    shift_pct moves the braking zones and pace scales speed, so a synthetic
+    session can be compared against a synthetic reference; cars > 0 adds
+    CAR_IDX_CHANNELS columns for a field of that size. Used by the
+    ``selfcheck`` and ``render`` commands.
+    """
+    pct = [i / samples for i in range(samples)]
+    zones = tuple(zone + shift_pct for zone in (0.12, 0.35, 0.58, 0.81))
+    brake = [1.0 if any(0.0 <= p - zone < 0.03 for zone in zones) else 0.0 for p in pct]
+    throttle = [0.0 if b or any(0.03 <= p - zone < 0.05 for zone in zones) else 1.0 for p, b in zip(pct, brake)]
+    lap_s = lap_time_s / pace
+    channels = {
+        "LapDistPct": pct * laps,
+        "LapDist": [p * track_len_m for p in pct] * laps,
+        "Throttle": throttle * laps,
+        "Brake": brake * laps,
+        "Speed": [(45.0 - 20.0 * b) * pace for b in brake] * laps,
+        "Gear": [3 if b else 5 for b in brake] * laps,
+        "SteeringWheelAngle": [0.4 * math.sin(p * 8 * math.pi) for p in pct] * laps,
+        "SessionTime": [(lap + p) * lap_s for lap in range(laps) for p in pct],
+    }
+    if cars:
+        ticks = [_synthetic_car_extras(cars, lap + p) for lap in range(laps) for p in pct]
+        for name in CAR_IDX_CHANNELS:
+            channels[name] = [tick[name] for tick in ticks]
+    return channels
+
+
+def _synthetic_car_extras(cars: int, race_laps: float) -> Dict[str, Any]:
+    """One tick of CAR_IDX_CHANNELS: ``cars`` cars spread around the lap, the player
+    in slot 0 at ``race_laps`` and every third car gaining or losing 1% a lap."""
+    race = [race_laps + k / cars + 0.01 * (k % 3 - 1) * race_laps for k in range(cars)]
+    race[0] = race_laps
+    position = [0] * CAR_IDX_SLOTS
+    for rank, k in enumerate(sorted(range(cars), key=race.__getitem__, reverse=True), start=1):
+        position[k] = rank
+    empty = CAR_IDX_SLOTS - cars
+    return {
+        "PlayerCarIdx": 0,
+        "CarIdxLapDistPct": [laps % 1.0 for laps in race] + [-1.0] * empty,
+        "CarIdxLap": [int(laps) for laps in race] + [-1] * empty,
+        "CarIdxOnPitRoad": [False] * CAR_IDX_SLOTS,
+        "CarIdxClassPosition": position,
+    }
+
+
+# Largest transient allocation one overlay frame may make (selfcheck --peak-budget).
+SELFCHECK_FRAME_PEAK_BYTES = 8 * 1024
+
+
+class _NullCanvas:
+    """Canvas that discards every item, so drawing can be measured without a backend."""
+
+    def _create(self, *_args: Any, **_kwargs: Any) -> int:
+        return 0
+
+    create_line = create_polygon = create_rectangle = create_oval = create_text = _create
+
+    def bbox(self, _item: int) -> Tuple[int, int, int, int]:
+        return 0, 0, 0, 0
+
+    def delete(self, _tag: str = "all") -> None:
+        pass
+
+
+@dataclass(**_DATACLASS_SLOTS)
+class AllocationReport:
+    frames: int
+    net_bytes: int  # Still allocated after the measured frames
+    frame_peak_bytes: int  # Largest transient allocation inside any single frame
+
+    @property
+    def net_per_frame(self) -> float:
+        return self.net_bytes / self.frames
+
+
+def measure_frame_allocations(frames: int = 2000) -> AllocationReport:
+    """Drive synthetic frames through the per-frame path under tracemalloc.
+
+    Covers reference lookup, trace history, event comparison and feedback,
+    segment timing, upcoming-event lookups, line building and a full
+    OverlayRenderer.draw into a null canvas. Measuring starts once every
+    buffer has reached its steady size; the peak is reset at the start of
+    each frame, so memory allocated and freed within a frame still counts.
+    """
+    import tracemalloc
+
+    hz = 60.0
+    lap_time_s = 90.0
+    track_len_m = 4000.0
+    lap = ReferenceLap(
+        "selfcheck",
+        DEFAULT_BRAKE_THRESHOLD,
+        DEFAULT_LIFT_THRESHOLD,
+        DEFAULT_POWER_THRESHOLD,
+        channels=_synthetic_lap_channels(int(lap_time_s * hz), lap_time_s, track_len_m),
+    )
+    reference_set = ReferenceSet()
+    reference_set.set_primary(lap)
+    reference_set.add(lap)
+    # A small history reaches its steady state (every level full) within seconds.
+    history = TraceHistory(base_bucket_s=0.05, records=16)
+    comparer = LiveEventComparer()
+    segments = SegmentTracker()
+    segments.reset(lap.sectors or lap.corners)
+    index = EventIndex()
+    index.sync(lap, track_len_m)
+    upcoming: List[UpcomingEvent] = []
+    decimator = ColumnDecimator()
+    pool = PointBufferPool()
+    lines: List[List[float]] = []
+    window: List[Dict[str, Any]] = []
+    keys = ("throttle", "brake", "ref_throttle", "ref_brake") + REFERENCE_SLOT_KEYS[1]
+    renderer = OverlayRenderer(_NullCanvas(), *DEFAULT_OVERLAY_SIZE, OVERLAY_PANELS + ("events",), quality="low")
+    snapshot = TelemetrySnapshot(connected=True, gear=3, steering=0.1)
+    frame = 0
+
+    def run(count: int, traced: bool = False, draw: bool = True) -> int:
+        nonlocal frame
+        worst = 0
+        for _ in range(count):
+            if traced:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+            now = frame / hz
+            frame += 1
+            lap_pct = (now / lap_time_s) % 1.0
+            values = reference_set.values_at(lap_pct)
+            throttle, brake, speed_mps = values[0]
+            record = history.new_record()
+            record["t"] = now
+            record["throttle"] = throttle
+            record["brake"] = brake
+            record["ref_throttle"] = throttle
+            record["ref_brake"] = brake
+            record[REFERENCE_SLOT_KEYS[1][0]] = values[1][0]
+            record[REFERENCE_SLOT_KEYS[1][1]] = values[1][1]
+            history.append(record)
+            comparer.update(lap, lap_pct, throttle, brake, track_len_m, now)
+            segments.update(lap_pct, now, speed_mps)
+            index.upcoming(lap_pct, UPCOMING_EVENT_COUNT, out=upcoming)
+            index.next_event(lap_pct, kind="brake")
+            pool.reset()
+            history.window(60.0, 400, out=window)
+            for key in keys:
+                build_line_points(window, key, 20, 300, 240, now - 60.0, 60.0, 420.0, 0.0, decimator, pool, lines)
+            if not draw:
+                continue
+            renderer.draw(
+                OverlayFrame(
+                    now=now,
+                    snapshot=snapshot,
+                    ref=lap,
+                    history=history,
+                    lap_pct=lap_pct,
+                    track_len_m=track_len_m,
+                    lookahead_m=DEFAULT_LOOKAHEAD_DISTANCE_M,
+                    speed_delta_kph=speed_mps * 0.1,
+                    steering_deg=5.0,
+                    gear=3,
+                    gear_hint="match",
+                    flow_window_s=DEFAULT_FLOW_WINDOW_S,
+                    lookahead_window_s=DEFAULT_LOOKAHEAD_WINDOW_S,
+                    event_feedback=comparer.feedback(now, SEGMENT_READOUT_S),
+                    upcoming_events=tuple(upcoming),
+                )
+            )
+            if traced:
+                worst = max(worst, tracemalloc.get_traced_memory()[1] - base)
+        return worst
+
+    # Warm up until every history level has wrapped, then once more under tracing
+    # so that objects replacing untraced ones are not counted as growth. Drawing
+    # dominates the cost and keeps no history, so only the last few seconds draw.
+    cycle = int(history.bucket_s[-1] * (history.records + 1) * hz)
+    run(max(cycle, int(lap_time_s * hz)), draw=False)
+    tracemalloc.start()
+    try:
+        run(cycle, draw=False)
+        run(int(hz * 5))
+        start = tracemalloc.get_traced_memory()[0]
+        frame_peak = run(frames, traced=True)
+        end = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return AllocationReport(frames, end - start, frame_peak)
+
+
+def selfcheck_main(argv: Sequence[str]) -> int:
+    """Per-frame allocation check: ``nishizumi_ibt_overlay.py selfcheck``.
+
+    Runs measure_frame_allocations and fails when either the memory retained
+    per frame or the largest allocation made inside one frame is over budget.
+    Never imports tkinter.
+    """
+    parser = argparse.ArgumentParser(
+        prog="nishizumi_ibt_overlay.py selfcheck",
+        description="Check that the per-frame hot path stays within an allocation budget.",
+    )
+    parser.add_argument("--frames", type=int, default=2000, help="Measured frames (default: 2000)")
+    parser.add_argument("--budget", type=int, default=64, help="Allowed net bytes per frame (default: 64)")
+    parser.add_argument(
+        "--peak-budget",
+        type=int,
+        default=SELFCHECK_FRAME_PEAK_BYTES,
+        help=f"Allowed transient bytes within one frame (default: {SELFCHECK_FRAME_PEAK_BYTES})",
+    )
+    args = parser.parse_args(argv)
+
+    report = measure_frame_allocations(args.frames)
+    ok = report.net_per_frame <= args.budget and report.frame_peak_bytes <= args.peak_budget
+    print(
+        f"{args.frames} frames: net {report.net_bytes} B ({report.net_per_frame:.1f} B/frame, "
+        f"budget {args.budget}), frame peak {report.frame_peak_bytes} B (budget {args.peak_budget}) "
+        f"-> {'OK' if ok else 'OVER BUDGET'}"
+    )
+
+    track_len_m = 4000.0
+    lap = ReferenceLap(
+        "selfcheck",
+        DEFAULT_BRAKE_THRESHOLD,
+        DEFAULT_LIFT_THRESHOLD,
+        DEFAULT_POWER_THRESHOLD,
+        channels=_synthetic_lap_channels(5400, 90.0, track_len_m),
+    )
+
+    # The gap engine scans every CarIdx slot, so its cost should not depend on the field size.
+    proximity = ProximityEngine()
+    costs = []
+    for cars in (10, CAR_IDX_SLOTS):
+        extras = _synthetic_car_extras(cars, 3.25)
+        started = time.perf_counter()
+        for _ in range(args.frames):
+            proximity.update(extras, lap, track_len_m)
+        costs.append((time.perf_counter() - started) / args.frames * 1e6)
+    print(f"proximity update: 10 cars {costs[0]:.1f} us, {CAR_IDX_SLOTS} cars {costs[1]:.1f} us")
+
+    # Upcoming-event lookups bisect a prebuilt index, so they should not grow with the event count.
+    kinds = tuple(EVENT_KIND_STYLES)
+    index = EventIndex()
+    upcoming: List[UpcomingEvent] = []
+    costs = []
+    for count in (30, 3000):
+        lap.events = [RefEvent(kinds[i % len(kinds)], i / count) for i in range(count)]
+        index.sync(lap, track_len_m)
+        started = time.perf_counter()
+        for step in range(args.frames):
+            index.upcoming(step / args.frames, UPCOMING_EVENT_COUNT, out=upcoming)
+        costs.append((time.perf_counter() - started) / args.frames * 1e6)
+    print(f"upcoming events: 30 events {costs[0]:.1f} us, 3000 events {costs[1]:.1f} us")
+    return 0 if ok else 1
+
+
+def replay_overlay_frames(
+    channels: Dict[str, Any],
+    reference: Optional[ReferenceLap],
+    settings: Optional[OverlaySettings] = None,
+    hz: float = 60.0,
+):
+    """Yield one OverlayFrame per sample of a recorded or synthetic session.
+
+    Mirrors the derived values NishizumiApp._update computes, without Tk or a
+    live sim. Frames share one TraceHistory, so render each before advancing.
+    """
+    settings = settings or OverlaySettings()
+    lap_pct_all = channels["LapDistPct"]
+    session_time = channels.get("SessionTime")
+    lap_dist = channels.get("LapDist")
+    track_len_m = (reference.track_length_m if reference else None) or (max(lap_dist) if lap_dist else None)
+    trace_track_len_m = track_len_m or ASSUMED_TRACK_LEN_M
+    reference_set = ReferenceSet()
+    if reference is not None:
+        reference_set.set_primary(reference)
+    event_index = EventIndex()
+    event_index.sync(reference, trace_track_len_m)
+    upcoming_events: List[UpcomingEvent] = []
+    history = TraceHistory()
+    comparer = LiveEventComparer()
+    trackers = (SegmentTracker(), SegmentTracker())
+    if reference is not None:
+        trackers[0].reset(reference.corners)
+        trackers[1].reset(reference.sectors)
+    last_segment: Optional[SegmentResult] = None
+    last_segment_at = -SEGMENT_READOUT_S
+    car_columns = [name for name in CAR_IDX_CHANNELS if channels.get(name)]
+    proximity = ProximityEngine() if "CarIdxLapDistPct" in car_columns else None
+    car_extras: Dict[str, Any] = {}
+
+    def column(name: str, idx: int) -> Optional[float]:
+        values = channels.get(name)
+        return values[idx] if values else None
+
+    for idx in range(len(lap_pct_all)):
+        now = session_time[idx] if session_time else idx / hz
+        lap_pct = lap_pct_all[idx]
+        if lap_pct > 1.5:
+            lap_pct /= 100.0
+        throttle = column("Throttle", idx) or 0.0
+        brake = column("Brake", idx) or 0.0
+        speed_mps = column("Speed", idx)
+        gear = column("Gear", idx)
+        steering = column("SteeringWheelAngle", idx)
+        gear = int(gear) if gear is not None else None
+        snapshot = TelemetrySnapshot(
+            connected=True,
+            timestamp=now,
+            seq=idx + 1,
+            tick=idx,
+            lap_pct=lap_pct,
+            throttle=throttle,
+            brake=brake,
+            steering=steering,
+            gear=gear,
+            speed_mps=speed_mps,
+            session_time=now,
+        )
+        speed_kph = (speed_mps or 0.0) * 3.6
+        record = history.new_record()
+        record["t"] = now
+        record["throttle"] = throttle
+        record["brake"] = brake
+        record["speed"] = speed_kph
+        speed_delta_kph = None
+        gear_hint = ""
+        if reference is not None:
+            ref_throttle, ref_brake, ref_speed_mps = reference_set.values_at(lap_pct)[0]
+            record["ref_throttle"] = ref_throttle
+            record["ref_brake"] = ref_brake
+            record["ref_speed"] = ref_speed_mps * 3.6
+            speed_delta_kph = speed_kph - ref_speed_mps * 3.6
+            if gear is not None:
+                gear_hint = "match" if gear == reference.ref_gear_at_pct(lap_pct) else "mismatch"
+            for tracker in trackers:
+                result = tracker.update(lap_pct, now, speed_mps or 0.0)
+                if result is not None:
+                    last_segment = result
+                    last_segment_at = now
+        history.append(record)
+        comparer.update(reference, lap_pct, throttle, brake, trace_track_len_m, now)
+        if proximity is not None:
+            for name in car_columns:
+                car_extras[name] = channels[name][idx]
+            proximity.update(car_extras, reference, trace_track_len_m)
+        yield OverlayFrame(
+            now=now,
+            snapshot=snapshot,
+            ref=reference,
+            history=history,
+            lap_pct=lap_pct,
+            track_len_m=track_len_m,
+            lookahead_m=DEFAULT_LOOKAHEAD_DISTANCE_M,
+            speed_delta_kph=speed_delta_kph,
+            steering_deg=steering * 57.2958 if steering is not None else None,
+            gear=gear,
+            gear_hint=gear_hint,
+            flow_window_s=settings.flow_window_s,
+            lookahead_window_s=settings.lookahead_window_s,
+            ref_lead_s=settings.ref_lead_s,
+            show_live_throttle=settings.show_live_throttle,
+            show_live_brake=settings.show_live_brake,
+            show_ref_throttle=settings.show_ref_throttle,
+            show_ref_brake=settings.show_ref_brake,
+            segment_readout=last_segment if now - last_segment_at < SEGMENT_READOUT_S else None,
+            event_feedback=comparer.feedback(now, SEGMENT_READOUT_S),
+            car_ahead=proximity.ahead if proximity is not None else None,
+            car_behind=proximity.behind if proximity is not None else None,
+            upcoming_events=tuple(event_index.upcoming(lap_pct, UPCOMING_EVENT_COUNT, out=upcoming_events)),
+        )
+
+
+def _compare_images(image: Any, golden_path: str, tolerance: int) -> Optional[float]:
+    """Fraction of pixels differing by more than ``tolerance`` in any channel; None if no golden."""
+    from PIL import Image, ImageChops
+
+    if not os.path.exists(golden_path):
+        return None
+    with Image.open(golden_path) as golden:
+        golden = golden.convert("RGB")
+        if golden.size != image.size:
+            return 1.0
+        diff = ImageChops.difference(image.convert("RGB"), golden).convert("L")
+    histogram = diff.histogram()
+    return sum(histogram[tolerance + 1 :]) / float(image.size[0] * image.size[1])
+
+
+def render_main(argv: Sequence[str]) -> int:
+    """Headless rendering harness: ``nishizumi_ibt_overlay.py render [SESSION.ibt]``.
+
+    Replays a session (or a synthetic one) through off-screen renderers, writes
+    the selected frames as PNG, optionally compares them with golden images,
+    and reports draw throughput per renderer and quality. Needs Pillow but no
+    display and never imports tkinter.
+    """
+    parser = argparse.ArgumentParser(
+        prog="nishizumi_ibt_overlay.py render",
+        description="Render overlay frames off-screen for golden-image checks and draw benchmarks.",
+    )
+    parser.add_argument("session", nargs="?", help="IBT file to replay (default: a synthetic session)")
+    parser.add_argument("--reference", help="Reference IBT (default: synthetic reference lap)")
+    parser.add_argument("--frames", type=int, default=1200, help="Frames to replay (default: 1200)")
+    parser.add_argument("--skip", type=int, default=0, help="Session samples to skip first")
+    parser.add_argument("--save", default="300,600,900,1199", help="Comma-separated frame numbers to write")
+    parser.add_argument("--out", default="overlay_frames", help="Directory for written frames")
+    parser.add_argument("--golden", help="Directory of golden PNGs to compare the written frames with")
+    parser.add_argument("--tolerance", type=int, default=8, help="Per-channel difference ignored (0-255)")
+    parser.add_argument("--max-diff", type=float, default=0.002, help="Allowed fraction of differing pixels")
+    parser.add_argument(
+        "--renderer",
+        action="append",
+        choices=("main",) + tuple(OVERLAY_WINDOW_PRESETS),
+        help="Renderer to run (repeatable; default: all)",
+    )
+    parser.add_argument(
+        "--quality", action="append", choices=tuple(OVERLAY_QUALITY), help="Quality to run (repeatable; default: all)"
+    )
+    parser.add_argument("--scale", type=int, default=1, help="Supersampling factor")
+    args = parser.parse_args(argv)
+
+    thresholds = (DEFAULT_BRAKE_THRESHOLD, DEFAULT_LIFT_THRESHOLD, DEFAULT_POWER_THRESHOLD)
+    if args.reference:
+        reference = ReferenceLap(args.reference, *thresholds)
+    else:
+        reference = ReferenceLap("synthetic", *thresholds, channels=_synthetic_lap_channels(5400))
+    if args.session:
+        channels = read_ibt_channels(args.session, IBT_CHANNELS + CAR_IDX_CHANNELS)
+        if not channels.get("LapDistPct"):
+            parser.error("session file does not contain LapDistPct")
+    else:
+        channels = _synthetic_lap_channels(5400, laps=2, shift_pct=0.004, pace=0.97, cars=12)
+    end = args.skip + args.frames
+    channels = {name: values[args.skip : end] for name, values in channels.items() if values}
+
+    try:
+        save = {int(part) for part in args.save.split(",") if part.strip()}
+    except ValueError:
+        parser.error("--save takes comma-separated frame numbers")
+    renderers = args.renderer or ["main", *OVERLAY_WINDOW_PRESETS]
+    qualities = args.quality or list(OVERLAY_QUALITY)
+    os.makedirs(args.out, exist_ok=True)
+
+    failures = 0
+    print(f"{'renderer':<8} {'quality':<7} {'frames':>6} {'fps':>8} {'mean ms':>8} {'p95 ms':>8}")
+    for name in renderers:
+        if name == "main":
+            panels, (width, height) = OVERLAY_PANELS, DEFAULT_OVERLAY_SIZE
+        else:
+            _label, panels, (width, height), _period_ms = OVERLAY_WINDOW_PRESETS[name]
+        for quality in qualities:
+            canvas = ImageCanvas(width, height, scale=args.scale)
+            renderer = OverlayRenderer(canvas, width, height, panels, quality=quality)
+            times: List[float] = []
+            for index, frame in enumerate(replay_overlay_frames(channels, reference)):
+                started = time.perf_counter()
+                renderer.draw(frame)
+                times.append(time.perf_counter() - started)
+                if index not in save:
+                    continue
+                filename = f"{name}_{quality}_{index:06d}.png"
+                image = canvas.image()
+                image.save(os.path.join(args.out, filename))
+                if args.golden:
+                    diff = _compare_images(image, os.path.join(args.golden, filename), args.tolerance)
+                    if diff is None or diff > args.max_diff:
+                        failures += 1
+                        detail = "missing golden" if diff is None else f"{diff:.4%} of pixels differ"
+                        print(f"MISMATCH {filename}: {detail}", file=sys.stderr)
+            if not times:
+                continue
+            times.sort()
+            mean = sum(times) / len(times)
+            p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+            print(f"{name:<8} {quality:<7} {len(times):>6} {1.0 / mean:>8.1f} {mean * 1000:>8.2f} {p95 * 1000:>8.2f}")
+    if args.golden:
+        print(f"Golden comparison: {'OK' if not failures else f'{failures} mismatches'}")
+    return 1 if failures else 0
+
+
 def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "analyze":
+        sys.exit(analyze_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "broadcast":
+        sys.exit(broadcast_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "listen":
+        sys.exit(listen_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "selfcheck":
+        sys.exit(selfcheck_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "render":
+        sys.exit(render_main(sys.argv[2:]))
+    _import_tk()
     root = tk.Tk()
     app = NishizumiApp(root)
     app._toggle_overlay()
+    # Startup objects live for the whole session; moving them to the permanent
+    # generation keeps full collections (and their frame hitches) short.
+    gc.collect()
+    gc.freeze()
     root.mainloop()
 
 
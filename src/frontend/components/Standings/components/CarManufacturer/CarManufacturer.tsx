@@ -1,6 +1,24 @@
 import carLogoImage from '../../../../assets/img/car_manufacturer.png';
+import carLogoImage2x from '../../../../assets/img/car_manufacturer@2x.png';
+import carLogoWebp from '../../../../assets/img/car_manufacturer.webp';
+import carLogoWebp2x from '../../../../assets/img/car_manufacturer@2x.webp';
 import { CAR_ID_TO_CAR_MANUFACTURER } from './carManufacturerMapping';
-import { CAR_MANUFACTURER_SPRITE_POSITIONS, SPRITES_PER_ROW, SPRITES_PER_COLUMN } from './carManufacturerSpritePositions';
+import {
+  ATLAS_HEIGHT,
+  ATLAS_WIDTH,
+  CAR_MANUFACTURER_SPRITE_POSITIONS,
+  SPRITE_SIZE,
+} from './carManufacturerSpritePositions';
+
+const CAR_LOGO_IMAGE_SET = `image-set(${[
+  `url(${carLogoWebp}) type('image/webp') 1x`,
+  `url(${carLogoWebp2x}) type('image/webp') 2x`,
+  `url(${carLogoImage}) type('image/png') 1x`,
+  `url(${carLogoImage2x}) type('image/png') 2x`,
+].join(', ')})`;
+
+// Atlas rectangles are in 2x pixels; one SPRITE_SIZE cell is 1em.
+const toEm = (px: number) => `${px / SPRITE_SIZE}em`;
 
 interface CarManufacturerProps {
   carId: number;
@@ -17,23 +35,32 @@ export const CarManufacturer = ({
     return null;
   }
 
-  const position = CAR_MANUFACTURER_SPRITE_POSITIONS[carManufacturer];
-  const spriteSizeEm = 1;
-  const backgroundSize = `${SPRITES_PER_ROW * spriteSizeEm}em ${SPRITES_PER_COLUMN * spriteSizeEm}em`;
-  const backgroundPosition = `${-position.x * spriteSizeEm}em ${-position.y * spriteSizeEm}em`;
+  const sprite = CAR_MANUFACTURER_SPRITE_POSITIONS[carManufacturer];
 
   return (
     <span
-      className="inline-block w-[1em] h-[1em] bg-no-repeat scale-125"
+      className="relative inline-block w-[1em] h-[1em] scale-125"
       style={{
-        backgroundImage: `url(${carLogoImage})`,
-        backgroundSize,
-        backgroundPosition,
-        imageRendering: 'auto',
         transform: 'translateZ(0)',
         backfaceVisibility: 'hidden',
         willChange: 'transform',
       }}
-    />
+    >
+      {sprite.w > 0 && (
+        <span
+          className="absolute bg-no-repeat"
+          style={{
+            left: toEm(sprite.offsetX),
+            top: toEm(sprite.offsetY),
+            width: toEm(sprite.w),
+            height: toEm(sprite.h),
+            backgroundImage: CAR_LOGO_IMAGE_SET,
+            backgroundSize: `${toEm(ATLAS_WIDTH)} ${toEm(ATLAS_HEIGHT)}`,
+            backgroundPosition: `${toEm(-sprite.x)} ${toEm(-sprite.y)}`,
+            imageRendering: 'auto',
+          }}
+        />
+      )}
+    </span>
   );
 };
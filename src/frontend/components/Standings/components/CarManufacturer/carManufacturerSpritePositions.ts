@@ -1,46 +1,60 @@
 export const SPRITE_SIZE = 256;
-export const SPRITES_PER_ROW = 7;
-export const SPRITES_PER_COLUMN = 6;
+export const ATLAS_WIDTH = 1296;
+export const ATLAS_HEIGHT = 1222;
 
-export const CAR_MANUFACTURER_SPRITE_POSITIONS: Record<string, { x: number; y: number }> = {
-  acura: { x: 1, y: 0 },
-  astonmartin: { x: 2, y: 0 },
-  audi: { x: 3, y: 0 },
-  bmw: { x: 4, y: 0 },
-  bmwm: { x: 5, y: 0 },
-  buick: { x: 6, y: 0 },
-  cadillac: { x: 0, y: 1 },
-  chevrolet: { x: 1, y: 1 },
-  dallara: { x: 2, y: 1 },
-  ferrari: { x: 3, y: 1 },
-  fia: { x: 4, y: 1 },
-  ford: { x: 5, y: 1 },
-  holden: { x: 6, y: 1 },
-  honda: { x: 0, y: 2 },
-  hpd: { x: 1, y: 2 },
-  hyundai: { x: 2, y: 2 },
-  iracing: { x: 3, y: 2 },
-  kia: { x: 4, y: 2 },
-  lamborghini: { x: 5, y: 2 },
-  ligier: { x: 6, y: 2 },
-  lotus: { x: 0, y: 3 },
-  mazda: { x: 1, y: 3 },
-  mclaren: { x: 2, y: 3 },
-  mercedes: { x: 3, y: 3 },
-  nissan: { x: 4, y: 3 },
-  pontiac: { x: 5, y: 3 },
-  porsche: { x: 6, y: 3 },
-  radical: { x: 0, y: 4 },
-  renault: { x: 1, y: 4 },
-  riley: { x: 2, y: 4 },
-  ruf: { x: 3, y: 4 },
-  scca: { x: 4, y: 4 },
-  skipbarber: { x: 5, y: 4 },
-  srx: { x: 6, y: 4 },
-  subaru: { x: 0, y: 5 },
-  toyota: { x: 1, y: 5 },
-  unknown: { x: 0, y: 0 },
-  vw: { x: 2, y: 5 },
-  williams: { x: 3, y: 5 },
+/**
+ * Where a logo sits in the atlas (x, y, w, h) and where that trimmed box sits
+ * inside its SPRITE_SIZE cell (offsetX, offsetY). All values are 2x pixels;
+ * the 1x atlas is exactly half. A zero-size sprite draws nothing.
+ */
+export interface SpriteRect {
+  x: number;
+  y: number;
+  w: number;
+  h: number;
+  offsetX: number;
+  offsetY: number;
+}
+
+export const CAR_MANUFACTURER_SPRITE_POSITIONS: Record<string, SpriteRect> = {
+  acura: { x: 456, y: 0, w: 256, h: 252, offsetX: 0, offsetY: 2 },
+  astonmartin: { x: 780, y: 1146, w: 256, h: 60, offsetX: 0, offsetY: 98 },
+  audi: { x: 1028, y: 1026, w: 256, h: 92, offsetX: 0, offsetY: 82 },
+  bmw: { x: 240, y: 260, w: 222, h: 220, offsetX: 16, offsetY: 18 },
+  bmwm: { x: 768, y: 1026, w: 256, h: 94, offsetX: 0, offsetY: 80 },
+  buick: { x: 330, y: 880, w: 132, h: 132, offsetX: 62, offsetY: 62 },
+  cadillac: { x: 520, y: 1026, w: 244, h: 96, offsetX: 6, offsetY: 80 },
+  chevrolet: { x: 260, y: 1146, w: 256, h: 72, offsetX: 0, offsetY: 92 },
+  dallara: { x: 976, y: 0, w: 254, h: 236, offsetX: 0, offsetY: 10 },
+  ferrari: { x: 664, y: 260, w: 138, h: 220, offsetX: 58, offsetY: 18 },
+  fia: { x: 894, y: 500, w: 256, h: 176, offsetX: 0, offsetY: 40 },
+  ford: { x: 260, y: 1026, w: 256, h: 98, offsetX: 0, offsetY: 80 },
+  holden: { x: 0, y: 260, w: 236, h: 236, offsetX: 10, offsetY: 10 },
+  honda: { x: 840, y: 708, w: 192, h: 156, offsetX: 32, offsetY: 50 },
+  hpd: { x: 0, y: 1146, w: 256, h: 76, offsetX: 0, offsetY: 90 },
+  hyundai: { x: 70, y: 880, w: 256, h: 132, offsetX: 0, offsetY: 62 },
+  iracing: { x: 374, y: 500, w: 256, h: 200, offsetX: 0, offsetY: 28 },
+  kia: { x: 726, y: 880, w: 252, h: 128, offsetX: 2, offsetY: 64 },
+  lamborghini: { x: 466, y: 260, w: 194, h: 220, offsetX: 30, offsetY: 18 },
+  ligier: { x: 716, y: 0, w: 256, h: 240, offsetX: 0, offsetY: 8 },
+  lotus: { x: 806, y: 260, w: 216, h: 216, offsetX: 20, offsetY: 20 },
+  mazda: { x: 520, y: 708, w: 204, h: 164, offsetX: 26, offsetY: 46 },
+  mclaren: { x: 1036, y: 708, w: 256, h: 142, offsetX: 0, offsetY: 58 },
+  mercedes: { x: 0, y: 0, w: 256, h: 256, offsetX: 0, offsetY: 0 },
+  nissan: { x: 1026, y: 260, w: 256, h: 212, offsetX: 0, offsetY: 22 },
+  pontiac: { x: 0, y: 880, w: 66, h: 142, offsetX: 94, offsetY: 56 },
+  porsche: { x: 260, y: 0, w: 192, h: 256, offsetX: 32, offsetY: 0 },
+  radical: { x: 728, y: 708, w: 108, h: 164, offsetX: 74, offsetY: 46 },
+  renault: { x: 208, y: 500, w: 162, h: 202, offsetX: 46, offsetY: 26 },
+  riley: { x: 260, y: 708, w: 256, h: 164, offsetX: 0, offsetY: 46 },
+  ruf: { x: 0, y: 1026, w: 256, h: 116, offsetX: 0, offsetY: 70 },
+  scca: { x: 1040, y: 1146, w: 256, h: 48, offsetX: 0, offsetY: 104 },
+  skipbarber: { x: 982, y: 880, w: 256, h: 118, offsetX: 0, offsetY: 68 },
+  srx: { x: 520, y: 1146, w: 256, h: 70, offsetX: 0, offsetY: 94 },
+  subaru: { x: 466, y: 880, w: 256, h: 128, offsetX: 0, offsetY: 64 },
+  toyota: { x: 0, y: 708, w: 256, h: 168, offsetX: 0, offsetY: 44 },
+  unknown: { x: 0, y: 0, w: 0, h: 0, offsetX: 0, offsetY: 0 },
+  vw: { x: 0, y: 500, w: 204, h: 204, offsetX: 26, offsetY: 26 },
+  williams: { x: 634, y: 500, w: 256, h: 196, offsetX: 0, offsetY: 30 },
 };
 
@@ -0,0 +1,156 @@
+import logging
+import math
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+import nishizumi_ibt_overlay
+from nishizumi_ibt_overlay import (
+    BROADCAST_FRAME,
+    WEBSOCKET_MAX_CLIENT_FRAME,
+    WEBSOCKET_OP_PING,
+    TelemetryBroadcaster,
+    TelemetrySnapshot,
+    _recv_websocket_frame,
+    _websocket_upgrade_key,
+    pack_broadcast_frame,
+    unpack_broadcast_frame,
+)
+
+
+def test_broadcast_frame_layout_is_fixed():
+    snapshot = TelemetrySnapshot(
+        connected=True, timestamp=1234.5, seq=7, tick=42, throttle=0.75, brake=0.25, steering=-0.5,
+        gear=4, speed_mps=50.0, session_time=60.0,
+    )
+    data = pack_broadcast_frame(snapshot, 0.5, (1.0, 0.0, 40.0), ("lift", 120.0))
+
+    assert BROADCAST_FRAME.size == len(data) == 76
+    assert data[:4] == b"NIBT"
+    assert struct.unpack_from("<BBhIi", data, 4) == (1, 3, 4, 7, 42)
+    assert struct.unpack_from("<dd", data, 16) == (60.0, 1234.5)
+    assert struct.unpack_from("<f", data, 32) == (0.5,)
+    assert struct.unpack_from("<B", data, 68) == (2,)
+    assert struct.unpack_from("<f", data, 72) == (120.0,)
+
+
+def test_broadcast_frame_round_trips_and_marks_missing_values():
+    snapshot = TelemetrySnapshot(connected=False, timestamp=1.0, seq=(1 << 32) + 3, gear=-1, speed_mps=30.0)
+    decoded = unpack_broadcast_frame(pack_broadcast_frame(snapshot, None, None, None))
+
+    assert decoded["connected"] is False and decoded["has_reference"] is False
+    assert decoded["seq"] == 3
+    assert decoded["tick"] == -1
+    assert decoded["gear"] == -1
+    assert decoded["speed_mps"] == 30.0
+    assert math.isnan(decoded["lap_pct"]) and math.isnan(decoded["speed_delta_kph"])
+    assert decoded["next_event"] == ""
+
+    with_ref = unpack_broadcast_frame(pack_broadcast_frame(snapshot, 0.25, (0.5, 0.0, 25.0), ("brake", 80.0)))
+    assert with_ref["has_reference"] is True
+    assert with_ref["speed_delta_kph"] == pytest.approx(18.0)
+    assert with_ref["next_event"] == "brake"
+
+
+def test_unpack_rejects_foreign_data():
+    with pytest.raises(ValueError):
+        unpack_broadcast_frame(bytes(10))
+    with pytest.raises(ValueError):
+        unpack_broadcast_frame(b"XXXX" + bytes(BROADCAST_FRAME.size - 4))
+
+
+def client_frame(opcode, payload, mask=b"\x01\x02\x03\x04"):
+    masked = bytes(byte ^ mask[i & 3] for i, byte in enumerate(payload))
+    if len(payload) < 126:
+        length = struct.pack("!B", 0x80 | len(payload))
+    else:
+        length = struct.pack("!BH", 0x80 | 126, len(payload))
+    return bytes([0x80 | opcode]) + length + mask + masked
+
+
+def test_websocket_client_frames_are_unmasked():
+    server, client = socket.socketpair()
+    with server, client:
+        client.sendall(client_frame(WEBSOCKET_OP_PING, b"hello") + client_frame(0x1, b"x" * 300))
+
+        assert _recv_websocket_frame(server, threading.Event()) == (WEBSOCKET_OP_PING, b"hello")
+        assert _recv_websocket_frame(server, threading.Event()) == (0x1, b"x" * 300)
+
+        client.close()
+        with pytest.raises(OSError):
+            _recv_websocket_frame(server, threading.Event())
+
+
+def test_websocket_rejects_oversized_client_frames():
+    server, client = socket.socketpair()
+    with server, client:
+        client.sendall(bytes([0x82, 0x80 | 127]) + struct.pack("!Q", WEBSOCKET_MAX_CLIENT_FRAME + 1))
+
+        with pytest.raises(OSError, match="too large"):
+            _recv_websocket_frame(server, threading.Event())
+
+
+# The handshake example from RFC 6455 section 1.3.
+UPGRADE = (
+    b"GET /chat HTTP/1.1\r\nHost: server.example.com\r\nUpgrade: websocket\r\nConnection: keep-alive, Upgrade\r\n"
+    b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n"
+)
+
+
+def test_upgrade_request_is_validated():
+    assert _websocket_upgrade_key(UPGRADE) == b"dGhlIHNhbXBsZSBub25jZQ=="
+    for bad in (
+        UPGRADE.replace(b"GET", b"POST"),
+        UPGRADE.replace(b"HTTP/1.1", b"HTTP/1.0"),
+        UPGRADE.replace(b"Upgrade: websocket", b"Upgrade: h2c"),
+        UPGRADE.replace(b"keep-alive, Upgrade", b"keep-alive"),
+        UPGRADE.replace(b"Version: 13", b"Version: 8"),
+        UPGRADE.replace(b"dGhlIHNhbXBsZSBub25jZQ==", b"not-base64"),
+        UPGRADE.replace(b"dGhlIHNhbXBsZSBub25jZQ==", b"c2hvcnQ="),
+        b"GET / HTTP/1.1\r\nSec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n\r\n",
+    ):
+        with pytest.raises(ValueError):
+            _websocket_upgrade_key(bad)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def upgrade(port, request=UPGRADE):
+    sock = socket.create_connection(("127.0.0.1", port), timeout=5.0)
+    sock.sendall(request)
+    return sock, sock.recv(1024).split(b"\r\n", 1)[0]
+
+
+def test_websocket_server_is_local_only_and_caps_clients(monkeypatch):
+    monkeypatch.setattr(nishizumi_ibt_overlay, "WEBSOCKET_MAX_CLIENTS", 1)
+    port = free_port()
+    broadcaster = TelemetryBroadcaster(logging.getLogger("test"), ws_port=port)
+    try:
+        assert broadcaster._server.getsockname()[0] == "127.0.0.1"
+        sock, status = upgrade(port, UPGRADE.replace(b"GET", b"POST"))
+        sock.close()
+        assert status == b"HTTP/1.1 400 Bad Request"
+
+        first, status = upgrade(port)
+        assert status == b"HTTP/1.1 101 Switching Protocols"
+        second, status = upgrade(port)
+        second.close()
+        assert status == b"HTTP/1.1 503 Service Unavailable"
+
+        first.close()  # The reader sees EOF and frees the slot
+        for _ in range(50):
+            third, status = upgrade(port)
+            third.close()
+            if status.startswith(b"HTTP/1.1 101"):
+                break
+            time.sleep(0.05)
+        assert status == b"HTTP/1.1 101 Switching Protocols"
+    finally:
+        broadcaster.close()
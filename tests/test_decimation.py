@@ -0,0 +1,33 @@
+from nishizumi_ibt_overlay import ColumnDecimator, PointBufferPool, build_line_points
+
+
+def decimate(points):
+    decimator = ColumnDecimator()
+    out = []
+    for x, y in points:
+        decimator.add(x, y, out)
+    decimator.flush(out)
+    return out
+
+
+def test_decimator_keeps_column_extremes_in_order():
+    # Column 0 dips then peaks; column 1 peaks then dips; column 2 is flat.
+    out = decimate([(0.1, 5.0), (0.4, 1.0), (0.8, 9.0), (1.2, 3.0), (1.5, 8.0), (1.9, 2.0), (2.5, 4.0), (2.6, 4.0)])
+
+    assert out == [0.1, 1.0, 0.1, 9.0, 1.2, 8.0, 1.2, 2.0, 2.5, 4.0]
+
+
+def test_decimator_bounds_vertices_by_width():
+    out = decimate([(i / 100.0, float(i % 7)) for i in range(1000)])
+
+    assert len(out) // 2 <= 2 * 10
+
+
+def test_build_line_points_splits_on_missing_values():
+    window = [{"t": float(t), "throttle": None if t == 5 else 0.5} for t in range(11)]
+    segments = build_line_points(
+        window, "throttle", 0.0, 100.0, 100.0, 0.0, 10.0, 100.0, 0.0, ColumnDecimator(), PointBufferPool(), []
+    )
+
+    assert [segment[0::2] for segment in segments] == [[0.0, 10.0, 20.0, 30.0, 40.0], [60.0, 70.0, 80.0, 90.0, 100.0]]
+    assert all(y == 50.0 for segment in segments for y in segment[1::2])
@@ -0,0 +1,103 @@
+import pytest
+
+from nishizumi_ibt_overlay import (
+    DEFAULT_BRAKE_THRESHOLD,
+    DEFAULT_LIFT_THRESHOLD,
+    DEFAULT_POWER_THRESHOLD,
+    EventDetector,
+    EventIndex,
+    RefEvent,
+    ReferenceLap,
+    _synthetic_lap_channels,
+)
+
+THRESHOLDS = (DEFAULT_BRAKE_THRESHOLD, DEFAULT_LIFT_THRESHOLD, DEFAULT_POWER_THRESHOLD)
+
+
+def synthetic_lap(samples=900):
+    return ReferenceLap("synthetic", *THRESHOLDS, channels=_synthetic_lap_channels(samples))
+
+
+def indexed_lap(events, track_len_m=1000.0):
+    lap = synthetic_lap()
+    lap.events = [RefEvent(kind, pct) for kind, pct in events]
+    index = EventIndex()
+    index.sync(lap, track_len_m)
+    return lap, index
+
+
+def test_event_index_wraps_past_the_line():
+    lap, index = indexed_lap([("brake", 0.9), ("lift", 0.5), ("brake", 0.1), ("power", 0.2)])
+
+    upcoming = index.upcoming(0.95, 3)
+
+    assert [(entry.event.lap_pct, round(entry.dist_m, 6)) for entry in upcoming] == [
+        (0.1, 150.0), (0.2, 250.0), (0.5, 550.0)
+    ]
+    assert [entry.index for entry in upcoming] == [2, 3, 1]
+    assert all(0.0 <= entry.time_s < lap.lap_time_s for entry in upcoming)
+    # An event exactly at the query position is still ahead.
+    assert index.upcoming(0.5, 1)[0].dist_m == 0.0
+
+
+def test_event_index_filters_by_kind_and_distance():
+    _lap, index = indexed_lap([("brake", 0.9), ("lift", 0.5), ("brake", 0.1), ("power", 0.2)])
+
+    assert [entry.event.lap_pct for entry in index.upcoming(0.3, 5, kind="brake")] == [0.9, 0.1]
+    assert [entry.event.lap_pct for entry in index.upcoming(0.05, 5, within_m=200.0)] == [0.1, 0.2]
+    assert index.upcoming(0.3, 5, kind="unknown") == []
+    assert index.next_event(0.95, kind="brake").event.lap_pct == 0.1
+    assert index.next_event(0.3, kind="lift").dist_m == pytest.approx(200.0)
+
+
+def test_event_index_refills_out_with_its_own_entries():
+    _lap, index = indexed_lap([("brake", 0.1), ("lift", 0.5)])
+    out = []
+
+    first = index.upcoming(0.0, 2, out=out)
+    entries = list(first)
+    second = index.upcoming(0.2, 2, out=out)
+
+    assert first is out and second is out
+    assert [entry.event.lap_pct for entry in out] == [0.5, 0.1]
+    assert {id(entry) for entry in out} == {id(entry) for entry in entries}
+    assert out[1].dist_m == pytest.approx(900.0)
+
+
+def test_event_index_rebuilds_when_events_or_length_change():
+    lap, index = indexed_lap([("brake", 0.1)])
+    assert len(index) == 1
+
+    lap.events = [RefEvent("brake", 0.1), RefEvent("lift", 0.6)]
+    index.sync(lap, 1000.0)
+    assert len(index) == 2
+
+    index.sync(lap, 2000.0)
+    assert index.next_event(0.0).dist_m == pytest.approx(200.0)
+
+    index.sync(None, 2000.0)
+    assert len(index) == 0
+    assert index.next_event(0.0) is None
+
+
+def test_threshold_refresh_never_exposes_a_partly_built_event_list(monkeypatch):
+    lap = synthetic_lap()
+    index = EventIndex()
+    index.sync(lap, 1000.0)
+    before = list(lap.events)
+    old_events = lap.events
+    feed = EventDetector.feed
+
+    def feed_and_sync(detector, *args):
+        # A worker syncing its index in the middle of the rebuild.
+        index.sync(lap, 1000.0)
+        feed(detector, *args)
+
+    monkeypatch.setattr(EventDetector, "feed", feed_and_sync)
+    lap.refresh_thresholds(*THRESHOLDS)
+    monkeypatch.undo()
+
+    assert old_events == before
+    assert lap.events is not old_events
+    index.sync(lap, 1000.0)
+    assert len(index) == len(lap.events) > 0
@@ -0,0 +1,57 @@
+import pytest
+
+from nishizumi_ibt_overlay import TraceHistory
+
+
+def fill(history, seconds, hz=10):
+    for i in range(int(seconds * hz)):
+        record = history.new_record()
+        record["t"] = i / hz
+        record["brake"] = 1.0 if i % 10 == 0 else 0.0
+        history.append(record)
+
+
+def test_history_buckets_keep_mean_min_and_max():
+    history = TraceHistory(base_bucket_s=1.0, factor=4, levels=2, records=64)
+    fill(history, 20)
+
+    bucket = history.levels[0][0]
+    assert bucket["t"] == 0.5
+    assert bucket["brake"] == pytest.approx(0.1)
+    assert bucket["min"]["brake"] == 0.0
+    assert bucket["max"]["brake"] == 1.0
+    assert history.levels[1][0]["t"] == 2.0
+
+
+def test_history_window_uses_coarse_levels_for_long_windows():
+    history = TraceHistory(base_bucket_s=1.0, factor=4, levels=2, records=32)
+    fill(history, 100)
+
+    recent = history.window(2.0, 100)
+    assert all("min" not in record for record in recent)
+    assert recent[0]["t"] >= history.now - 2.0
+
+    long = history.window(90.0, 100)
+    times = [record["t"] for record in long]
+    assert times == sorted(times)
+    assert "min" in long[0]
+    assert long[0]["t"] >= history.now - 90.0 - 4.0
+    assert long[-1]["t"] == history.now
+
+
+def test_history_window_refills_out_and_recycles_records():
+    history = TraceHistory(base_bucket_s=1.0, factor=4, levels=2, records=16)
+    fill(history, 10)
+    out = [{"stale": True}]
+
+    assert history.window(1.0, 100, out=out) is out
+    assert {"stale": True} not in out
+    assert len(history) == 16
+    # Once the raw buffer is full, new records are the ones it evicts.
+    oldest = history.raw[0]
+    record = history.new_record()
+    assert record is not oldest
+    record["t"] = 100.0
+    history.append(record)
+    assert history.new_record() is oldest
+    assert history.raw[-1] is record
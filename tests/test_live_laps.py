@@ -0,0 +1,76 @@
+import logging
+import threading
+import time
+
+from nishizumi_ibt_overlay import LiveLapRecorder, ReferenceSet, TelemetrySnapshot
+
+SAMPLES = 300
+
+
+def sample(recorder, pct, now):
+    recorder.add(TelemetrySnapshot(
+        connected=True, lap_pct=pct, session_time=now, throttle=1.0, brake=0.0,
+        speed_mps=50.0, gear=4, track_length_km=4.0,
+    ))
+
+
+def drive(recorder, lap_times, now=0.0):
+    """Feed whole laps of the given durations, each finished by a line crossing."""
+    for lap_time in lap_times:
+        for i in range(SAMPLES):
+            sample(recorder, i / SAMPLES, now)
+            now += lap_time / SAMPLES
+        sample(recorder, 0.0, now)
+    return now
+
+
+def test_a_finished_lap_is_built_and_polled():
+    recorder = LiveLapRecorder(logging.getLogger("test"), ReferenceSet(grid_points=500))
+    try:
+        sample(recorder, 0.99, -0.3)  # Out-lap: the first crossing starts the timing
+        drive(recorder, [90.0])
+        for _ in range(200):
+            ready = recorder.poll()
+            if ready:
+                break
+            time.sleep(0.01)
+        lap, _row = ready
+        assert lap.path.startswith("Live PB 1:3")
+        assert lap.track_length_m == 4000.0
+    finally:
+        recorder.close()
+
+
+def test_one_builder_keeps_only_the_fastest_waiting_lap():
+    recorder = LiveLapRecorder(logging.getLogger("test"), ReferenceSet(grid_points=500))
+    release = threading.Event()
+    built = []
+
+    def build(channels, lap_time_s, track_len_m, thresholds):
+        built.append(round(lap_time_s))
+        release.wait(5.0)
+
+    recorder._build = build
+    try:
+        sample(recorder, 0.99, -0.3)
+        now = drive(recorder, [90.0])
+        for _ in range(200):
+            if built:
+                break
+            time.sleep(0.01)
+        drive(recorder, [89.0, 88.0, 95.0], now)
+        builder = recorder._builder
+        release.set()
+        for _ in range(200):
+            if len(built) == 2:
+                break
+            time.sleep(0.01)
+        time.sleep(0.05)
+
+        assert built == [90, 88]  # 89 s was superseded, 95 s lost to the waiting 88 s
+        assert recorder.superseded == 1
+        assert recorder._builder is builder and builder.is_alive()
+    finally:
+        recorder.close()
+    builder.join(1.0)
+    assert not builder.is_alive()
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from nishizumi_ibt_overlay import CAR_IDX_SLOTS, ProximityEngine, _synthetic_car_extras
+
+
+def extras(pct, player=0, pit=(), laps=None):
+    pct = list(pct) + [-1.0] * (CAR_IDX_SLOTS - len(pct))
+    return {
+        "PlayerCarIdx": player,
+        "CarIdxLapDistPct": pct,
+        "CarIdxLap": laps or [1 if p >= 0.0 else -1 for p in pct],
+        "CarIdxOnPitRoad": [i in pit for i in range(CAR_IDX_SLOTS)],
+        "CarIdxClassPosition": [i + 1 for i in range(CAR_IDX_SLOTS)],
+    }
+
+
+def test_nearest_cars_ahead_and_behind_wrap_at_the_line():
+    engine = ProximityEngine()
+    engine.update(extras([0.95, 0.10, 0.50, 0.90]), None, 1000.0)
+    assert engine.ahead.car_idx == 1 and engine.ahead.gap_m == pytest.approx(150.0)
+    assert engine.behind.car_idx == 3 and engine.behind.gap_m == pytest.approx(50.0)
+
+
+def test_player_pit_and_empty_slots_are_skipped():
+    engine = ProximityEngine()
+    engine.update(extras([0.50, 0.52, -1.0, 0.60, 0.48], pit={1, 4}), None, 1000.0)
+    assert engine.ahead.car_idx == 3
+    assert engine.behind.car_idx == 3  # the only other car on track is both
+    engine.update(extras([0.50, 0.52], pit={1}), None, 1000.0)
+    assert engine.ahead is None and engine.behind is None
+
+
+def test_single_pass_matches_brute_force():
+    engine = ProximityEngine()
+    rng = random.Random(3)
+    for _ in range(100):
+        sample = extras([rng.random() if rng.random() < 0.8 else -1.0 for _ in range(CAR_IDX_SLOTS)],
+                        player=rng.randrange(CAR_IDX_SLOTS))
+        player = sample["PlayerCarIdx"]
+        pct = sample["CarIdxLapDistPct"]
+        if pct[player] < 0.0:
+            pct[player] = 0.5
+        others = [i for i, p in enumerate(pct) if p >= 0.0 and i != player]
+        engine.update(sample, None, 1000.0)
+        forward = {i: (pct[i] - pct[player]) % 1.0 for i in others}
+        assert engine.ahead.car_idx == min(others, key=forward.__getitem__)
+        assert engine.behind.car_idx == max(others, key=forward.__getitem__)
+
+
+def test_synthetic_field_reports_lapped_cars():
+    engine = ProximityEngine()
+    engine.update(_synthetic_car_extras(CAR_IDX_SLOTS, 3.25), None, 5000.0)
+    assert engine.ahead is not None and engine.behind is not None
+    assert engine.ahead.car_idx != 0 and engine.behind.car_idx != 0
@@ -0,0 +1,82 @@
+from nishizumi_ibt_overlay import (
+    DEFAULT_BRAKE_THRESHOLD,
+    DEFAULT_LIFT_THRESHOLD,
+    DEFAULT_POWER_THRESHOLD,
+    ReferenceCache,
+    ReferenceLap,
+    ReferenceSet,
+    _synthetic_lap_channels,
+)
+
+
+def cache_entry(path, samples):
+    lap = ReferenceLap(
+        path,
+        DEFAULT_BRAKE_THRESHOLD,
+        DEFAULT_LIFT_THRESHOLD,
+        DEFAULT_POWER_THRESHOLD,
+        channels=_synthetic_lap_channels(samples),
+    )
+    row = ReferenceSet(grid_points=64).build_row(lap)
+    return lap, row, lap.nbytes() + ReferenceSet.row_nbytes(row)
+
+
+def test_cache_accounts_bytes_and_evicts_least_recently_used():
+    entries = {key: cache_entry(key, 100) for key in ("a", "b", "c")}
+    size = entries["a"][2]
+    cache = ReferenceCache(budget_bytes=2 * size)
+    cache.put(("a",), *entries["a"][:2])
+    cache.put(("b",), *entries["b"][:2])
+    assert cache.get(("a",))[0] is entries["a"][0]  # "b" is now least recently used
+
+    cache.put(("c",), *entries["c"][:2])
+
+    assert cache.size_bytes == 2 * size
+    assert cache.get(("b",)) is None
+    assert cache.get(("c",)) is not None
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 1, 1)
+
+
+def test_cache_replacing_a_key_does_not_double_count():
+    lap, row, size = cache_entry("a", 100)
+    cache = ReferenceCache(budget_bytes=10 * size)
+    cache.put(("a",), lap, row)
+    cache.put(("a",), lap, row)
+
+    assert len(cache) == 1
+    assert cache.size_bytes == size
+
+
+def test_cache_skips_oversized_laps_and_shrinks_with_the_budget():
+    small = cache_entry("small", 100)
+    large = cache_entry("large", 400)
+    cache = ReferenceCache(budget_bytes=small[2] + large[2])
+    cache.put(("small",), *small[:2])
+    cache.put(("large",), *large[:2])
+
+    cache.set_budget(large[2])
+    assert cache.get(("small",)) is None
+    assert cache.size_bytes == large[2]
+
+    cache.put(("huge",), *cache_entry("huge", 4000)[:2])
+    assert cache.get(("huge",)) is None
+    assert cache.size_bytes == large[2]
+    cache.put(None, *small[:2])
+    assert len(cache) == 1
+
+
+def test_cache_follows_a_lap_whose_thresholds_were_refreshed(tmp_path):
+    path = tmp_path / "lap.ibt"
+    path.write_bytes(b"ibt")
+    lap, row, size = cache_entry(str(path), 900)
+    before = (DEFAULT_BRAKE_THRESHOLD, DEFAULT_LIFT_THRESHOLD, DEFAULT_POWER_THRESHOLD)
+    after = (0.5, DEFAULT_LIFT_THRESHOLD, DEFAULT_POWER_THRESHOLD)
+    cache = ReferenceCache(budget_bytes=10 * size)
+    cache.put(ReferenceCache.key_for(str(path), before, 64), lap, row)
+
+    lap.refresh_thresholds(*after)
+    cache.rekey(lap, after)
+
+    assert cache.get(ReferenceCache.key_for(str(path), before, 64)) is None
+    assert cache.get(ReferenceCache.key_for(str(path), after, 64))[0] is lap
+    assert (len(cache), cache.size_bytes) == (1, size)
@@ -0,0 +1,63 @@
+import pytest
+
+from nishizumi_ibt_overlay import (
+    DEFAULT_BRAKE_THRESHOLD,
+    DEFAULT_LIFT_THRESHOLD,
+    DEFAULT_POWER_THRESHOLD,
+    MAX_REFERENCE_LAPS,
+    REFERENCE_SET_COLORS,
+    ReferenceLap,
+    ReferenceSet,
+    _synthetic_lap_channels,
+)
+
+
+def synthetic_lap(path, pace=1.0):
+    return ReferenceLap(
+        path,
+        DEFAULT_BRAKE_THRESHOLD,
+        DEFAULT_LIFT_THRESHOLD,
+        DEFAULT_POWER_THRESHOLD,
+        channels=_synthetic_lap_channels(900, pace=pace),
+    )
+
+
+def test_values_at_reads_every_lap_from_one_grid_index():
+    laps = ReferenceSet(grid_points=1000)
+    laps.set_primary(synthetic_lap("primary.ibt"))
+    laps.add(synthetic_lap("slower.ibt", pace=0.5))
+
+    straight = [list(values) for values in laps.values_at(0.5)]
+    braking = laps.values_at(1.13)  # Wraps onto the first braking zone
+
+    assert straight == [[1.0, 0.0, pytest.approx(45.0)], [1.0, 0.0, pytest.approx(22.5)]]
+    assert [values[1] for values in braking] == [1.0, 1.0]
+    assert [round(values[2], 3) for values in braking] == [25.0, 12.5]
+    assert laps.names == ["primary", "slower"]
+    assert laps.colors[1] == REFERENCE_SET_COLORS[0]
+
+
+def test_laps_are_stored_as_float32_grid_columns():
+    laps = ReferenceSet(grid_points=512)
+    laps.set_primary(synthetic_lap("primary"))
+    laps.add(synthetic_lap("other"))
+
+    assert laps.nbytes() == 2 * 3 * 512 * 4
+
+
+def test_comparison_laps_need_a_primary_and_are_capped():
+    laps = ReferenceSet(grid_points=64)
+    lap = synthetic_lap("lap")
+    with pytest.raises(ValueError):
+        laps.add(lap)
+
+    laps.set_primary(lap)
+    for _ in range(MAX_REFERENCE_LAPS - 1):
+        laps.add(lap)
+    with pytest.raises(ValueError):
+        laps.add(lap)
+
+    laps.clear_extras()
+    assert len(laps) == 1
+    laps.clear()
+    assert len(laps) == 0
@@ -0,0 +1,93 @@
+import pytest
+
+pytest.importorskip("PIL")
+
+from nishizumi_ibt_overlay import (
+    DEFAULT_BRAKE_THRESHOLD,
+    DEFAULT_LIFT_THRESHOLD,
+    DEFAULT_OVERLAY_SIZE,
+    DEFAULT_POWER_THRESHOLD,
+    ImageCanvas,
+    OVERLAY_PANELS,
+    OverlayRenderer,
+    ReferenceLap,
+    _synthetic_lap_channels,
+    render_main,
+    replay_overlay_frames,
+)
+
+BACKGROUND = (11, 11, 11)
+
+
+def test_image_canvas_draws_and_clears():
+    canvas = ImageCanvas(40, 20)
+    canvas.create_rectangle(5, 5, 15, 15, fill="#ff0000", outline="")
+    item = canvas.create_text(30, 10, text="8", fill="#ffffff", font=("Segoe UI", 10))
+
+    image = canvas.image()
+    assert image.size == (40, 20)
+    assert image.getpixel((10, 10)) == (255, 0, 0)
+    left, top, right, bottom = canvas.bbox(item)
+    assert left < 30 < right and top < 10 < bottom
+
+    canvas.delete("all")
+    assert canvas.image().getcolors() == [(40 * 20, BACKGROUND)]
+    assert canvas.bbox(item) is None
+
+
+def test_supersampled_canvas_returns_the_requested_size():
+    canvas = ImageCanvas(40, 20, scale=2)
+    canvas.create_line(0, 10, 40, 10, fill="#ffffff", width=2)
+
+    assert canvas.image().size == (40, 20)
+
+
+def replayed_images(samples=240):
+    reference = ReferenceLap(
+        "reference", DEFAULT_BRAKE_THRESHOLD, DEFAULT_LIFT_THRESHOLD, DEFAULT_POWER_THRESHOLD,
+        channels=_synthetic_lap_channels(5400),
+    )
+    session = _synthetic_lap_channels(5400, shift_pct=0.004, pace=0.97, cars=12)
+    session = {name: values[:samples] for name, values in session.items()}
+    width, height = DEFAULT_OVERLAY_SIZE
+    canvas = ImageCanvas(width, height)
+    renderer = OverlayRenderer(canvas, width, height, quality="low")
+    images = []
+    for index, frame in enumerate(replay_overlay_frames(session, reference)):
+        renderer.draw(frame)
+        if index in (samples // 2, samples - 1):
+            images.append(canvas.image())
+    return images
+
+
+def test_replayed_frames_draw_a_moving_overlay():
+    middle, last = replayed_images()
+
+    assert len(last.getcolors(1 << 16)) > 8
+    assert middle.tobytes() != last.tobytes()
+
+
+def test_render_harness_writes_frames_and_compares_goldens(tmp_path, capsys):
+    out = tmp_path / "frames"
+    args = ["--frames", "20", "--save", "19", "--renderer", "delta", "--quality", "low", "--out", str(out)]
+
+    assert render_main(args) == 0
+    written = out / "delta_low_000019.png"
+    assert written.exists()
+
+    # The frames just written are their own goldens; a missing golden is a mismatch.
+    assert render_main(args + ["--golden", str(out)]) == 0
+    assert render_main(args + ["--golden", str(tmp_path / "missing")]) == 1
+    assert "missing golden" in capsys.readouterr().err
+
+
+def test_events_strip_is_opt_in_and_leaves_the_traces_their_height(monkeypatch):
+    areas = []
+    monkeypatch.setattr(OverlayRenderer, "_draw_traces", lambda self, frame, width, top, bottom: areas.append((top, bottom)))
+    frame = next(replay_overlay_frames(_synthetic_lap_channels(900), None))
+    width, height = DEFAULT_OVERLAY_SIZE
+
+    OverlayRenderer(ImageCanvas(width, height), width, height).draw(frame)
+    OverlayRenderer(ImageCanvas(width, height), width, height, OVERLAY_PANELS + ("events",)).draw(frame)
+
+    assert areas == [(56, 130), (78, 130)]
@@ -0,0 +1,63 @@
+import pytest
+
+import nishizumi_ibt_overlay as overlay
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(overlay.time, "perf_counter", lambda: now[0])
+    return now
+
+
+def test_on_time_ticks_render_and_wait_for_the_next_deadline(clock):
+    scheduler = overlay.FrameScheduler(10)
+
+    assert scheduler.begin_frame()
+    clock[0] = 0.002
+    assert scheduler.end_frame() == 8
+    clock[0] = 0.010
+    assert scheduler.begin_frame()
+    assert (scheduler.frames, scheduler.rendered_frames, scheduler.late_frames) == (2, 2, 0)
+
+
+def test_late_tick_counts_missed_deadlines_and_skipped_render_separately(clock):
+    scheduler = overlay.FrameScheduler(10)
+    scheduler.begin_frame()
+    scheduler.end_frame()
+
+    clock[0] = 0.035  # 2.5 periods after the deadline at 0.010
+    assert not scheduler.begin_frame()
+    assert scheduler.late_frames == 1
+    assert scheduler.missed_deadlines == 2
+    assert scheduler.skipped_renders == 1
+
+    # Late by more than half a period but within one: the render is skipped, no deadline is missed.
+    scheduler.end_frame()
+    clock[0] = 0.046
+    assert not scheduler.begin_frame()
+    assert scheduler.late_frames == 1
+    assert scheduler.missed_deadlines == 2
+    assert scheduler.skipped_renders == 2
+    assert "missed 2 | skipped 2" in scheduler.stats_text()
+
+
+def test_idle_ticks_neither_render_nor_count_as_skipped(clock):
+    scheduler = overlay.FrameScheduler(10)
+
+    assert not scheduler.begin_frame(has_work=False)
+    assert scheduler.rendered_frames == 0
+    assert scheduler.skipped_renders == 0
+
+
+def test_render_period_is_slower_than_the_tick_period(clock):
+    scheduler = overlay.FrameScheduler(10)
+    scheduler.configure(10, 30)
+
+    rendered = []
+    for tick in range(9):
+        clock[0] = tick * 0.010
+        rendered.append(scheduler.begin_frame())
+        scheduler.end_frame()
+
+    assert rendered == [True, False, False] * 3
@@ -0,0 +1,46 @@
+from nishizumi_ibt_overlay import SegmentTracker, TrackSegment
+
+
+SEGMENTS = [
+    TrackSegment("S1", "sector", 0.0, 0.3, 30.0, 40.0),
+    TrackSegment("S2", "sector", 0.3, 0.6, 25.0, 40.0),
+    TrackSegment("S3", "sector", 0.6, 1.0, 45.0, 40.0),
+]
+
+
+def drive(tracker, start_pct, steps, step_pct=0.01, lap_time_s=100.0, speed_mps=40.0):
+    results = []
+    for i in range(steps):
+        pct = (start_pct + i * step_pct) % 1.0
+        result = tracker.update(pct, (start_pct + i * step_pct) * lap_time_s, speed_mps)
+        if result is not None:
+            results.append(result)
+    return results
+
+
+def test_segment_tracker_times_full_segments_across_the_line():
+    tracker = SegmentTracker()
+    tracker.reset(SEGMENTS)
+
+    # Starts inside S1, so S1 is not timed until the second lap.
+    results = drive(tracker, 0.105, 160)
+
+    assert [result.segment.name for result in results] == ["S2", "S3", "S1", "S2"]
+    assert [round(result.time_s, 6) for result in results] == [30.0, 40.0, 30.0, 30.0]
+    assert [round(result.delta_s, 6) for result in results] == [5.0, -5.0, 0.0, 5.0]
+
+
+def test_segment_tracker_tracks_min_speed_and_resyncs_after_a_jump():
+    tracker = SegmentTracker()
+    tracker.reset(SEGMENTS)
+    tracker.update(0.25, 25.0, 50.0)
+    tracker.update(0.305, 30.5, 50.0)
+    tracker.update(0.45, 45.0, 20.0)
+    assert tracker.update(0.5, 50.0, 50.0) is None  # Jumped more than 5% of the lap: resync
+
+    results = drive(tracker, 0.55, 10)
+    assert [result.segment.name for result in results] == []
+    result = drive(tracker, 0.65, 40)[0]
+    assert result.segment.name == "S3"
+    assert result.min_speed_mps == 40.0
+    assert result.min_speed_delta_mps == 0.0
@@ -0,0 +1,41 @@
+import nishizumi_ibt_overlay as overlay
+
+
+def test_frame_path_stays_within_allocation_budgets():
+    report = overlay.measure_frame_allocations(300)
+
+    assert report.net_per_frame <= 64
+    assert 0 < report.frame_peak_bytes <= overlay.SELFCHECK_FRAME_PEAK_BYTES
+
+
+def test_frame_peak_catches_memory_freed_within_the_frame(monkeypatch):
+    feedback = overlay.LiveEventComparer.feedback
+
+    def wasteful(self, now_s, hold_s):
+        bytearray(1 << 20)
+        return feedback(self, now_s, hold_s)
+
+    monkeypatch.setattr(overlay.LiveEventComparer, "feedback", wasteful)
+    report = overlay.measure_frame_allocations(20)
+
+    # Nothing is retained, so only the per-frame peak sees the allocation.
+    assert report.net_per_frame <= 64
+    assert report.frame_peak_bytes > overlay.SELFCHECK_FRAME_PEAK_BYTES
+
+
+def test_selfcheck_cli_fails_over_budget(capsys):
+    assert overlay.selfcheck_main(["--frames", "50", "--peak-budget", "1"]) == 1
+    assert "OVER BUDGET" in capsys.readouterr().out
+
+
+def test_point_pool_reuses_buffers_after_reset():
+    pool = overlay.PointBufferPool()
+    first = pool.acquire()
+    first.append(1.0)
+    second = pool.acquire()
+
+    pool.reset()
+
+    assert pool.acquire() is first
+    assert first == []
+    assert pool.acquire() is second
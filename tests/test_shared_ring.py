@@ -0,0 +1,110 @@
+import os
+import struct
+import subprocess
+import sys
+import uuid
+from multiprocessing import shared_memory
+
+import pytest
+
+from nishizumi_ibt_overlay import (
+    SHARED_RING_HEADER,
+    SHARED_RING_MAGIC,
+    SHARED_RING_SLOT_HEADER,
+    SharedTelemetryReader,
+    SharedTelemetryRing,
+)
+
+
+@pytest.fixture
+def ring_name():
+    return f"nishizumi_test_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+
+
+@pytest.fixture
+def ring(ring_name):
+    ring = SharedTelemetryRing(ring_name, slots=4, frame_size=8)
+    yield ring
+    ring.close()
+
+
+def frame(n):
+    return struct.pack("<Q", n)
+
+
+def test_reader_sees_frames_in_order(ring):
+    reader = SharedTelemetryReader(ring=ring)
+    for n in range(3):
+        ring.write(frame(n))
+
+    assert reader.poll() == [frame(0), frame(1), frame(2)]
+    assert reader.poll() == []
+
+
+def test_reader_skips_frames_the_writer_lapped(ring):
+    reader = SharedTelemetryReader(ring=ring)
+    for n in range(10):
+        ring.write(frame(n))
+
+    # Four slots: the oldest one still present may be rewritten mid-copy, so it is not read.
+    assert reader.poll() == [frame(7), frame(8), frame(9)]
+    assert reader.read_slot(5) is None
+
+
+def test_reader_refuses_a_slot_being_written(ring):
+    reader = SharedTelemetryReader(ring=ring)
+    ring.write(frame(1))
+    offset = SHARED_RING_HEADER.size
+    lock, length, index = SHARED_RING_SLOT_HEADER.unpack_from(ring.buf, offset)
+    assert lock % 2 == 0
+
+    SHARED_RING_SLOT_HEADER.pack_into(ring.buf, offset, lock + 1, length, index)
+    assert reader.read_slot(0) is None
+    SHARED_RING_SLOT_HEADER.pack_into(ring.buf, offset, lock + 2, length, index)
+    assert reader.read_slot(0) == frame(1)
+
+
+def test_ring_rejects_oversized_frames(ring):
+    with pytest.raises(ValueError):
+        ring.write(bytes(9))
+
+
+def leftover_segment(name, magic, pid, size=4096):
+    shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+    SHARED_RING_HEADER.pack_into(shm.buf, 0, magic, 1, SHARED_RING_HEADER.size, 16, 4, 0, pid)
+    return shm
+
+
+def test_ring_refuses_a_segment_owned_by_a_live_process(ring_name):
+    shm = leftover_segment(ring_name, SHARED_RING_MAGIC, os.getpid())
+    try:
+        with pytest.raises(FileExistsError, match="still in use"):
+            SharedTelemetryRing(ring_name, slots=4, frame_size=8)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_ring_refuses_a_foreign_segment(ring_name):
+    shm = leftover_segment(ring_name, b"ELSE", 0)
+    try:
+        with pytest.raises(FileExistsError, match="not a Nishizumi ring"):
+            SharedTelemetryRing(ring_name, slots=4, frame_size=8)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+@pytest.mark.skipif(os.name != "posix", reason="owner liveness is only probed on POSIX")
+def test_ring_takes_over_a_segment_left_by_a_dead_process(ring_name):
+    child = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    shm = leftover_segment(ring_name, SHARED_RING_MAGIC, int(child.stdout))
+    shm.close()
+
+    ring = SharedTelemetryRing(ring_name, slots=4, frame_size=8)
+    try:
+        assert SHARED_RING_HEADER.unpack_from(ring.buf, 0)[-1] == os.getpid()
+        ring.write(frame(5))
+        assert SharedTelemetryReader(ring=ring).read_slot(0) == frame(5)
+    finally:
+        ring.close()
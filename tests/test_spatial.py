@@ -0,0 +1,40 @@
+import math
+import random
+
+import pytest
+
+from nishizumi_ibt_overlay import EARTH_RADIUS_M, SpatialIndex
+
+
+def circle_track(samples=400, radius_m=300.0, lat0=50.0, lon0=6.0):
+    lat, lon, pct = [], [], []
+    for i in range(samples):
+        angle = 2 * math.pi * i / samples
+        lat.append(lat0 + math.degrees(radius_m * math.sin(angle) / EARTH_RADIUS_M))
+        lon.append(lon0 + math.degrees(radius_m * (math.cos(angle) - 1) / (EARTH_RADIUS_M * math.cos(math.radians(lat0)))))
+        pct.append(i / samples)
+    return lat, lon, pct
+
+
+def test_spatial_index_nearest_matches_brute_force():
+    index = SpatialIndex(*circle_track())
+    rng = random.Random(7)
+    for _ in range(200):
+        x, y = rng.uniform(-700, 100), rng.uniform(-400, 400)
+        best = min(range(len(index.xs)), key=lambda i: (index.xs[i] - x) ** 2 + (index.ys[i] - y) ** 2)
+        idx, d2 = index.nearest(x, y)
+        assert d2 == pytest.approx((index.xs[best] - x) ** 2 + (index.ys[best] - y) ** 2)
+
+
+def test_spatial_index_match_interpolates_and_follows_the_car():
+    lat, lon, pct = circle_track()
+    index = SpatialIndex(lat, lon, pct)
+    between_lat = (lat[100] + lat[101]) / 2
+    between_lon = (lon[100] + lon[101]) / 2
+
+    assert index.match(between_lat, between_lon) == pytest.approx(100.5 / 400, abs=1e-4)
+    for i in range(101, 140):
+        assert index.match(lat[i], lon[i]) == pytest.approx(pct[i], abs=1e-4)
+    # Far off the track the match is dropped, then reacquired from the tree.
+    assert index.match(lat[0] + 1.0, lon[0]) is None
+    assert index.match(lat[300], lon[300]) == pytest.approx(pct[300], abs=1e-4)
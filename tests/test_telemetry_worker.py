@@ -0,0 +1,69 @@
+import logging
+
+from nishizumi_ibt_overlay import TelemetryWorker
+
+SESSION_YAML = {
+    "WeekendInfo": {"TrackName": "limerock 2019", "TrackConfigName": "Grand Prix", "TrackLength": "2.41 km"},
+    "SessionInfo": {"Sessions": [{"SessionNum": 0, "SessionType": "Practice"}]},
+    "DriverInfo": {
+        "DriverCarIdx": 2,
+        "Drivers": [{"CarIdx": 0, "CarPath": "safety pcporsche911cup"}, {"CarIdx": 2, "CarPath": "mx5 mx52016"}],
+    },
+}
+
+
+class FakeIRSDK:
+    """Indexes like pyirsdk: telemetry variables by name, session YAML by top-level section."""
+
+    is_initialized = True
+    is_connected = True
+
+    def __init__(self):
+        self.telemetry = {"SessionInfoUpdate": 1, "LapDistPct": 0.25, "Throttle": 1.0, "Speed": 40.0}
+        self.sections = {name: dict(section) for name, section in SESSION_YAML.items()}
+        self.section_reads = 0
+
+    def __getitem__(self, key):
+        if key in self.telemetry:
+            return self.telemetry[key]
+        if key in self.sections:
+            self.section_reads += 1
+            return self.sections[key]
+        return None
+
+
+def test_snapshot_reads_track_and_car_from_their_yaml_sections():
+    snapshot = TelemetryWorker(logging.getLogger("test"))._read_snapshot(FakeIRSDK())
+
+    assert snapshot.connected
+    assert (snapshot.track_name, snapshot.track_config) == ("limerock 2019", "Grand Prix")
+    assert snapshot.car_path == "mx5 mx52016"
+    assert snapshot.track_length_km == 2.41
+    assert (snapshot.lap_pct, snapshot.throttle, snapshot.speed_mps) == (0.25, 1.0, 40.0)
+
+
+def test_session_yaml_is_reparsed_only_when_it_changes():
+    worker = TelemetryWorker(logging.getLogger("test"))
+    ir = FakeIRSDK()
+    worker._read_snapshot(ir)
+    reads = ir.section_reads
+
+    for _ in range(10):
+        worker._read_snapshot(ir)
+    assert ir.section_reads == reads
+
+    ir.sections["WeekendInfo"]["TrackName"] = "spa 2024"
+    ir.telemetry["SessionInfoUpdate"] = 2
+    assert worker._read_snapshot(ir).track_name == "spa 2024"
+    assert ir.section_reads > reads
+
+
+def test_missing_session_sections_leave_track_and_car_unknown():
+    ir = FakeIRSDK()
+    ir.sections = {"SessionInfo": SESSION_YAML["SessionInfo"]}
+
+    snapshot = TelemetryWorker(logging.getLogger("test"))._read_snapshot(ir)
+
+    assert (snapshot.track_name, snapshot.track_config, snapshot.car_path, snapshot.track_length_km) == (
+        None, None, None, None
+    )
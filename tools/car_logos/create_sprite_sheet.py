@@ -1,17 +1,45 @@
 #!/usr/bin/env python3
 """
 Script to create a sprite sheet from car logos.
-Each logo is resized to 256x256 pixels (2x for retina displays) and arranged in a grid.
+Each logo is fitted into a 256x256 cell (2x for retina displays), trimmed to its
+opaque pixels and bin-packed into a tight atlas, written at 1x and 2x as PNG and WebP.
+Identical logos share one sprite.
+
+Resized tiles are cached by content hash in CACHE_DIR, so only new or changed
+logos are resized (in parallel), and the outputs are left untouched when
+nothing changed since the last run.
 """
 
+import argparse
+import hashlib
+import io
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
 import math
 
 LOGO_DIR = "logos"
 SPRITE_SIZE = 256
-OUTPUT_FILE = "../../src/frontend/assets/img/car_manufacturer.png"
+OUTPUT_BASE = "../../src/frontend/assets/img/car_manufacturer"
+# (suffix, scale relative to the 2x cells, format, save options)
+# WebP effort is kept moderate: method 6 saves ~8% more but takes ~15x longer.
+OUTPUT_VARIANTS = (
+    ("", 0.5, "PNG", {"compress_level": 9}),
+    ("@2x", 1, "PNG", {"compress_level": 9}),
+    ("", 0.5, "WEBP", {"lossless": True, "quality": 80, "method": 4}),
+    ("@2x", 1, "WEBP", {"lossless": True, "quality": 80, "method": 4}),
+)
+OUTPUT_FILES = [f"{OUTPUT_BASE}{suffix}.{fmt.lower()}" for suffix, _scale, fmt, _options in OUTPUT_VARIANTS]
+# Transparent gap between packed sprites (2x pixels) so filtering never samples a neighbour.
+SPRITE_PADDING = 4
+# Widest atlas considered when packing; stays within common GPU texture limits.
+MAX_ATLAS_WIDTH = 4096
 TS_OUTPUT_FILE = "../../src/frontend/components/Standings/components/CarManufacturer/carManufacturerSpritePositions.ts"
+CACHE_DIR = ".cache"
+MANIFEST_FILE = os.path.join(CACHE_DIR, "manifest.json")
+# Bump when resize_logo or the sheet layout changes so cached tiles and outputs are rebuilt.
+CACHE_VERSION = 2
 
 def resize_logo(img, target_size):
     """Resize logo to target_size x target_size while maintaining aspect ratio."""
@@ -25,28 +53,181 @@ def resize_logo(img, target_size):
     new_img.paste(img, (x_offset, y_offset), img if img.mode == "RGBA" else None)
     return new_img
 
-def generate_typescript_mapping(positions, sprites_per_row, sprites_per_column):
-    """Generate TypeScript file with sprite positions."""
+def file_digest(path):
+    """SHA-256 of a logo file's bytes."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def tile_path(digest):
+    """Cache location of the resized tile for a logo with this content hash."""
+    return os.path.join(CACHE_DIR, f"{digest}-{SPRITE_SIZE}-v{CACHE_VERSION}.png")
+
+def build_tile(job):
+    """Resize one logo into its cache tile. Runs in a worker process; returns an error or None."""
+    logo_path, tile = job
+    try:
+        img = Image.open(logo_path)
+        if img.mode != "RGBA":
+            img = img.convert("RGBA")
+        tmp = f"{tile}.{os.getpid()}.tmp"
+        resize_logo(img, SPRITE_SIZE).save(tmp, "PNG")
+        os.replace(tmp, tile)
+        return None
+    except Exception as e:
+        return str(e)
+
+def build_missing_tiles(jobs, workers=None):
+    """Resize the given (logo_path, tile) jobs, in a process pool when there is more than one."""
+    if len(jobs) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(build_tile, jobs))
+    return [build_tile(job) for job in jobs]
+
+def write_if_changed(path, data):
+    """Write bytes to path unless it already holds exactly them. Returns True if written."""
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return True
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def trim_tile(cell):
+    """Crop a cell to its opaque pixels; returns (tile, (left, top)) or (None, (0, 0)) if empty.
+
+    The box is widened to even coordinates so the 1x atlas is an exact half of the 2x one.
+    """
+    bbox = cell.getchannel("A").getbbox()
+    if bbox is None:
+        return None, (0, 0)
+    left, top, right, bottom = bbox
+    left -= left % 2
+    top -= top % 2
+    right += right % 2
+    bottom += bottom % 2
+    return cell.crop((left, top, right, bottom)), (left, top)
+
+def shelf_pack(sizes, width):
+    """Place (w, h) boxes on shelves of the given width, tallest first. Returns (positions, height)."""
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    positions = [None] * len(sizes)
+    x = y = shelf_height = 0
+    for i in order:
+        w, h = sizes[i]
+        if x and x + w > width:
+            y += shelf_height
+            x = shelf_height = 0
+        positions[i] = (x, y)
+        x += w
+        shelf_height = max(shelf_height, h)
+    return positions, y + shelf_height
+
+def pack_tiles(sizes):
+    """Shelf-pack padded tile sizes at the atlas width that gives the smallest area.
+
+    Returns (positions, width, height) with even dimensions.
+    """
+    padded = [(w + SPRITE_PADDING, h + SPRITE_PADDING) for w, h in sizes]
+    widest = max(w for w, _h in padded)
+    total = sum(w for w, _h in padded)
+    best = None
+    for width in range(widest, max(widest, min(total, MAX_ATLAS_WIDTH)) + 2, 2):
+        positions, height = shelf_pack(padded, width)
+        used = max(x + w for (x, _y), (w, _h) in zip(positions, padded))
+        key = (used * height, abs(used - height))
+        if best is None or key < best[0]:
+            best = (key, positions, used, height)
+    _key, positions, width, height = best
+    # Padding trails each sprite, so the last row and column do not need it.
+    return positions, width - SPRITE_PADDING, height - SPRITE_PADDING
+
+def build_atlas(tiles, rects, width, height, scale):
+    """Paste each (2x) tile at its rect, scaled by 1 or 0.5."""
+    atlas = Image.new("RGBA", (int(width * scale), int(height * scale)), (0, 0, 0, 0))
+    for tile, (x, y) in zip(tiles, rects):
+        if scale != 1:
+            tile = tile.resize((int(tile.width * scale), int(tile.height * scale)), Image.Resampling.LANCZOS)
+        atlas.paste(tile, (int(x * scale), int(y * scale)))
+    return atlas
+
+def encode_image(image, fmt, options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+def render_variant(job):
+    """Build and encode one OUTPUT_VARIANTS atlas. Runs in a worker process."""
+    tiles, positions, width, height, (_suffix, scale, fmt, options) = job
+    return encode_image(build_atlas(tiles, positions, width, height, scale), fmt, options)
+
+def render_variants(tiles, positions, width, height, workers=None):
+    """Encoded bytes for every OUTPUT_VARIANTS entry, in parallel unless workers is 1."""
+    jobs = [(tiles, positions, width, height, variant) for variant in OUTPUT_VARIANTS]
+    if workers == 1:
+        return [render_variant(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_variant, jobs))
+
+def legacy_grid(cells):
+    """The old square grid of full 256x256 cells, for the savings report."""
+    total_sprites = len(cells) + 1
+    cols = math.ceil(math.sqrt(total_sprites))
+    rows = math.ceil(total_sprites / cols)
+    sheet = Image.new("RGBA", (cols * SPRITE_SIZE, rows * SPRITE_SIZE), (0, 0, 0, 0))
+    for idx, cell in enumerate(cells, start=1):
+        sheet.paste(cell, ((idx % cols) * SPRITE_SIZE, (idx // cols) * SPRITE_SIZE), cell)
+    return sheet
+
+def generate_typescript_mapping(sprites, atlas_width, atlas_height):
+    """Generate TypeScript file with sprite rectangles."""
     ts_content = f"""export const SPRITE_SIZE = {SPRITE_SIZE};
-export const SPRITES_PER_ROW = {sprites_per_row};
-export const SPRITES_PER_COLUMN = {sprites_per_column};
+export const ATLAS_WIDTH = {atlas_width};
+export const ATLAS_HEIGHT = {atlas_height};
+
+/**
+ * Where a logo sits in the atlas (x, y, w, h) and where that trimmed box sits
+ * inside its SPRITE_SIZE cell (offsetX, offsetY). All values are 2x pixels;
+ * the 1x atlas is exactly half. A zero-size sprite draws nothing.
+ */
+export interface SpriteRect {{
+  x: number;
+  y: number;
+  w: number;
+  h: number;
+  offsetX: number;
+  offsetY: number;
+}}
 
-export const CAR_MANUFACTURER_SPRITE_POSITIONS: Record<string, {{ x: number; y: number }}> = {{
+export const CAR_MANUFACTURER_SPRITE_POSITIONS: Record<string, SpriteRect> = {{
 """
     
-    for manufacturer, (x, y) in sorted(positions.items()):
-        ts_content += f"  {manufacturer}: {{ x: {x}, y: {y} }},\n"
+    for manufacturer, (x, y, w, h, offset_x, offset_y) in sorted(sprites.items()):
+        ts_content += (
+            f"  {manufacturer}: {{ x: {x}, y: {y}, w: {w}, h: {h}, offsetX: {offset_x}, offsetY: {offset_y} }},\n"
+        )
     
     ts_content += """};
 
 """
     
-    with open(TS_OUTPUT_FILE, 'w') as f:
-        f.write(ts_content)
-    
-    print(f"TypeScript mapping created: {TS_OUTPUT_FILE}")
+    if write_if_changed(TS_OUTPUT_FILE, ts_content.encode("utf-8")):
+        print(f"TypeScript mapping created: {TS_OUTPUT_FILE}")
+    else:
+        print(f"TypeScript mapping unchanged: {TS_OUTPUT_FILE}")
 
-def create_sprite_sheet():
+def create_sprite_sheet(force=False, workers=None):
     """Create a sprite sheet from all logos in the logos directory."""
     logo_files = sorted([f for f in os.listdir(LOGO_DIR) if f.endswith('.png')])
     
@@ -55,52 +236,117 @@ def create_sprite_sheet():
         return
     
     print(f"Found {len(logo_files)} logo files")
+    os.makedirs(CACHE_DIR, exist_ok=True)
     
-    total_sprites = len(logo_files) + 1
-    cols = math.ceil(math.sqrt(total_sprites))
-    rows = math.ceil(total_sprites / cols)
-    
-    sprite_sheet = Image.new("RGBA", (cols * SPRITE_SIZE, rows * SPRITE_SIZE), (0, 0, 0, 0))
-    positions = {}
+    digests = {logo_file: file_digest(os.path.join(LOGO_DIR, logo_file)) for logo_file in logo_files}
+    inputs = {
+        "version": CACHE_VERSION,
+        "size": SPRITE_SIZE,
+        "logos": digests,
+        "outputs": OUTPUT_FILES + [TS_OUTPUT_FILE],
+    }
+    manifest = load_manifest()
+    if (
+        not force
+        and manifest.get("inputs") == inputs
+        and all(os.path.exists(path) for path in OUTPUT_FILES + [TS_OUTPUT_FILE])
+    ):
+        print("Sprite sheet up to date, nothing to do")
+        return
     
-    positions["unknown"] = (0, 0)
+    jobs = [
+        (os.path.join(LOGO_DIR, logo_file), tile_path(digests[logo_file]))
+        for logo_file in logo_files
+        if force or not os.path.exists(tile_path(digests[logo_file]))
+    ]
+    errors = dict(zip((logo_path for logo_path, _tile in jobs), build_missing_tiles(jobs, workers)))
+    print(f"Resized {len(jobs)} new or changed logos, reused {len(logo_files) - len(jobs)} cached tiles")
     
-    for idx, logo_file in enumerate(logo_files):
+    sprites = {"unknown": (0, 0, 0, 0, 0, 0)}
+    cells = []
+    tiles = []
+    tile_offsets = []
+    tile_sprites = {}
+    sprite_tile = {}
+
+    for logo_file in logo_files:
         logo_path = os.path.join(LOGO_DIR, logo_file)
+        manufacturer = os.path.splitext(logo_file)[0]
         
         try:
-            img = Image.open(logo_path)
-            if img.mode != "RGBA":
-                img = img.convert("RGBA")
-            
-            resized = resize_logo(img, SPRITE_SIZE)
+            if errors.get(logo_path):
+                raise RuntimeError(errors[logo_path])
+            with Image.open(tile_path(digests[logo_file])) as cell:
+                cell = cell.convert("RGBA")
+            cells.append(cell)
             
-            sprite_idx = idx + 1
-            col = sprite_idx % cols
-            row = sprite_idx // cols
+            if manufacturer in sprites or manufacturer in sprite_tile:
+                continue
+            tile, offset = trim_tile(cell)
+            if tile is None:
+                sprites[manufacturer] = (0, 0, 0, 0, 0, 0)
+                continue
             
-            x = col * SPRITE_SIZE
-            y = row * SPRITE_SIZE
-            
-            sprite_sheet.paste(resized, (x, y), resized)
-            
-            manufacturer = os.path.splitext(logo_file)[0]
-            
-            if manufacturer not in positions:
-                positions[manufacturer] = (col, row)
-            
-            print(f"Processed {logo_file} -> position ({col}, {row}) -> {manufacturer}")
+            # Identical pixels share one sprite whatever the source file looked like.
+            key = hashlib.sha256(tile.tobytes() + repr((tile.size, offset)).encode()).hexdigest()
+            if key in tile_sprites:
+                print(f"Deduplicated {logo_file} -> {tile_sprites[key]}")
+            else:
+                tile_sprites[key] = manufacturer
+                tiles.append(tile)
+                tile_offsets.append(offset)
+            sprite_tile[manufacturer] = tile_sprites[key]
             
         except Exception as e:
             print(f"Error processing {logo_file}: {e}")
     
-    sprite_sheet.save(OUTPUT_FILE, "PNG")
-    print(f"\nSprite sheet created: {OUTPUT_FILE}")
-    print(f"Dimensions: {sprite_sheet.width}x{sprite_sheet.height}")
-    print(f"Grid: {cols} columns x {rows} rows")
-    print(f"Total logos: {len(logo_files)}")
+    positions, atlas_width, atlas_height = pack_tiles([tile.size for tile in tiles]) if tiles else ([], 2, 2)
+    placed = {}
+    for tile, offset, (x, y), owner in zip(tiles, tile_offsets, positions, tile_sprites.values()):
+        placed[owner] = (x, y, tile.width, tile.height) + offset
+    for manufacturer, owner in sprite_tile.items():
+        sprites[manufacturer] = placed[owner]
+        x, y, w, h, _offset_x, _offset_y = sprites[manufacturer]
+        print(f"Packed {manufacturer} -> ({x}, {y}) {w}x{h}")
     
-    generate_typescript_mapping(positions, cols, rows)
+    legacy = legacy_grid(cells)
+    legacy_bytes = len(encode_image(legacy, "PNG", {}))
+    print(f"\nAtlas: {atlas_width}x{atlas_height} (2x), {len(tiles)} sprites for {len(logo_files)} logos")
+    print(f"Previous grid sheet: {legacy_bytes} bytes")
+    downloads = {}
+    for variant, path, data in zip(
+        OUTPUT_VARIANTS, OUTPUT_FILES, render_variants(tiles, positions, atlas_width, atlas_height, workers)
+    ):
+        state = "written" if write_if_changed(path, data) else "unchanged"
+        saved = legacy_bytes - len(data)
+        print(f"{path}: {len(data)} bytes, {saved} bytes saved ({saved / legacy_bytes:.0%}) [{state}]")
+        if variant[2] == "WEBP":
+            downloads[variant[0] or "@1x"] = saved
+    # The Standings component loads only the WebP matching the display's pixel ratio.
+    print("Total bytes saved per download: " + ", ".join(f"{saved} at {key[1:]}" for key, saved in downloads.items()))
+    print(f"Decoded 2x pixels: {atlas_width * atlas_height} vs {legacy.width * legacy.height} for the grid")
+    
+    generate_typescript_mapping(sprites, atlas_width, atlas_height)
+    
+    # Only a clean build is recorded, so failed logos are retried next run.
+    if not any(errors.values()):
+        with open(MANIFEST_FILE, "w") as f:
+            json.dump({"inputs": inputs}, f, indent=2, sort_keys=True)
+    prune_tiles(set(tile_path(digest) for digest in digests.values()))
+
+def prune_tiles(keep):
+    """Delete cached tiles no longer referenced by any logo."""
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        if name.endswith(".png") and path not in keep:
+            os.remove(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the car manufacturer sprite sheet.")
+    parser.add_argument("--force", action="store_true", help="Ignore the cache and rebuild every tile and output")
+    parser.add_argument("--workers", type=int, help="Resize processes (default: one per CPU)")
+    args = parser.parse_args()
+    create_sprite_sheet(force=args.force, workers=args.workers)
 
 if __name__ == "__main__":
-    create_sprite_sheet()
+    main()
@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from PIL import Image
+
+import create_sprite_sheet
+from create_sprite_sheet import (
+    SPRITE_PADDING,
+    SPRITE_SIZE,
+    build_missing_tiles,
+    pack_tiles,
+    prune_tiles,
+    shelf_pack,
+    trim_tile,
+    write_if_changed,
+)
+
+
+def test_write_if_changed_leaves_identical_files_alone(tmp_path):
+    path = tmp_path / "sheet.png"
+
+    assert write_if_changed(str(path), b"abc")
+    os.utime(path, (1, 1))
+    assert not write_if_changed(str(path), b"abc")
+    assert path.stat().st_mtime == 1
+    assert write_if_changed(str(path), b"abcd")
+    assert path.read_bytes() == b"abcd"
+
+
+def test_build_missing_tiles_resizes_into_cells_and_reports_errors(tmp_path):
+    logo = tmp_path / "wide.png"
+    Image.new("RGB", (400, 100), (255, 0, 0)).save(logo)
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not a png")
+    jobs = [(str(logo), str(tmp_path / "wide-tile.png")), (str(broken), str(tmp_path / "broken-tile.png"))]
+
+    errors = build_missing_tiles(jobs, workers=1)
+
+    assert errors[0] is None and errors[1]
+    with Image.open(jobs[0][1]) as tile:
+        assert tile.size == (SPRITE_SIZE, SPRITE_SIZE)
+        assert tile.getpixel((SPRITE_SIZE // 2, SPRITE_SIZE // 2)) == (255, 0, 0, 255)
+        assert tile.getpixel((SPRITE_SIZE // 2, 0))[3] == 0
+    assert not os.path.exists(jobs[1][1])
+
+
+def test_prune_tiles_keeps_only_referenced_tiles(tmp_path, monkeypatch):
+    monkeypatch.setattr(create_sprite_sheet, "CACHE_DIR", str(tmp_path))
+    for name in ("keep.png", "stale.png", "manifest.json"):
+        (tmp_path / name).write_bytes(b"")
+
+    prune_tiles({str(tmp_path / "keep.png")})
+
+    assert sorted(os.listdir(tmp_path)) == ["keep.png", "manifest.json"]
+
+
+def overlaps(a, b):
+    (ax, ay, aw, ah), (bx, by, bw, bh) = a, b
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+
+def test_shelf_pack_places_tallest_first_and_wraps_rows():
+    positions, height = shelf_pack([(40, 10), (30, 30), (50, 20), (20, 20)], 100)
+
+    # Rows fill up to exactly the width; the shortest box starts the second row.
+    assert positions == [(0, 30), (0, 0), (30, 0), (80, 0)]
+    assert height == 40
+
+
+def test_shelf_pack_never_overlaps_or_exceeds_the_width():
+    sizes = [(w, h) for w in (10, 24, 38) for h in (6, 18, 30)] * 3
+    positions, height = shelf_pack(sizes, 80)
+
+    rects = [(x, y, w, h) for (x, y), (w, h) in zip(positions, sizes)]
+    for i, rect in enumerate(rects):
+        assert rect[0] + rect[2] <= 80
+        assert rect[1] + rect[3] <= height
+        assert not any(overlaps(rect, other) for other in rects[i + 1 :])
+
+
+def test_shelf_pack_gives_an_oversized_box_its_own_row():
+    positions, height = shelf_pack([(120, 10), (20, 5)], 100)
+
+    assert positions == [(0, 0), (0, 10)]
+    assert height == 15
+
+
+def test_pack_tiles_returns_even_dimensions_without_trailing_padding():
+    sizes = [(64, 32), (30, 40), (100, 12)]
+    positions, width, height = pack_tiles(sizes)
+
+    assert width % 2 == 0 and height % 2 == 0
+    assert max(x + w for (x, _y), (w, _h) in zip(positions, sizes)) == width
+    assert max(y + h for (_x, y), (_w, h) in zip(positions, sizes)) == height
+    padded = [(x, y, w + SPRITE_PADDING, h + SPRITE_PADDING) for (x, y), (w, h) in zip(positions, sizes)]
+    assert not any(overlaps(a, b) for i, a in enumerate(padded) for b in padded[i + 1 :])
+
+
+def test_trim_tile_crops_to_even_opaque_bounds():
+    cell = Image.new("RGBA", (16, 16), (0, 0, 0, 0))
+    cell.putpixel((3, 5), (255, 0, 0, 255))
+    cell.putpixel((8, 10), (255, 0, 0, 255))
+
+    tile, offset = trim_tile(cell)
+
+    assert offset == (2, 4)
+    assert tile.size == (8, 8)
+    assert tile.getpixel((1, 1)) == (255, 0, 0, 255)
+    assert trim_tile(Image.new("RGBA", (16, 16), (0, 0, 0, 0))) == (None, (0, 0))